@@ -1,39 +1,111 @@
+from instrumentation.startup_profiler import profiler  # Imported first so it sees the whole startup
+
+import importlib
+import os
+import sqlite3
+
 from kivy.lang import Builder
 from kivy.uix.screenmanager import ScreenManager
-from kivy.clock import Clock  # For scheduling periodic tasks
 from kivymd.app import MDApp
+from database.async_executor import DatabaseExecutor
+from instrumentation import metrics  # Off unless TASKMANAGER_METRICS is set
+from database.credentials import Authenticator
 from database.db_handler import DatabaseHandler
+from database.maintenance import DatabaseMaintenance
+from database.task_repository import TaskRepository
 from pages.reminder_handler import ReminderHandler  # Your new ReminderHandler module
-from pages.login_page import LoginPage
-from pages.register_page import RegisterPage
-from pages.task_page import TaskPage
 
-# Load KV files for the screens
-Builder.load_file("kv file/login_page.kv")
-Builder.load_file("kv file/register_page.kv")
-Builder.load_file("kv file/task_page.kv")
+profiler.mark("import core modules")
+
+# Screens are imported and their KV files loaded on first navigation:
+# name -> (module, class, KV file)
+SCREENS = {
+    "login": ("pages.login_page", "LoginPage", "kv file/login_page.kv"),
+    "register": ("pages.register_page", "RegisterPage", "kv file/register_page.kv"),
+    "task": ("pages.task_page", "TaskPage", "kv file/task_page.kv"),
+}
 
+# Set TASKMANAGER_FAST_START=0 to build every screen up front (for comparison)
+FAST_START = os.environ.get("TASKMANAGER_FAST_START", "1") != "0"
 
 
 class MainApp(MDApp):
     def build(self):
-        # Initialize the database handler
+        # Initialize the database handler and the shared task cache on top of it;
+        # every screen uses these instead of opening its own handler
         self.db_handler = DatabaseHandler()
+        self.repository = TaskRepository(self.db_handler)
+        # Password checks with rate limiting and cached sessions
+        self.authenticator = Authenticator(self.db_handler)
+        self.session_token = None
+        # Background threads for SQLite work so UI callbacks never block on the database
+        self.db_executor = DatabaseExecutor()
+        # Backups, vacuum, ANALYZE and WAL checkpoints on their own thread (started in on_start)
+        self.maintenance = DatabaseMaintenance(self.db_handler)
+        profiler.mark("open database")
+
+        # Initialize the ReminderHandler; it follows task changes through the repository
+        self.reminder_handler = ReminderHandler(
+            self.db_handler, repository=self.repository, executor=self.db_executor
+        )
+
+        # Load pending reminders once; the scheduler sleeps until the next one is due
+        self.reminder_handler.start()
+        profiler.mark("start reminders")
 
-        # Initialize the ReminderHandler
-        self.reminder_handler = ReminderHandler(self.db_handler)
+        # Set up the screen manager with only the first screen
+        self.screen_manager = ScreenManager()
+        self.get_screen("login")
+        if not FAST_START:
+            for name in SCREENS:
+                self.get_screen(name)
+        profiler.mark("build first screen")
+        return self.screen_manager
 
-        # Schedule periodic reminder checks every 60 seconds
-        Clock.schedule_interval(self.reminder_handler.check_reminders, 30)
+    def get_screen(self, name):
+        """Return a screen, importing its module and loading its KV file on first use."""
+        if self.screen_manager.has_screen(name):
+            return self.screen_manager.get_screen(name)
+        module_name, class_name, kv_file = SCREENS[name]
+        screen_class = getattr(importlib.import_module(module_name), class_name)
+        Builder.load_file(kv_file)
+        screen = screen_class(name=name)
+        self.screen_manager.add_widget(screen)
+        return screen
 
-        # Set up the screen manager
-        sm = ScreenManager()
-        sm.add_widget(LoginPage(name="login"))
-        sm.add_widget(RegisterPage(name="register"))
-        sm.add_widget(TaskPage(name="task"))
-        return sm
+    def show_screen(self, name):
+        self.get_screen(name)
+        self.screen_manager.current = name
+
+    def on_start(self):
+        from kivy.core.window import Window
+        profiler.mark("start app")
+        metrics.start_frame_sampler()
+        self.maintenance.start()
+
+        def first_frame(*args):
+            Window.unbind(on_draw=first_frame)
+            profiler.mark("first frame")
+            profiler.report()
+
+        Window.bind(on_draw=first_frame)
+
+    def on_stop(self):
+        self.maintenance.stop()
+        self.reminder_handler.stop()
+        self.db_executor.shutdown()
+        if os.environ.get("TASKMANAGER_DB_LATENCY"):
+            # Main-thread block time vs. background time per database operation
+            self.db_executor.stats.print_report()
+        try:
+            # Nothing else is writing now: fold the WAL back into the database file and empty it
+            self.maintenance.checkpoint("TRUNCATE")
+        except sqlite3.Error as e:
+            print(f"Error checkpointing database: {e}")
+        # Release the pooled SQLite connections
+        self.db_handler.close()
+        metrics.shutdown()
 
 
 if __name__ == "__main__":
     MainApp().run()
-
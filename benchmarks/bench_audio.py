@@ -0,0 +1,63 @@
+"""Trigger-to-start latency of the reminder sound.
+
+Usage:
+    python -m benchmarks.bench_audio [--backend kivy|null] [--plays 50]
+
+Plays the sound the way ReminderHandler does (handed to the single audio
+worker thread with the trigger time) and reports how long it took from the
+trigger until playback started: once for the first play without preloading,
+which includes loading the file, and then for `--plays` preloaded plays.
+The null backend measures only the hand-off to the worker thread and needs
+no audio device.
+"""
+import argparse
+import threading
+import time
+
+from pages.audio import SOUND_FILE, KivyAudio, NullAudio
+from pages.reminder_handler import BoundedWorker
+
+BACKENDS = {"kivy": KivyAudio, "null": NullAudio}
+
+
+def play_on_worker(worker, audio):
+    """Trigger one play through the worker; returns once it has started."""
+    done = threading.Event()
+
+    def play(triggered):
+        audio.play(triggered)
+        if getattr(audio, "sound", None) is not None:
+            audio.sound.stop()  # Ready for the next play right away
+        done.set()
+
+    worker.submit(play, time.perf_counter())
+    done.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="kivy")
+    parser.add_argument("--plays", type=int, default=50)
+    parser.add_argument("--sound", default=SOUND_FILE)
+    args = parser.parse_args()
+
+    worker = BoundedWorker("bench-audio", max_pending=1)
+    # No throttling here: every trigger should start the sound
+    cold = BACKENDS[args.backend](args.sound, min_interval=0)
+    play_on_worker(worker, cold)
+    if not cold.latencies_ms:
+        print(f"{args.backend}: could not play {args.sound}")
+        return
+    print(f"{args.backend} first play, not preloaded: {cold.latencies_ms[0]:8.3f} ms")
+
+    audio = BACKENDS[args.backend](args.sound, min_interval=0)
+    audio.preload()
+    for _ in range(args.plays):
+        play_on_worker(worker, audio)
+    stats = audio.stats()
+    print(f"{args.backend} preloaded, {stats['plays']} plays: p50 {stats['p50_ms']:8.3f} ms  max {stats['max_ms']:8.3f} ms")
+    worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure task import/export throughput.
+
+Usage:
+    python -m benchmarks.bench_bulk_import [--rows 100000] [--single-rows 2000]
+
+Compares add_task called once per row against bulk_add_tasks, times the
+due_at conversion bulk_add_tasks does (LocalEpochs, once per distinct date)
+against parsing every row with epoch_of, then times streaming CSV and JSONL
+export/import of the same rows.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+
+from database.db_handler import DatabaseHandler
+from database.import_export import export_tasks, import_tasks
+from database.timestamps import LocalEpochs, epoch_of
+
+
+def synthetic_tasks(count, rng):
+    for i in range(count):
+        yield (
+            rng.randint(1, 100),
+            f"Imported task {i}",
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        )
+
+
+def report(name, rows, seconds, peak=None):
+    line = f"{name:28} {rows:9,} rows  {seconds:7.2f}s  {rows / seconds:10,.0f} rows/s"
+    if peak is not None:
+        line += f"  peak {peak / 1024:8,.0f} KiB"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single-rows", type=int, default=2_000)
+    args = parser.parse_args()
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler = DatabaseHandler(os.path.join(tmp, "bench.db"))
+
+        rows = list(synthetic_tasks(args.single_rows, rng))
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):  # add_task prints once per row
+            for row in rows:
+                db_handler.add_task(*row)
+        report("add_task (one per row)", len(rows), time.perf_counter() - start)
+
+        rows = list(synthetic_tasks(args.rows, rng))
+        start = time.perf_counter()
+        db_handler.bulk_add_tasks(rows)
+        report("bulk_add_tasks", len(rows), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _, _, task_date, task_time in rows:
+            epoch_of(task_date, task_time)
+        report("due_at: epoch_of per row", len(rows), time.perf_counter() - start)
+        epoch = LocalEpochs()
+        start = time.perf_counter()
+        for _, _, task_date, task_time in rows:
+            epoch(task_date, task_time)
+        report("due_at: LocalEpochs", len(rows), time.perf_counter() - start)
+
+        for fmt in ("csv", "jsonl"):
+            path = os.path.join(tmp, f"tasks.{fmt}")
+            tracemalloc.start()
+            start = time.perf_counter()
+            written = export_tasks(db_handler, path)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report(f"export {fmt}", written, elapsed, peak)
+
+            target = DatabaseHandler(os.path.join(tmp, f"import_{fmt}.db"))
+            tracemalloc.start()
+            start = time.perf_counter()
+            imported, errors = import_tasks(target, path)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report(f"import {fmt}", imported, elapsed, peak)
+            if errors:
+                print(f"  {len(errors)} rows rejected")
+            target.close()
+
+        db_handler.close()
+
+
+if __name__ == "__main__":
+    main()
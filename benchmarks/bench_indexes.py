@@ -0,0 +1,132 @@
+"""Time the indexed lookup queries against a large synthetic database.
+
+Usage:
+    python -m benchmarks.bench_indexes [--rows 1000000] [--users 10000]
+
+Builds a throwaway database with the given number of task and history rows,
+then reports the median and worst latency of get_user_tasks,
+get_completed_tasks, fetch_due_notifications and get_tasks_between together with the query plan
+SQLite chose for each.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from functools import lru_cache
+
+from database.db_handler import DatabaseHandler
+from database.models import HISTORY_SELECT, TASK_SELECT
+from database.timestamps import epoch_of
+
+cached_epoch = lru_cache(maxsize=None)(epoch_of)  # Few distinct date/time pairs
+
+
+def populate(db_handler, rows, users):
+    """Insert `rows` tasks and `rows` history entries spread across `users`."""
+    conn = db_handler.create_connection()
+    rng = random.Random(42)
+    batch = 50_000
+    with conn:
+        conn.executemany(
+            'INSERT INTO users (username, password) VALUES (?, ?)',
+            ((f"user{i}", "secret") for i in range(1, users + 1))
+        )
+    for start in range(0, rows, batch):
+        count = min(batch, rows - start)
+        tasks = []
+        history = []
+        for _ in range(count):
+            user_id = rng.randint(1, users)
+            day = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            moment = f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+            # Most reminders have already fired (NULL), some are scheduled in the
+            # future and only a handful are due right now.
+            roll = rng.random()
+            if roll < 0.0001:
+                notify = f"{day} {moment}"
+            elif roll < 0.1:
+                notify = f"2099-{day[5:]} {moment}"
+            else:
+                notify = None
+            due_at = cached_epoch(day, moment)
+            notify_at = cached_epoch(*notify.split()) if notify else None
+            tasks.append((user_id, "Synthetic task", day, moment, notify, 'Pending', due_at, notify_at))
+            history.append((user_id, "Synthetic task", day, moment, day))
+        with conn:
+            conn.executemany('''
+                INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status,
+                                   due_at, notify_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', tasks)
+            conn.executemany('''
+                INSERT INTO history (user_id, description, task_date, task_time, completion_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', history)
+    conn.execute("ANALYZE")
+
+
+def time_call(func, args_list):
+    """Return per-call latencies in milliseconds."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def query_plan(conn, sql, params):
+    return "; ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        populate(db_handler, args.rows, args.users)
+        print(f"Populated {args.rows:,} tasks and history rows in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        user_args = [(rng.randint(1, args.users),) for _ in range(args.samples)]
+        conn = db_handler.create_connection()
+        plans = {
+            "get_user_tasks": query_plan(conn, f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ?', (1,)),
+            "get_completed_tasks": query_plan(conn, f'SELECT {HISTORY_SELECT} FROM history WHERE user_id = ?', (1,)),
+            "fetch_due_notifications": query_plan(
+                conn,
+                "SELECT task_id, description, notify_at FROM tasks "
+                "WHERE notify_at <= ? AND status = 'Pending'",
+                (epoch_of("2024-01-02", "00:00"),)
+            ),
+            "get_tasks_between": query_plan(
+                conn,
+                f"SELECT {TASK_SELECT} FROM tasks WHERE user_id = ? AND due_at >= ? AND due_at < ? ORDER BY due_at",
+                (1, epoch_of("2024-03-01", "00:00"), epoch_of("2024-04-01", "00:00"))
+            ),
+        }
+        month_args = [
+            (user_id, epoch_of("2024-03-01", "00:00"), epoch_of("2024-04-01", "00:00")) for user_id, in user_args
+        ]
+        results = {
+            "get_user_tasks": time_call(db_handler.get_user_tasks, user_args),
+            "get_completed_tasks": time_call(db_handler.get_completed_tasks, user_args),
+            "fetch_due_notifications": time_call(db_handler.fetch_due_notifications, [()] * 20),
+            "get_tasks_between": time_call(db_handler.get_tasks_between, month_args),
+        }
+
+        for name, samples in results.items():
+            print(f"{name:26} median {statistics.median(samples):8.3f} ms   max {max(samples):8.3f} ms")
+            print(f"{'':26} plan: {plans[name]}")
+        db_handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-task memory and fetch time of the task row representations.
+
+Usage:
+    python -m benchmarks.bench_models [--tasks 100000]
+
+Loads every task of a synthetic database (benchmarks.synthetic) and reports
+the memory the result keeps alive, per task, for:
+
+    tuples (SELECT *)   the previous representation: one tuple of every column
+    Task objects        what the app holds now: get_user_tasks and the task
+                        list's pages (__slots__, TASK_COLUMNS)
+    columnar            fetch_task_columns with every model column
+    columnar (card)     fetch_task_columns with only the columns a task card shows
+
+Only the first two are what the app itself keeps in memory; the columnar
+rows show what a scan that doesn't need objects could save.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import populate
+from database.db_handler import DatabaseHandler
+from database.models import TASK_SELECT, Task
+
+CARD_COLUMNS = ("task_id", "description", "task_date", "task_time", "recurrence")
+
+
+def measure(load):
+    """Return (retained bytes, seconds) of the object `load()` builds."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db_handler, (10, args.tasks, 0))
+        conn = db_handler.create_connection()
+
+        def tuples():
+            return conn.execute('SELECT * FROM tasks').fetchall()
+
+        def tasks():
+            cursor = conn.cursor()
+            cursor.row_factory = Task.from_row
+            return cursor.execute(f'SELECT {TASK_SELECT} FROM tasks').fetchall()
+
+        cases = (
+            ("tuples (SELECT *)", tuples),
+            ("Task objects", tasks),
+            ("columnar", db_handler.fetch_task_columns),
+            ("columnar (card)", lambda: db_handler.fetch_task_columns(columns=CARD_COLUMNS)),
+        )
+        baseline = None
+        for name, load in cases:
+            load()  # Warm the page cache so every case reads from memory
+            retained, elapsed = measure(load)
+            per_task = retained / args.tasks
+            baseline = baseline or per_task
+            print(f"{name:20} {per_task:8.1f} bytes/task  {per_task / baseline:6.2f}x  "
+                  f"{retained / 1024 / 1024:8.1f} MiB  {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
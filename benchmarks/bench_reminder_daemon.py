@@ -0,0 +1,90 @@
+"""Measure reminder delivery throughput with several daemon processes.
+
+Usage:
+    python -m benchmarks.bench_reminder_daemon [--reminders 20000] [--workers 1,2,4,8] [--batch 100]
+
+For each worker count, fills a fresh database with due reminders, starts
+that many ReminderDaemon processes (StubNotifier, no desktop libraries) on
+the same file and times how long they take to drain it. Also checks that
+every reminder was delivered exactly once.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from database.db_handler import DatabaseHandler
+from pages.notifier import StubNotifier
+from reminder_daemon import ReminderDaemon
+
+
+def populate(db_path, count, rng):
+    db_handler = DatabaseHandler(db_path)
+    db_handler.bulk_add_tasks(
+        (rng.randint(1, 100), f"Reminder {i}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+         f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}")
+        for i in range(count)
+    )
+    db_handler.close()
+
+
+def worker(db_path, index, batch_size, start_event, results):
+    db_handler = DatabaseHandler(db_path)
+    daemon = ReminderDaemon(db_handler, StubNotifier(), owner=f"bench-{index}", batch_size=batch_size)
+    start_event.wait()
+    delivered = []
+    while True:
+        task_ids = daemon.run_once()
+        if not task_ids:
+            break
+        delivered.extend(task_ids)
+    db_handler.close()
+    results.put(delivered)
+
+
+def run(db_path, workers, batch_size):
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(db_path, index, batch_size, start_event, results))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)  # Let every worker open its connection before timing
+    start = time.perf_counter()
+    start_event.set()
+    delivered = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return delivered, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=20_000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    for workers in (int(value) for value in args.workers.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            populate(db_path, args.reminders, random.Random(11))
+            delivered, elapsed = run(db_path, workers, args.batch)
+
+            counts = Counter(task_id for task_ids in delivered for task_id in task_ids)
+            duplicates = sum(1 for count in counts.values() if count > 1)
+            split = "/".join(str(len(task_ids)) for task_ids in delivered)
+            print(f"{workers} worker(s)  {len(counts):8,} delivered  {elapsed:6.2f}s  "
+                  f"{len(counts) / elapsed:9,.0f} reminders/s  duplicates {duplicates}  split {split}")
+            if len(counts) != args.reminders:
+                print(f"  {args.reminders - len(counts)} reminders were not delivered")
+
+
+if __name__ == "__main__":
+    main()
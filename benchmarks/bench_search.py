@@ -0,0 +1,100 @@
+"""Compare FTS5 task search with a LIKE scan.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 1000000] [--users 10] [--repeat 50]
+
+Builds a throwaway database with `rows` tasks and `rows` history entries
+(random descriptions from a small vocabulary, spread across `users`), then
+times DatabaseHandler.search_tasks against the LIKE fallback for a few
+whole-word and prefix queries, reporting median and p99 latency.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database.db_handler import DatabaseHandler
+
+WORDS = (
+    "buy milk eggs bread call mom dentist pay rent invoice email report review meeting "
+    "gym run walk dog clean kitchen laundry water plants book flight hotel renew passport "
+    "fix bike car service taxes budget groceries birthday gift plan trip study exam read"
+).split()
+
+# Made-up words give the long tail of a real vocabulary (names, places, projects)
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "pe", "sha")
+RARE_WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+QUERIES = ("milk", "pass", "book flight", "re", "kalomi", "kalo", "zzz")
+
+
+def populate(db_handler, rows, users, rng):
+    """Insert `rows` tasks and `rows` history entries; the search triggers index them."""
+    conn = db_handler.create_connection()
+    batch = 50_000
+    for start in range(0, rows, batch):
+        count = min(batch, rows - start)
+        tasks = []
+        history = []
+        for _ in range(count):
+            user_id = rng.randint(1, users)
+            description = " ".join(rng.sample(WORDS, rng.randint(1, 3)) + rng.sample(RARE_WORDS, rng.randint(1, 2)))
+            tasks.append((user_id, description, "2024-01-01", "09:00", None, 'Pending'))
+            history.append((user_id, description, "2024-01-01", "09:00", "2024-01-02"))
+        with conn:
+            conn.executemany('''
+                INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', tasks)
+            conn.executemany('''
+                INSERT INTO history (user_id, description, task_date, task_time, completion_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', history)
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        populate(db_handler, args.rows, args.users, rng)
+        print(f"Inserted {args.rows:,} tasks and {args.rows:,} history rows "
+              f"(indexed by triggers) in {time.perf_counter() - start:.1f}s")
+
+        cursor = db_handler.create_connection().cursor()
+        print(f"{'query':16} {'fts5 p50':>10} {'fts5 p99':>10} {'like p50':>10} {'like p99':>10}  hits")
+        for query in QUERIES:
+            user_id = rng.randint(1, args.users)
+            words = query.split()
+            hits = db_handler.search_tasks(user_id, query, args.limit)
+            fts = measure(lambda: db_handler.search_tasks(user_id, query, args.limit), args.repeat)
+            like = measure(
+                lambda: db_handler._search_tasks_like(cursor, user_id, words, args.limit, True),
+                max(1, args.repeat // 10)
+            )
+            print(f"{query:16} {fts[0]:8.2f}ms {fts[1]:8.2f}ms {like[0]:8.2f}ms {like[1]:8.2f}ms  {len(hits)}")
+
+        db_handler.close()
+
+
+if __name__ == "__main__":
+    main()
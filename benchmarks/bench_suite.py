@@ -0,0 +1,263 @@
+"""Headless latency and memory benchmark of the database and reminder APIs.
+
+Usage:
+    python -m benchmarks.bench_suite [--scales 1k,100k] [--calls 200] [--output results.json]
+                                     [--compare baseline.json] [--data-dir DIR]
+
+For each scale (1k, 100k or 1M tasks and history rows, see
+benchmarks.synthetic) a database is generated, then every public
+DatabaseHandler method the app calls and the ReminderHandler load/deliver
+paths are timed call by call. p50/p99 latency comes from `--calls` timed
+calls; peak memory is measured in a separate, shorter tracemalloc pass so
+that tracing does not inflate the timings.
+
+--output saves the results as JSON; --compare prints the p50/p99 change
+against an earlier JSON file, marking p50 slowdowns beyond --threshold.
+--data-dir keeps the generated databases between runs (they are copied
+before each run, so writes never touch the cached file).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+from itertools import islice
+
+from benchmarks.synthetic import SCALES, populate
+from database.db_handler import DatabaseHandler
+from pages.notifier import StubNotifier
+from pages.reminder_handler import FakeClock, ReminderHandler
+
+MEMORY_CALLS = 20  # Calls traced by tracemalloc per method
+DUE_BATCH = 10  # Reminders made due before each deliver_reminders call
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))]
+
+
+def run_case(prepare, func, calls):
+    """Time func(*prepare()) `calls` times, then trace a few calls for peak memory."""
+    samples = []
+    for _ in range(calls):
+        args = prepare()
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    peak = 0
+    for _ in range(min(calls, MEMORY_CALLS)):
+        args = prepare()
+        gc.collect()
+        tracemalloc.start()
+        func(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "calls": calls,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def cases(db_handler, user_ids, rng, calls):
+    """(name, prepare, func, calls) for every benchmarked method."""
+    conn = db_handler.create_connection()
+    task_ids = [row[0] for row in conn.execute('SELECT task_id FROM tasks')]
+    rng.shuffle(task_ids)
+    # Edits use one half; each delete/done call takes an unused task from the other
+    edited, doomed = task_ids[:len(task_ids) // 2], iter(task_ids[len(task_ids) // 2:])
+    today = datetime.now()
+
+    def take(count):
+        """Untimed: `count` unused existing tasks, topped up with new ones once they run out."""
+        chosen = list(islice(doomed, count))
+        if len(chosen) < count:
+            due_at = int(today.timestamp())
+            with conn:
+                conn.executemany('''
+                    INSERT INTO tasks (user_id, description, task_date, task_time, status, due_at)
+                    VALUES (?, 'Spare task', ?, '09:00', 'Pending', ?)
+                ''', [(rng.choice(user_ids), today.strftime("%Y-%m-%d"), due_at)] * (count - len(chosen)))
+            chosen += [row[0] for row in conn.execute(
+                'SELECT task_id FROM tasks ORDER BY task_id DESC LIMIT ?', (count - len(chosen),)
+            )]
+        return chosen
+
+    def random_day():
+        return (today + timedelta(days=rng.randint(-30, 30))).strftime("%Y-%m-%d")
+
+    def random_time():
+        return f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+
+    def user():
+        return (rng.choice(user_ids),)
+
+    # Reminder paths run without Kivy: FakeClock, no executor, StubNotifier
+    handler = ReminderHandler(db_handler, clock=FakeClock(today), notifier=StubNotifier())
+
+    def make_due():
+        """Untimed setup: give DUE_BATCH tasks a reminder that is due now."""
+        now = int(handler.clock.now().timestamp())
+        chosen = take(DUE_BATCH)
+        with conn:
+            conn.executemany(
+                "UPDATE tasks SET notify_at = ?, status = 'Pending' WHERE task_id = ?",
+                [(now - 60, task_id) for task_id in chosen]
+            )
+        rows = conn.execute(
+            f"SELECT task_id, description, notify_at FROM tasks WHERE task_id IN ({','.join('?' * len(chosen))})",
+            chosen
+        ).fetchall()
+        return (rows,)
+
+    few = max(1, calls // 10)  # For whole-table loads and batches
+    # Reads first, so they see the generated data before the writes below consume tasks
+    return [
+        ("get_user_tasks", user, db_handler.get_user_tasks, calls),
+        ("get_user_tasks_page", user, db_handler.get_user_tasks_page, calls),
+        ("get_completed_tasks", user, db_handler.get_completed_tasks, calls),
+        ("get_completed_tasks_page", user, db_handler.get_completed_tasks_page, calls),
+        ("search_tasks", lambda: (rng.choice(user_ids), rng.choice(("milk", "book fl", "re"))),
+         db_handler.search_tasks, calls),
+        ("fetch_due_notifications", lambda: (), db_handler.fetch_due_notifications, calls),
+        ("fetch_pending_notifications", lambda: (), db_handler.fetch_pending_notifications, few),
+        ("ReminderHandler.start", lambda: (), handler.start, few),
+        ("add_task", lambda: (rng.choice(user_ids), "Benchmark task", random_day(), random_time()),
+         db_handler.add_task, calls),
+        ("edit_task", lambda: (rng.choice(edited), "Edited task", random_day(), random_time()),
+         db_handler.edit_task, calls),
+        ("delete_task", lambda: take(1), db_handler.delete_task, calls),
+        ("mark_task_done", lambda: take(1), db_handler.mark_task_done, calls),
+        ("mark_tasks_done[50]", lambda: (take(50),), db_handler.mark_tasks_done, few),
+        ("ReminderHandler.deliver_reminders", make_due, handler.deliver_reminders, few),
+    ], handler
+
+
+def bench_scale(name, calls, seed, data_dir, workdir):
+    db_path = os.path.join(workdir, f"{name}.db")
+    start = time.perf_counter()
+    cached = os.path.join(data_dir, f"synthetic-{name}-seed{seed}.db") if data_dir else None
+    if cached and os.path.exists(cached):
+        shutil.copyfile(cached, db_path)
+    else:
+        target = cached or db_path
+        db_handler = DatabaseHandler(target)
+        populate(db_handler, SCALES[name], seed)
+        db_handler.close()
+        if cached:
+            shutil.copyfile(cached, db_path)
+    generate_s = time.perf_counter() - start
+
+    db_handler = DatabaseHandler(db_path)
+    user_ids = [row[0] for row in db_handler.create_connection().execute('SELECT id FROM users ORDER BY id')]
+    case_list, handler = cases(db_handler, user_ids, random.Random(seed), calls)
+
+    results = {}
+    with redirect_stdout(StringIO()):  # add_task and friends print per call
+        for method, prepare, func, count in case_list:
+            results[method] = run_case(prepare, func, count)
+    handler.stop()
+    db_handler.close()
+    users, tasks, history = SCALES[name]
+    return {
+        "users": users,
+        "tasks": tasks,
+        "history": history,
+        "generate_s": generate_s,
+        "db_bytes": os.path.getsize(db_path),
+        "methods": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline, threshold):
+    for scale, result in results["scales"].items():
+        print(f"\n{scale}: {result['tasks']:,} tasks, {result['history']:,} history rows, "
+              f"{result['users']:,} users  (ready in {result['generate_s']:.1f}s, "
+              f"{result['db_bytes'] / 1024 / 1024:.1f} MiB)")
+        old_methods = (baseline or {}).get("scales", {}).get(scale, {}).get("methods", {})
+        for method, stats in result["methods"].items():
+            line = (f"  {method:34} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                    f"peak {stats['peak_kib']:9,.0f} KiB")
+            old = old_methods.get(method)
+            if old:
+                ratios = [stats[key] / old[key] if old[key] else 1.0 for key in ("p50_ms", "p99_ms")]
+                # p99 of sub-millisecond calls is noisy, so only a p50 change is flagged
+                flag = "  SLOWER" if ratios[0] > threshold else ""
+                line += f"  vs baseline x{ratios[0]:.2f} / x{ratios[1]:.2f}{flag}"
+            print(line)
+    print(f"\nmax RSS {results['max_rss_kib']:,} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1k,100k", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio reported as a slowdown")
+    parser.add_argument("--data-dir", help="cache generated databases here")
+    args = parser.parse_args()
+
+    scales = args.scales.split(",")
+    unknown = [name for name in scales if name not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "calls": args.calls,
+        "seed": args.seed,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in scales:
+            results["scales"][name] = bench_scale(name, args.calls, args.seed, args.data_dir, workdir)
+    # ru_maxrss is KiB on Linux (bytes on macOS)
+    results["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Count task list entries built per operation: full rebuild vs. TaskListSync.
+
+Usage:
+    python -m benchmarks.bench_task_list [--tasks 500] [--ops 200]
+
+Runs headless against a stand-in for the RecycleView (an object with a
+`data` list), so only the bookkeeping done by the task page is measured.
+The RecycleView itself only builds cards for the rows on screen.
+"""
+import argparse
+import random
+import time
+
+from database.models import Task
+from pages.task_list_sync import TaskListSync
+
+PAGE_SIZE = 50
+
+
+class FakeRecycleView:
+    def __init__(self):
+        self.data = []
+
+
+def make_task(task_id, description):
+    return Task(task_id, 1, description, "2024-01-01", "10:00", "2024-01-01 10:00", "Pending")
+
+
+def random_operations(tasks, ops, rng):
+    """Yield (action, task, new task list) after random add/edit/delete/done operations."""
+    next_id = max(task.task_id for task in tasks) + 1
+    for _ in range(ops):
+        action = rng.choice(("add", "edit", "delete", "done"))
+        if action == "add" or not tasks:
+            task = make_task(next_id, f"Task {next_id}")
+            tasks = tasks + [task]
+            next_id += 1
+        elif action == "edit":
+            index = rng.randrange(len(tasks))
+            task = make_task(tasks[index].task_id, f"Edited {rng.random():.6f}")
+            tasks = tasks[:index] + [task] + tasks[index + 1:]
+        else:
+            index = rng.randrange(len(tasks))
+            task = tasks[index]
+            tasks = tasks[:index] + tasks[index + 1:]
+        yield action, task, tasks
+
+
+def full_rebuild(initial, operations):
+    """The old page: rebuild every entry after each change."""
+    view = FakeRecycleView()
+    built = 0
+    for tasks in [initial] + [tasks for _, _, tasks in operations]:
+        view.data = [{"task": task} for task in tasks]
+        built += len(tasks)
+    return built
+
+
+def incremental(initial, operations):
+    """The current page: load one page, then apply single-task changes."""
+    view = FakeRecycleView()
+    sync = TaskListSync(view, lambda task: {"task": task})
+    sync.extend(initial[:PAGE_SIZE], has_more=len(initial) > PAGE_SIZE)
+    # Scroll to the bottom so every later change is inside the loaded window
+    for start in range(PAGE_SIZE, len(initial), PAGE_SIZE):
+        page = initial[start:start + PAGE_SIZE]
+        sync.extend(page, has_more=start + PAGE_SIZE < len(initial))
+
+    for action, task, tasks in operations:
+        if action in ("add", "edit"):
+            sync.update(task)
+        else:
+            sync.remove(task.task_id)
+        # Sanity check: the data list shows exactly the task list, in order
+        assert [entry["task"] for entry in view.data] == tasks
+    return sync.built
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    initial = [make_task(task_id, f"Task {task_id}") for task_id in range(1, args.tasks + 1)]
+    operations = list(random_operations(initial, args.ops, rng))
+
+    for name, strategy in (("full rebuild", full_rebuild), ("incremental", incremental)):
+        start = time.perf_counter()
+        built = strategy(initial, operations)
+        elapsed = time.perf_counter() - start
+        # Both strategies build every entry once while loading
+        per_op = (built - args.tasks) / args.ops
+        print(f"{name:13} {built:8,} entries built  {per_op:8.2f} per operation  {elapsed * 1000:8.1f} ms")
+    print(f"opening the screen builds {min(PAGE_SIZE, args.tasks)} entries (one page) instead of {args.tasks}")
+
+
+if __name__ == "__main__":
+    main()
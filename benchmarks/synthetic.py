@@ -0,0 +1,97 @@
+"""Synthetic users, tasks and history for benchmarks.
+
+    populate(db_handler, SCALES["100k"])
+
+Rows are written straight into the tables in large transactions (the search
+triggers still index them), with the same column values the app would
+store. A fixed seed gives the same database every time, so results from
+different commits can be compared.
+
+The mix roughly follows a real user's data: tasks are spread a year either
+side of now, most past reminders have already fired, about 1% of tasks are
+overdue with their reminder still pending and 5% repeat.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from database.credentials import hash_password
+from database.timestamps import DATE_FORMAT, TIME_FORMAT
+
+# name -> (users, tasks, history rows)
+SCALES = {
+    "1k": (10, 1_000, 1_000),
+    "100k": (100, 100_000, 100_000),
+    "1M": (1_000, 1_000_000, 1_000_000),
+}
+
+WORDS = (
+    "buy milk eggs bread call mom dentist pay rent invoice email report review meeting "
+    "gym run walk dog clean kitchen laundry water plants book flight hotel renew passport "
+    "fix bike car service taxes budget groceries birthday gift plan trip study exam read"
+).split()
+RECURRENCES = ("daily", "weekly", "monthly", "weekly:mon,tue,wed,thu,fri")
+PASSWORD = "benchmark"
+BATCH = 50_000
+
+
+def description(rng):
+    return " ".join(rng.sample(WORDS, rng.randint(2, 5)))
+
+
+def populate(db_handler, scale, seed=1, now=None):
+    """
+    Fill an empty database with `scale` = (users, tasks, history rows).
+
+    Returns the list of user IDs. Every user shares PASSWORD, hashed once.
+    """
+    users, task_count, history_count = scale
+    rng = random.Random(seed)
+    now = now or time.time()
+    start = datetime.fromtimestamp(now) - timedelta(days=365)
+    conn = db_handler.create_connection()
+
+    password_hash = hash_password(PASSWORD)
+    with conn:
+        conn.executemany(
+            'INSERT INTO users (username, password) VALUES (?, ?)',
+            ((f"user{i}", password_hash) for i in range(1, users + 1))
+        )
+    user_ids = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+
+    for offset in range(0, task_count, BATCH):
+        rows = []
+        for _ in range(min(BATCH, task_count - offset)):
+            due = start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+            due_at = int(due.timestamp())
+            # Past reminders have normally fired already; a few are overdue
+            notify_at = due_at if due_at > now or rng.random() < 0.01 else None
+            notify = due.strftime(f"{DATE_FORMAT} {TIME_FORMAT}")
+            rows.append((
+                rng.choice(user_ids), description(rng), due.strftime(DATE_FORMAT), due.strftime(TIME_FORMAT),
+                notify if notify_at else None, 'Pending', rng.choice(RECURRENCES) if rng.random() < 0.05 else None,
+                due_at, notify_at
+            ))
+        with conn:
+            conn.executemany('''
+                INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status,
+                                   recurrence, due_at, notify_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    for offset in range(0, history_count, BATCH):
+        rows = []
+        for _ in range(min(BATCH, history_count - offset)):
+            due = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            completed = due + timedelta(minutes=rng.randrange(3 * 24 * 60))
+            completed_at = int(completed.timestamp())
+            rows.append((
+                rng.choice(user_ids), description(rng), due.strftime(DATE_FORMAT), due.strftime(TIME_FORMAT),
+                time.strftime("%Y-%m-%d", time.gmtime(completed_at)), completed_at
+            ))
+        # bulk_add_history also keeps the completion counters in step
+        db_handler.bulk_add_history(rows)
+
+    with conn:
+        conn.execute("ANALYZE")
+    return user_ids
@@ -0,0 +1,119 @@
+"""Run DatabaseHandler/TaskRepository calls off the Kivy main thread.
+
+Writes go to a single writer thread, so they are applied in submission order
+and never contend with each other for SQLite's write lock; reads run on a
+small pool and proceed concurrently thanks to WAL mode and the per-thread
+connections of ConnectionPool. Results come back as futures, and optional
+callbacks are delivered on the UI thread through Clock.schedule_once: `callback`
+with the result, or `error_callback` with the exception if the call raised.
+
+Every call is timed. `stats.report()` shows, per operation, how long the
+calling (main) thread was blocked submitting it and running its callback,
+how long it waited in the queue and how long the database work took.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _kivy_deliver(func):
+    from kivy.clock import Clock
+    Clock.schedule_once(lambda dt: func())
+
+
+class LatencyStats:
+    """Per-operation counters in milliseconds."""
+
+    FIELDS = ("main_thread", "queue_wait", "run")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}  # name -> {"calls": n, field: [total, max]}
+
+    def record(self, name, field, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = {"calls": 0, **{f: [0.0, 0.0] for f in self.FIELDS}}
+            if field == "run":
+                op["calls"] += 1
+            total_max = op[field]
+            total_max[0] += ms
+            total_max[1] = max(total_max[1], ms)
+
+    def report(self):
+        """Return {name: {"calls": n, "<field>_avg_ms": x, "<field>_max_ms": y}}."""
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                calls = max(op["calls"], 1)
+                row = {"calls": op["calls"]}
+                for field in self.FIELDS:
+                    row[f"{field}_avg_ms"] = round(op[field][0] / calls, 3)
+                    row[f"{field}_max_ms"] = round(op[field][1], 3)
+                result[name] = row
+            return result
+
+    def print_report(self):
+        for name, row in sorted(self.report().items()):
+            print(
+                f"{name:32} calls {row['calls']:6}  "
+                f"main {row['main_thread_avg_ms']:7.3f}/{row['main_thread_max_ms']:7.3f} ms  "
+                f"wait {row['queue_wait_avg_ms']:7.3f} ms  "
+                f"run {row['run_avg_ms']:7.3f}/{row['run_max_ms']:7.3f} ms"
+            )
+
+
+class DatabaseExecutor:
+    def __init__(self, readers=2, deliver=None):
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        # deliver(func) must run func on the UI thread; defaults to Kivy's Clock
+        self.deliver = deliver or _kivy_deliver
+        self.stats = LatencyStats()
+
+    def submit_read(self, func, *args, callback=None, error_callback=None, **kwargs):
+        """Run a read on the reader pool; returns a Future."""
+        return self._submit(self._readers, func, args, kwargs, callback, error_callback)
+
+    def submit_write(self, func, *args, callback=None, error_callback=None, **kwargs):
+        """Run a write on the single writer thread; returns a Future."""
+        return self._submit(self._writer, func, args, kwargs, callback, error_callback)
+
+    def _submit(self, pool, func, args, kwargs, callback, error_callback):
+        name = getattr(func, "__qualname__", repr(func))
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            self.stats.record(name, "queue_wait", started - submitted)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stats.record(name, "run", time.perf_counter() - started)
+
+        future = pool.submit(run)
+        if callback is not None or error_callback is not None:
+            future.add_done_callback(
+                lambda f: self.deliver(lambda: self._run_callback(name, callback, error_callback, f))
+            )
+        self.stats.record(name, "main_thread", time.perf_counter() - submitted)
+        return future
+
+    def _run_callback(self, name, callback, error_callback, future):
+        started = time.perf_counter()
+        try:
+            error = future.exception()
+            if error is not None:
+                print(f"Error in database call {name}: {error}")
+                if error_callback is not None:
+                    error_callback(error)
+            elif callback is not None:
+                callback(future.result())
+        finally:
+            self.stats.record(name, "main_thread", time.perf_counter() - started)
+
+    def shutdown(self, wait=True):
+        self._writer.shutdown(wait=wait)
+        self._readers.shutdown(wait=wait)
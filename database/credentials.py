@@ -0,0 +1,211 @@
+"""Password hashing, login rate limiting and session tokens.
+
+Passwords are stored as self-describing strings so the cost parameters can
+be raised later without breaking existing accounts:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>   (when hashlib lacks scrypt)
+
+Hashing is deliberately slow, so callers on the UI thread should run
+Authenticator.authenticate / register on a worker thread.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Tunable cost parameters; raising them makes needs_rehash() true for old hashes
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 200_000
+SALT_BYTES = 16
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _unb64(text):
+    return base64.b64decode(text.encode("ascii"))
+
+
+def hash_password(password, salt=None):
+    """Return a salted, encoded hash of `password`."""
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    if HAS_SCRYPT:
+        digest = hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, maxmem=64 * 1024 * 1024
+        )
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+
+def verify_password(password, stored):
+    """Check `password` against a stored hash (or a legacy plaintext value)."""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        # Rows written before hashing existed store the password as-is
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt":
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, expected = _unb64(parts[4]), _unb64(parts[5])
+            digest = hashlib.scrypt(
+                password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=64 * 1024 * 1024
+            )
+        else:
+            iterations = int(parts[1])
+            salt, expected = _unb64(parts[2]), _unb64(parts[3])
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    except (IndexError, ValueError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored):
+    """True when `stored` is plaintext or uses weaker parameters than the current ones."""
+    if not is_hashed(stored):
+        return True
+    parts = stored.split("$")
+    if HAS_SCRYPT:
+        return parts[0] != "scrypt" or parts[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return parts[0] != "pbkdf2_sha256" or int(parts[1]) < PBKDF2_ITERATIONS
+
+
+class RateLimiter:
+    """Allow at most `max_attempts` failed logins per username within `window` seconds."""
+
+    def __init__(self, max_attempts=5, window=60, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.clock = clock
+        self._failures = {}  # username -> deque of failure timestamps
+        self._lock = threading.Lock()
+
+    def allow(self, username):
+        with self._lock:
+            failures = self._failures.get(username)
+            if not failures:
+                return True
+            cutoff = self.clock() - self.window
+            while failures and failures[0] < cutoff:
+                failures.popleft()
+            return len(failures) < self.max_attempts
+
+    def record_failure(self, username):
+        with self._lock:
+            self._failures.setdefault(username, deque()).append(self.clock())
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+class SessionCache:
+    """In-memory session tokens and recently verified credentials.
+
+    Verified credentials are kept only as an HMAC under a per-process random
+    key, so a repeat login is a dictionary lookup instead of another slow
+    hash, and nothing reusable is left in memory or on disk.
+    """
+
+    def __init__(self, ttl=12 * 3600, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._key = secrets.token_bytes(32)
+        self._sessions = {}  # token -> (user_id, expires_at)
+        self._verified = {}  # username -> (password mac, user_id, expires_at)
+        self._lock = threading.Lock()
+
+    def _mac(self, password):
+        return hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def issue(self, user_id):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (user_id, self.clock() + self.ttl)
+        return token
+
+    def user_for_token(self, token):
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None or entry[1] < self.clock():
+                self._sessions.pop(token, None)
+                return None
+            return entry[0]
+
+    def revoke(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def remember(self, username, password, user_id):
+        with self._lock:
+            self._verified[username] = (self._mac(password), user_id, self.clock() + self.ttl)
+
+    def lookup(self, username, password):
+        """Return the cached user_id if these credentials were verified recently."""
+        with self._lock:
+            entry = self._verified.get(username)
+        if entry is None or entry[2] < self.clock():
+            return None
+        if hmac.compare_digest(entry[0], self._mac(password)):
+            return entry[1]
+        return None
+
+    def forget(self, username):
+        with self._lock:
+            self._verified.pop(username, None)
+
+
+class Authenticator:
+    """Login and registration on top of DatabaseHandler with rate limiting and caching."""
+
+    def __init__(self, db_handler, rate_limiter=None, sessions=None):
+        self.db_handler = db_handler
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.sessions = sessions or SessionCache()
+
+    def authenticate(self, username, password):
+        """
+        Return (user_id, token, error). On success error is None; otherwise
+        user_id and token are None and error is a message for the user.
+        """
+        if not self.rate_limiter.allow(username):
+            return None, None, "Too many failed attempts. Try again in a minute."
+
+        user_id = self.sessions.lookup(username, password)
+        if user_id is None:
+            user_id = self.db_handler.validate_user(username, password)
+        if user_id is None:
+            self.rate_limiter.record_failure(username)
+            return None, None, "Invalid username or password"
+
+        self.rate_limiter.reset(username)
+        self.sessions.remember(username, password, user_id)
+        return user_id, self.sessions.issue(user_id), None
+
+    def register(self, username, password):
+        """Return (user_id, error)."""
+        try:
+            user_id = self.db_handler.register_user(username, password)
+        except sqlite3.Error as e:
+            print(f"Error registering user: {e}")
+            return None, "Registration failed. Please try again."
+        if user_id is None:
+            return None, "Username already taken"
+        return user_id, None
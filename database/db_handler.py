@@ -1,81 +1,128 @@
+import os
+import re
+import socket
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+from database.connection_pool import ConnectionPool
+from database.credentials import hash_password, needs_rehash, verify_password
+from database.migrations import migrate
+from database.models import HISTORY_SELECT, TASK_COLUMNS, TASK_SELECT, HistoryEntry, Task, columnar
+from database.recurrence import advance, normalize_rule
+from database.timestamps import (
+    DATE_TIME_FORMAT, LocalEpochs, day_bounds, epoch_of, format_local, local_naive, parse_local, to_epoch
+)
+
+BULK_CHUNK = 500  # Task IDs per IN (...) list, below SQLite's variable limit
+SEARCH_TOKEN = re.compile(r"\w+")  # Words of a search query, as FTS5's unicode61 tokenizer sees them
+
+# Row values sent by export_changes; the owner travels as a username because user IDs differ between databases
+SYNC_TASK_FIELDS = (
+    "username", "description", "task_date", "task_time", "notify_date_time", "status", "recurrence", "due_at",
+    "notify_at"
+)
+SYNC_HISTORY_FIELDS = ("username", "description", "task_date", "task_time", "completion_date", "completed_at")
+SYNC_OPERATIONS = {("task", "upsert"), ("task", "delete"), ("history", "upsert")}
+# Journal entries of one origin stamped after a given Lamport time, with the row as it is now
+SYNC_TASK_QUERY = '''
+    SELECT j.uid, j.op, j.lamport, users.uid, users.password, users.username, t.description, t.task_date, t.task_time,
+           t.notify_date_time, t.status, t.recurrence, t.due_at, t.notify_at
+    FROM change_journal j
+    LEFT JOIN tasks t ON t.uid = j.uid
+    LEFT JOIN users ON users.id = t.user_id
+    WHERE j.origin = ? AND j.lamport > ? AND j.entity = 'task'
+'''
+SYNC_HISTORY_QUERY = '''
+    SELECT j.uid, j.op, j.lamport, users.uid, users.password, users.username, h.description, h.task_date, h.task_time,
+           h.completion_date, h.completed_at
+    FROM change_journal j
+    LEFT JOIN history h ON h.uid = j.uid
+    LEFT JOIN users ON users.id = h.user_id
+    WHERE j.origin = ? AND j.lamport > ? AND j.entity = 'history'
+'''
+
 
 class DatabaseHandler:
+    # Database files already migrated by this process (path -> SQLite schema cookie);
+    # the migration checks only run again if the file's schema changed underneath us
+    _migrated = {}
+    _migrated_lock = threading.Lock()
+
     def __init__(self, db_name="database/database.db"):
         self.db_name = db_name
+        self.pool = ConnectionPool(db_name)
         self.create_tables()
 
     def create_connection(self):
-        """Create and return a database connection."""
-        return sqlite3.connect(self.db_name)
-
-    def create_tables(self):
-        """Create the necessary tables: users, tasks, and history."""
-        try:
-            with self.create_connection() as conn:
-                cursor = conn.cursor()
-
-                # Create Users table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL,
-                        password TEXT NOT NULL
-                    )
-                ''')
-
-                # Create Tasks table with the notify_date_time column
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS tasks (
-                        task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        description TEXT NOT NULL,
-                        task_date TEXT NOT NULL,
-                        task_time TEXT NOT NULL,
-                        notify_date_time TEXT, -- New column for notifications
-                        status TEXT NOT NULL,
-                        FOREIGN KEY (user_id) REFERENCES users (id)
-                    )
-                ''')
+        """Return this thread's persistent database connection from the pool."""
+        return self.pool.get_connection()
 
-                # Create History table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS history (
-                        history_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        description TEXT NOT NULL,
-                        task_date TEXT NOT NULL,
-                        task_time TEXT NOT NULL,
-                        completion_date TEXT NOT NULL,
-                        FOREIGN KEY (user_id) REFERENCES users (id)
-                    )
-                ''')
+    def pool_stats(self):
+        """Return connection pool usage counters."""
+        return self.pool.stats()
 
-                # Check and add `notify_date_time` column if it doesn't exist
-                cursor.execute("PRAGMA table_info(tasks)")
-                columns = [column[1] for column in cursor.fetchall()]
-                if 'notify_date_time' not in columns:
-                    cursor.execute("ALTER TABLE tasks ADD COLUMN notify_date_time TEXT")
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.close_all()
 
-                conn.commit()
+    def create_tables(self):
+        """Bring the schema up to date by applying pending migrations (once per process)."""
+        try:
+            conn = self.create_connection()
+            key = None if self.db_name == ":memory:" else os.path.abspath(self.db_name)
+            with DatabaseHandler._migrated_lock:
+                # PRAGMA schema_version reads the file header, so this check is nearly free
+                cookie = conn.execute("PRAGMA schema_version").fetchone()[0]
+                if key is not None and DatabaseHandler._migrated.get(key) == cookie:
+                    return
+                migrate(conn)
+                self._claim_sync_origin(conn)
+                if key is not None:
+                    DatabaseHandler._migrated[key] = conn.execute("PRAGMA schema_version").fetchone()[0]
         except sqlite3.Error as e:
             print(f"Error creating tables: {e}")
 
+    def _claim_sync_origin(self, conn):
+        """
+        Give this file its own sync origin the first time it is opened here.
+
+        A database copied to another machine (or path) would otherwise stamp
+        its changes with the same origin as the original. The old origin stays
+        in sync_peers with its last stamp, so its changes are still exported.
+        """
+        home = f"{socket.gethostname()}:{os.path.abspath(self.db_name)}"
+        with conn:
+            if conn.execute('SELECT 1 FROM sync_state WHERE home IS ?', (home,)).fetchone():
+                return
+            conn.execute('''
+                INSERT INTO sync_peers (origin, lamport) SELECT origin, lamport FROM sync_state WHERE true
+                ON CONFLICT (origin) DO UPDATE SET lamport = MAX(lamport, excluded.lamport)
+            ''')
+            conn.execute('UPDATE sync_state SET origin = lower(hex(randomblob(8))), home = ?', (home,))
+
     # User Management Methods
     def register_user(self, username, password):
-        """Register a new user."""
+        """
+        Register a new user with a salted password hash.
+
+        Returns the user ID, or None if the username is taken. Other database
+        errors are raised, so callers can tell them apart from a taken name.
+        """
         try:
+            password_hash = hash_password(password)
             with self.create_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'INSERT INTO users (username, password) VALUES (?, ?)',
-                    (username, password)
+                    (username, password_hash)
                 )
                 conn.commit()
-        except sqlite3.Error as e:
-            print(f"Error registering user: {e}")
+                return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            print(f"Error registering user: username {username!r} is already taken")
+        return None
 
     def validate_user(self, username, password):
         """Validate user credentials."""
@@ -83,23 +130,34 @@ class DatabaseHandler:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    'SELECT id FROM users WHERE username = ? AND password = ?',
-                    (username, password)
+                    'SELECT id, password FROM users WHERE username = ?',
+                    (username,)
                 )
                 result = cursor.fetchone()
-                return result[0] if result else None  # Return user ID if valid, else None
+                if not result or not verify_password(password, result[1]):
+                    return None
+
+                # Upgrade plaintext or outdated hashes while we know the password
+                if needs_rehash(result[1]):
+                    cursor.execute(
+                        'UPDATE users SET password = ? WHERE id = ?',
+                        (hash_password(password), result[0])
+                    )
+                    conn.commit()
+                return result[0]  # Return user ID if valid, else None
         except sqlite3.Error as e:
             print(f"Error validating user: {e}")
         return None
 
     # Task Management Methods
     def get_user_tasks(self, user_id):
-        """Retrieve all tasks for a given user."""
+        """Retrieve all tasks for a given user as Task objects."""
         try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = Task.from_row
                 cursor.execute(
-                    'SELECT * FROM tasks WHERE user_id = ?',
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ?',
                     (user_id,)
                 )
                 return cursor.fetchall()  # Returns a list of tasks
@@ -107,49 +165,110 @@ class DatabaseHandler:
             print(f"Error fetching tasks: {e}")
             return []
 
-    def add_task_with_notification(self, user_id, description, task_date, task_time):
+    def get_user_tasks_page(self, user_id, after_key=None, limit=50):
+        """Retrieve up to `limit` tasks with task_id greater than `after_key` (keyset paging)."""
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Task.from_row
+                cursor.execute(
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ? AND task_id > ? ORDER BY task_id LIMIT ?',
+                    (user_id, after_key or 0, limit)
+                )
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching task page: {e}")
+            return []
+
+    def get_task(self, task_id):
+        """Retrieve a single Task by its ID, or None if it no longer exists."""
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Task.from_row
+                cursor.execute(
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE task_id = ?',
+                    (task_id,)
+                )
+                return cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Error fetching task: {e}")
+            return None
+
+    def add_task_with_notification(self, user_id, description, task_date, task_time, recurrence=None):
         """
         Add a new task and automatically set the notify_date_time
         based on the given task_date and task_time.
+
+        `recurrence` is an optional rule (see database.recurrence) that makes
+        the task repeat; the row then always holds its next occurrence.
         """
         try:
-            # Combine task_date and task_time into notify_date_time
-            notify_date_time = f"{task_date} {task_time}"
-            notify_date_time = datetime.strptime(notify_date_time, "%Y-%m-%d %H:%M").strftime("%Y-%m-%d %H:%M")
-
-            # Validate the combined datetime format
-            datetime.strptime(notify_date_time, "%Y-%m-%d %H:%M")
+            # Parse once: validates the format and gives the due instant
+            start = parse_local(task_date, task_time)
+            notify_date_time = start.strftime(DATE_TIME_FORMAT)
+            due_at = to_epoch(start)
+        except ValueError:
+            print("Error: Invalid date or time format. Please use 'YYYY-MM-DD' for date and 'HH:MM' for time.")
+            return None
+        try:
+            recurrence = normalize_rule(recurrence, start)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
 
+        try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (user_id, description, task_date, task_time, notify_date_time, 'Pending'))
+                    INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status,
+                                       recurrence, due_at, notify_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (user_id, description, task_date, task_time, notify_date_time, 'Pending',
+                      recurrence, due_at, due_at))
                 conn.commit()
                 print("Task with notification added successfully.")
-        except ValueError:
-            print("Error: Invalid date or time format. Please use 'YYYY-MM-DD' for date and 'HH:MM' for time.")
+                return cursor.lastrowid
         except sqlite3.Error as e:
             print(f"Error adding task with notification: {e}")
+        return None
 
-    def add_task(self, user_id, description, task_date, task_time):
+    def add_task(self, user_id, description, task_date, task_time, recurrence=None):
         """
         Add a new task and delegate to `add_task_with_notification` for consistent behavior.
         """
-        self.add_task_with_notification(user_id, description, task_date, task_time)
+        return self.add_task_with_notification(user_id, description, task_date, task_time, recurrence)
 
-    def edit_task(self, task_id, description, task_date, task_time):
-        """Edit an existing task."""
+    def edit_task(self, task_id, description, task_date, task_time, recurrence=None):
+        """
+        Edit an existing task.
+
+        If the due time changed, the reminder is re-armed for the new time.
+        `recurrence` None keeps the current rule; an empty string or "none"
+        stops the task from repeating.
+        """
         try:
+            start = parse_local(task_date, task_time)
+            due_at = to_epoch(start)
             with self.create_connection() as conn:
                 cursor = conn.cursor()
+                # Right-hand sides see the old row, so "due_at IS ?" means "time unchanged"
                 cursor.execute('''
                     UPDATE tasks 
-                    SET description = ?, task_date = ?, task_time = ? 
+                    SET description = ?, task_date = ?, task_time = ?, due_at = ?,
+                        notify_at = CASE WHEN due_at IS ? THEN notify_at ELSE ? END,
+                        notify_date_time = CASE WHEN due_at IS ? THEN notify_date_time ELSE ? END
                     WHERE task_id = ?
-                ''', (description, task_date, task_time, task_id))
+                ''', (description, task_date, task_time, due_at,
+                      due_at, due_at, due_at, start.strftime(DATE_TIME_FORMAT), task_id))
+                if recurrence is not None:
+                    cursor.execute(
+                        'UPDATE tasks SET recurrence = ? WHERE task_id = ?',
+                        (normalize_rule(recurrence, start), task_id)
+                    )
                 conn.commit()
+        except ValueError as e:
+            print(f"Error editing task: {e}")
         except sqlite3.Error as e:
             print(f"Error editing task: {e}")
 
@@ -167,81 +286,798 @@ class DatabaseHandler:
             print(f"Error deleting task: {e}")
 
     def mark_task_done(self, task_id):
-        """Mark a task as completed and move it to the history table."""
+        """
+        Mark a task as completed and move it to the history table.
+
+        A repeating task stays in the tasks table and moves on to its next
+        occurrence after both its current due time and now.
+        """
+        self.mark_tasks_done([task_id])
+
+    def mark_tasks_done(self, task_ids):
+        """
+        Complete many tasks in one transaction. Returns the number completed.
+
+        Plain tasks leave the tasks table through one DELETE ... RETURNING per
+        chunk, whose rows go straight into history; only repeating tasks are
+        read first, to work out their next occurrence. History rows get the
+        completion instant (completed_at, UTC epoch seconds) and its UTC day.
+        """
+        task_ids = list(dict.fromkeys(task_ids))  # Drop duplicates, keep order
+        completed_at = int(time.time())
+        completion_date = time.strftime("%Y-%m-%d", time.gmtime(completed_at))
         try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
+                completed = []  # (user_id, description, task_date, task_time)
+                moves = []
+                ended = []  # Repeating tasks whose rule has no further occurrence
+                now = datetime.now()
+                for start in range(0, len(task_ids), BULK_CHUNK):
+                    chunk = task_ids[start:start + BULK_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(f'''
+                        DELETE FROM tasks WHERE task_id IN ({placeholders}) AND recurrence IS NULL
+                        RETURNING user_id, description, task_date, task_time
+                    ''', chunk)
+                    deleted = cursor.fetchall()
+                    completed.extend(deleted)
+                    if len(deleted) == len(chunk):
+                        continue  # No repeating (or missing) tasks in this chunk
 
-                # Retrieve the task
-                cursor.execute('''
-                    SELECT user_id, description, task_date, task_time 
-                    FROM tasks WHERE task_id = ?
-                ''', (task_id,))
-                task = cursor.fetchone()
+                    cursor.execute(f'''
+                        SELECT task_id, user_id, description, task_date, task_time, recurrence FROM tasks
+                        WHERE task_id IN ({placeholders})
+                    ''', chunk)
+                    for task_id, user_id, description, task_date, task_time, recurrence in cursor.fetchall():
+                        completed.append((user_id, description, task_date, task_time))
+                        try:
+                            following = advance(recurrence, task_date, task_time, now)
+                        except ValueError as e:
+                            # A rule stored before it was validated: complete the task once, like a one-shot
+                            print(f"Error: task {task_id} has an invalid repeat rule ({e}); it will not repeat")
+                            following = None
+                        if following:
+                            moves.append((task_id, *following))
+                        else:
+                            ended.append((task_id,))
 
-                if task:
-                    user_id, description, task_date, task_time = task
+                cursor.executemany('''
+                    INSERT INTO history (user_id, description, task_date, task_time, completion_date, completed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(*row, completion_date, completed_at) for row in completed])
 
-                    # Insert into history
-                    cursor.execute('''
-                        INSERT INTO history (user_id, description, task_date, task_time, completion_date)
-                        VALUES (?, ?, ?, ?, DATE('now'))
-                    ''', (user_id, description, task_date, task_time))
+                # Keep the per-day and per-week completion counters current
+                per_user = {}
+                for user_id, _, _, _ in completed:
+                    per_user[user_id] = per_user.get(user_id, 0) + 1
+                for user_id, count in per_user.items():
+                    self._count_completions(cursor, user_id, count, completion_date)
 
-                    # Delete the task
-                    cursor.execute(
-                        'DELETE FROM tasks WHERE task_id = ?',
-                        (task_id,)
+                # Repeating tasks: move the same row on to its next occurrence
+                self._move_to_occurrences(cursor, moves)
+                cursor.executemany('DELETE FROM tasks WHERE task_id = ?', ended)
+            return len(completed)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error marking tasks as done: {e}")
+            return 0
+
+    def _move_to_occurrences(self, cursor, moves):
+        """Apply (task_id, task_date, task_time) moves of repeating tasks; reminders follow."""
+        rows = []
+        for task_id, task_date, task_time in moves:
+            due_at = epoch_of(task_date, task_time)
+            rows.append((task_date, task_time, f"{task_date} {task_time}", due_at, due_at, task_id))
+        cursor.executemany('''
+            UPDATE tasks
+            SET task_date = ?, task_time = ?, notify_date_time = ?, due_at = ?, notify_at = ?
+            WHERE task_id = ?
+        ''', rows)
+
+    def _count_completions(self, cursor, user_id, count, day=None):
+        """Add `count` completions on `day` (default: today) to the history aggregate tables."""
+        cursor.execute('''
+            INSERT INTO history_daily_counts (user_id, day, completed)
+            VALUES (?, COALESCE(?, DATE('now')), ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET completed = completed + excluded.completed
+        ''', (user_id, day, count))
+        cursor.execute('''
+            INSERT INTO history_weekly_counts (user_id, week, completed)
+            VALUES (?, strftime('%Y-W%W', COALESCE(?, 'now')), ?)
+            ON CONFLICT (user_id, week) DO UPDATE SET completed = completed + excluded.completed
+        ''', (user_id, day, count))
+
+    # Bulk Operations
+    def bulk_add_tasks(self, tasks):
+        """
+        Insert many (user_id, description, task_date, task_time[, recurrence]) rows
+        in one transaction.
+
+        Rows must already be validated (see database.import_export.validate_batch).
+        Returns the number of tasks inserted.
+        """
+        rows = []
+        epoch = LocalEpochs()  # Converts each distinct date once instead of parsing every row
+        try:
+            for user_id, description, task_date, task_time, *rest in tasks:
+                recurrence = rest[0] if rest else None
+                due_at = epoch(task_date, task_time)
+                if recurrence:
+                    # Weekly/monthly rules are pinned to the start's weekday or day
+                    recurrence = normalize_rule(recurrence, parse_local(task_date, task_time))
+                else:
+                    recurrence = None  # '' is stored as NULL, like add_task does
+                rows.append((
+                    user_id, description, task_date, task_time, f"{task_date} {task_time}", 'Pending',
+                    recurrence, due_at, due_at
+                ))
+        except ValueError as e:
+            print(f"Error adding tasks in bulk: {e}")
+            return 0
+        try:
+            with self.create_connection() as conn:
+                conn.executemany('''
+                    INSERT INTO tasks (user_id, description, task_date, task_time, notify_date_time, status,
+                                       recurrence, due_at, notify_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+            return len(rows)
+        except sqlite3.Error as e:
+            print(f"Error adding tasks in bulk: {e}")
+            return 0
+
+    def bulk_mark_done(self, task_ids):
+        """Same as mark_tasks_done (kept for existing callers)."""
+        return self.mark_tasks_done(task_ids)
+
+    def bulk_add_history(self, entries):
+        """
+        Insert many (user_id, description, task_date, task_time, completion_date[, completed_at])
+        history rows in one transaction, updating the completion counters.
+
+        Without completed_at, midnight UTC of completion_date is recorded.
+        """
+        entries = [
+            (user_id, description, task_date, task_time, completion_date, rest[0] if rest else None)
+            for user_id, description, task_date, task_time, completion_date, *rest in entries
+        ]
+        per_day = {}
+        for user_id, _, _, _, completion_date, _ in entries:
+            per_day[(user_id, completion_date)] = per_day.get((user_id, completion_date), 0) + 1
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO history (user_id, description, task_date, task_time, completion_date, completed_at)
+                    VALUES (?1, ?2, ?3, ?4, ?5, COALESCE(?6, CAST(strftime('%s', ?5) AS INTEGER)))
+                ''', entries)
+                for (user_id, day), count in per_day.items():
+                    self._count_completions(cursor, user_id, count, day)
+            return len(entries)
+        except sqlite3.Error as e:
+            print(f"Error adding history in bulk: {e}")
+            return 0
+
+    def iter_tasks(self, user_id=None, batch_size=1000):
+        """Yield task rows as TASK_COLUMNS tuples (optionally for one user) without loading them all at once."""
+        query = f'SELECT {TASK_SELECT} FROM tasks'
+        params = ()
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params = (user_id,)
+        yield from self._iter_rows(query + ' ORDER BY task_id', params, batch_size)
+
+    def iter_history(self, user_id=None, batch_size=1000):
+        """Yield history rows as HISTORY_COLUMNS tuples (optionally for one user) without loading them all at once."""
+        query = f'SELECT {HISTORY_SELECT} FROM history'
+        params = ()
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params = (user_id,)
+        yield from self._iter_rows(query + ' ORDER BY history_id', params, batch_size)
+
+    def fetch_task_columns(self, user_id=None, columns=TASK_COLUMNS, batch_size=5000):
+        """
+        Fetch tasks column by column: {column: values} in task_id order.
+
+        For large scans (statistics, exports, benchmarks) this keeps one
+        array or list per column instead of an object per row; see
+        database.models.columnar. Only the requested columns are read.
+        The task list does not use it: its pages are Task objects.
+        """
+        unknown = set(columns) - set(TASK_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown task columns: {', '.join(sorted(unknown))}")
+        query = f'SELECT {", ".join(columns)} FROM tasks'
+        params = ()
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params = (user_id,)
+        return columnar(self._iter_rows(query + ' ORDER BY task_id', params, batch_size), columns)
+
+    def _iter_rows(self, query, params, batch_size):
+        # A dedicated cursor so other queries on this connection don't reset it
+        cursor = self.create_connection().cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        except sqlite3.Error as e:
+            print(f"Error streaming rows: {e}")
+        finally:
+            cursor.close()
+
+    # Search
+    def search_tasks(self, user_id, text, limit=50, include_history=True):
+        """
+        Find a user's tasks (and completed tasks) whose description matches `text`.
+
+        Every word of `text` must match, as a prefix, so results narrow while
+        the user types. Returns up to `limit` (kind, item_id, description,
+        task_date, task_time) rows, best match first, where kind is "task" or
+        "history". Uses the task_search FTS5 index, or a LIKE scan when SQLite
+        lacks FTS5.
+        """
+        words = SEARCH_TOKEN.findall(text.lower())
+        if not words:
+            return []
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                if not self._has_search_index(cursor):
+                    return self._search_tasks_like(cursor, user_id, words, limit, include_history)
+
+                # Quote each word so FTS5 operators typed by the user stay plain text
+                match = f'owner:"u{int(user_id)}" AND description:(' + " AND ".join(f'"{word}"*' for word in words) + ")"
+                cursor.execute(f'''
+                    WITH hits AS (
+                        SELECT rowid AS id, bm25(task_search) AS rank
+                        FROM task_search
+                        WHERE task_search MATCH ? {"" if include_history else "AND rowid > 0"}
+                        ORDER BY rank
+                        LIMIT ?
                     )
+                    SELECT 'task', t.task_id, t.description, t.task_date, t.task_time, hits.rank
+                    FROM hits JOIN tasks t ON t.task_id = hits.id
+                    UNION ALL
+                    SELECT 'history', h.history_id, h.description, h.task_date, h.task_time, hits.rank
+                    FROM hits JOIN history h ON h.history_id = -hits.id
+                    ORDER BY 6
+                ''', (match, limit))
+                return [row[:5] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error searching tasks: {e}")
+            return []
 
-                conn.commit()
+    def _has_search_index(self, cursor):
+        """True when the task_search FTS5 table exists (checked once per handler)."""
+        if getattr(self, "_search_index", None) is None:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_search'")
+            self._search_index = cursor.fetchone() is not None
+        return self._search_index
+
+    def _search_tasks_like(self, cursor, user_id, words, limit, include_history):
+        """Fallback search: a LIKE scan over the user's tasks and history."""
+        condition = " AND ".join("description LIKE ?" for _ in words)
+        patterns = [f"%{word}%" for word in words]
+        query = f'''
+            SELECT 'task', task_id, description, task_date, task_time
+            FROM tasks WHERE user_id = ? AND {condition}
+        '''
+        params = [user_id, *patterns]
+        if include_history:
+            query += f'''
+                UNION ALL
+                SELECT 'history', history_id, description, task_date, task_time
+                FROM history WHERE user_id = ? AND {condition}
+            '''
+            params += [user_id, *patterns]
+        cursor.execute(query + " LIMIT ?", (*params, limit))
+        return cursor.fetchall()
+
+    # Due-time queries (integer compares on idx_tasks_user_due)
+    def get_tasks_between(self, user_id, start, end):
+        """
+        Retrieve a user's tasks due in [start, end), earliest first.
+
+        `start`/`end` are epoch seconds, aware datetimes or naive local datetimes.
+        """
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Task.from_row
+                cursor.execute(
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ? AND due_at >= ? AND due_at < ? ORDER BY due_at',
+                    (user_id, to_epoch(start), to_epoch(end))
+                )
+                return cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"Error marking task as done: {e}")
+            print(f"Error fetching tasks in range: {e}")
+            return []
+
+    def get_tasks_due_today(self, user_id, day=None, tz=None):
+        """Retrieve a user's tasks due on the local calendar day `day` (default: today)."""
+        return self.get_tasks_between(user_id, *day_bounds(day, tz))
+
+    def get_overdue_tasks(self, user_id, now=None):
+        """Retrieve a user's tasks whose due time has passed, oldest first."""
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Task.from_row
+                cursor.execute(
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ? AND due_at < ? ORDER BY due_at',
+                    (user_id, to_epoch(now if now is not None else time.time()))
+                )
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching overdue tasks: {e}")
+            return []
 
     # Notification Management
+    # Reminder rows are (task_id, description, notify_at) with notify_at in epoch seconds.
     def fetch_due_notifications(self):
         """Fetch tasks with notifications that are due now."""
         try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
                 query = '''
-                    SELECT task_id, description, notify_date_time
+                    SELECT task_id, description, notify_at
                     FROM tasks
-                    WHERE notify_date_time <= ? AND status = 'Pending'
+                    WHERE notify_at <= ? AND status = 'Pending'
                 '''
-                cursor.execute(query, (current_time,))
+                cursor.execute(query, (int(time.time()),))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error fetching due notifications: {e}")
             return []
 
+    def fetch_pending_notifications(self):
+        """Fetch every pending task that still has a notification scheduled."""
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                query = '''
+                    SELECT task_id, description, notify_at
+                    FROM tasks
+                    WHERE notify_at IS NOT NULL AND status = 'Pending'
+                '''
+                cursor.execute(query)
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching pending notifications: {e}")
+            return []
+
+    def get_task_notification(self, task_id):
+        """Return (task_id, description, notify_at) for a pending task, else None."""
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                query = '''
+                    SELECT task_id, description, notify_at
+                    FROM tasks
+                    WHERE task_id = ? AND notify_at IS NOT NULL AND status = 'Pending'
+                '''
+                cursor.execute(query, (task_id,))
+                return cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Error fetching task notification: {e}")
+            return None
+
+    def claim_due_notifications(self, owner, lease_seconds=120, limit=100, now=None, shard=None):
+        """
+        Atomically lease up to `limit` due reminders for `owner`.
+
+        Rows leased by another process are skipped until their lease expires,
+        so concurrent reminder processes never deliver the same reminder.
+        `shard` = (index, count) restricts the claim to users with
+        user_id % count == index. Returns (task_id, user_id, description,
+        notify_at) rows; pass their IDs to mark_tasks_as_notified once
+        delivered, or to release_notifications to hand them back.
+        """
+        now = int(now if now is not None else time.time())
+        shard_filter = ""
+        params = [owner, now + lease_seconds, now, now]
+        if shard is not None:
+            shard_filter = "AND user_id % ? = ?"
+            params += [shard[1], shard[0]]
+        params.append(limit)
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                # One statement: the row selection and the lease write happen under one write lock
+                cursor.execute(f'''
+                    UPDATE tasks SET lease_owner = ?, lease_until = ?
+                    WHERE task_id IN (
+                        SELECT task_id FROM tasks
+                        WHERE notify_at <= ? AND status = 'Pending'
+                          AND (lease_until IS NULL OR lease_until < ?) {shard_filter}
+                        ORDER BY notify_at
+                        LIMIT ?
+                    )
+                    RETURNING task_id, user_id, description, notify_at
+                ''', params)
+                claimed = cursor.fetchall()
+                conn.commit()
+                return claimed
+        except sqlite3.Error as e:
+            print(f"Error claiming due notifications: {e}")
+            return []
+
+    def claim_notifications(self, owner, task_ids, lease_seconds=120, now=None):
+        """Lease the given reminders if they are due and unclaimed; returns the rows won."""
+        now = int(now if now is not None else time.time())
+        task_ids = list(task_ids)
+        claimed = []
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(task_ids), BULK_CHUNK):
+                    chunk = task_ids[start:start + BULK_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(f'''
+                        UPDATE tasks SET lease_owner = ?, lease_until = ?
+                        WHERE task_id IN ({placeholders}) AND notify_at <= ? AND status = 'Pending'
+                          AND (lease_until IS NULL OR lease_until < ?)
+                        RETURNING task_id, user_id, description, notify_at
+                    ''', (owner, now + lease_seconds, *chunk, now, now))
+                    claimed.extend(cursor.fetchall())
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error claiming notifications: {e}")
+            return []
+        return claimed
+
+    def release_notifications(self, owner, task_ids):
+        """Give back leases (e.g. after a failed delivery) so another process can retry."""
+        try:
+            with self.create_connection() as conn:
+                conn.executemany(
+                    'UPDATE tasks SET lease_owner = NULL, lease_until = NULL WHERE task_id = ? AND lease_owner = ?',
+                    [(task_id, owner) for task_id in task_ids]
+                )
+        except sqlite3.Error as e:
+            print(f"Error releasing notifications: {e}")
+
+    def next_notification_at(self, shard=None):
+        """Earliest pending notify_at (epoch seconds), or None when nothing is scheduled."""
+        query = "SELECT MIN(notify_at) FROM tasks WHERE notify_at IS NOT NULL AND status = 'Pending'"
+        params = ()
+        if shard is not None:
+            query += " AND user_id % ? = ?"
+            params = (shard[1], shard[0])
+        try:
+            with self.create_connection() as conn:
+                return conn.execute(query, params).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error fetching next notification time: {e}")
+            return None
+
     def mark_task_as_notified(self, task_id):
-        """Mark a task as notified by clearing the notify_date_time field."""
+        """Mark a task as notified (a repeating task moves on to its next reminder)."""
+        self.mark_tasks_as_notified([task_id])
+
+    def mark_tasks_as_notified(self, task_ids):
+        """
+        Clear the reminder of a batch of tasks in a single transaction.
+
+        Repeating tasks get the reminder of their next occurrence after now
+        instead. Any lease on the rows is cleared. Returns {task_id: notify_at}
+        for repeating tasks so the caller can push them back onto its heap.
+        """
+        task_ids = list(task_ids)
+        advanced = {}
         try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
+                now = datetime.now()
+                for start in range(0, len(task_ids), BULK_CHUNK):
+                    chunk = task_ids[start:start + BULK_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f'''SELECT task_id, task_date, task_time, notify_at, recurrence FROM tasks
+                            WHERE task_id IN ({placeholders}) AND recurrence IS NOT NULL''',
+                        chunk
+                    )
+                    for task_id, task_date, task_time, notify_at, recurrence in cursor.fetchall():
+                        after = now if notify_at is None else max(now, local_naive(notify_at))
+                        try:
+                            following = advance(recurrence, task_date, task_time, after)
+                        except ValueError as e:
+                            print(f"Error: task {task_id} has an invalid repeat rule ({e}); no further reminders")
+                            continue
+                        if following:
+                            advanced[task_id] = epoch_of(*following)
+
                 query = '''
                     UPDATE tasks
-                    SET notify_date_time = NULL
+                    SET notify_at = ?, notify_date_time = ?, lease_owner = NULL, lease_until = NULL
                     WHERE task_id = ?
                 '''
-                cursor.execute(query, (task_id,))
+                cursor.executemany(query, [
+                    (advanced.get(task_id), format_local(advanced.get(task_id)), task_id) for task_id in task_ids
+                ])
                 conn.commit()
-        except sqlite3.Error as e:
-            print(f"Error marking task as notified: {e}")
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error marking tasks as notified: {e}")
+            return {}
+        return advanced
 
     # History Management Methods
     def get_completed_tasks(self, user_id):
-        """Fetch all completed tasks for a user from the history table."""
+        """Fetch all completed tasks for a user from the history table, as HistoryEntry objects."""
         try:
             with self.create_connection() as conn:
                 cursor = conn.cursor()
-                query = '''
-                    SELECT * FROM history WHERE user_id = ?
+                cursor.row_factory = HistoryEntry.from_row
+                query = f'''
+                    SELECT {HISTORY_SELECT} FROM history WHERE user_id = ?
                 '''
                 cursor.execute(query, (user_id,))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error fetching completed tasks: {e}")
             return []
+
+    def get_completed_tasks_page(self, user_id, before_key=None, limit=50, start_date=None, end_date=None):
+        """
+        Fetch one page of a user's history, newest first.
+
+        `before_key` is the (completion_date, history_id) of the last row of the
+        previous page; `start_date`/`end_date` ('YYYY-MM-DD', inclusive) limit
+        the range. Each page is an index range scan, so its cost does not grow
+        with the size of the history table.
+        """
+        conditions = ['user_id = ?']
+        params = [user_id]
+        if start_date:
+            conditions.append('completion_date >= ?')
+            params.append(start_date)
+        if end_date:
+            conditions.append('completion_date <= ?')
+            params.append(end_date)
+        if before_key:
+            conditions.append('(completion_date, history_id) < (?, ?)')
+            params.extend(before_key)
+        params.append(limit)
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = HistoryEntry.from_row
+                query = f'''
+                    SELECT {HISTORY_SELECT} FROM history
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY completion_date DESC, history_id DESC
+                    LIMIT ?
+                '''
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching completed task page: {e}")
+            return []
+
+    def get_completion_counts(self, user_id, period="day", start=None, end=None):
+        """
+        Return [(day_or_week, completed)] from the pre-aggregated counters.
+
+        `period` is "day" (keys 'YYYY-MM-DD') or "week" (keys 'YYYY-Www');
+        `start`/`end` are inclusive keys in the same format.
+        """
+        table, column = {
+            "day": ("history_daily_counts", "day"),
+            "week": ("history_weekly_counts", "week"),
+        }[period]
+        try:
+            with self.create_connection() as conn:
+                cursor = conn.cursor()
+                query = f'''
+                    SELECT {column}, completed FROM {table}
+                    WHERE user_id = ? AND {column} BETWEEN ? AND ?
+                    ORDER BY {column}
+                '''
+                cursor.execute(query, (user_id, start or "", end or "9999"))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching completion counts: {e}")
+            return []
+
+    def archive_history(self, before_date, archive_path=None):
+        """
+        Move history completed before `before_date` ('YYYY-MM-DD') to cold storage.
+
+        Rows go to the history_archive table, or to a separate SQLite file when
+        `archive_path` is given. The completion counters are left untouched, so
+        statistics still include archived rows. Returns the number of rows moved.
+        """
+        archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self.create_connection()
+        try:
+            target = "history_archive"
+            if archive_path:
+                conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS archive.history_archive (
+                        history_id INTEGER PRIMARY KEY,
+                        user_id INTEGER,
+                        description TEXT NOT NULL,
+                        task_date TEXT NOT NULL,
+                        task_time TEXT NOT NULL,
+                        completion_date TEXT NOT NULL,
+                        archived_at TEXT NOT NULL,
+                        completed_at INTEGER
+                    )
+                ''')
+                # Archive files written before completion times were recorded
+                columns = [column[1] for column in conn.execute("PRAGMA archive.table_info(history_archive)")]
+                if 'completed_at' not in columns:
+                    conn.execute("ALTER TABLE archive.history_archive ADD COLUMN completed_at INTEGER")
+                target = "archive.history_archive"
+
+            with conn:
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO {target}
+                        (history_id, user_id, description, task_date, task_time, completion_date, archived_at,
+                         completed_at)
+                    SELECT history_id, user_id, description, task_date, task_time, completion_date, ?, completed_at
+                    FROM history WHERE completion_date < ?
+                ''', (archived_at, before_date))
+                moved = conn.execute(
+                    'DELETE FROM history WHERE completion_date < ?',
+                    (before_date,)
+                ).rowcount
+            return moved
+        except sqlite3.Error as e:
+            print(f"Error archiving history: {e}")
+            return 0
+        finally:
+            if archive_path:
+                try:
+                    conn.execute("DETACH DATABASE archive")
+                except sqlite3.Error:
+                    pass
+
+    # Sync
+    def sync_clock(self):
+        """Return this database's vector clock: {origin: highest change stamp it has}."""
+        try:
+            conn = self.create_connection()
+            clock = dict(conn.execute('SELECT origin, lamport FROM sync_peers'))
+            origin, lamport = conn.execute('SELECT origin, lamport FROM sync_state').fetchone()
+            clock[origin] = lamport
+            return clock
+        except sqlite3.Error as e:
+            print(f"Error reading sync clock: {e}")
+            return {}
+
+    def export_changes(self, since=None):
+        """
+        Collect the changes a database with vector clock `since` has not seen.
+
+        Only journal entries stamped after `since` (per origin) are read, one
+        index range per origin, so the cost follows the number of changes, not
+        the size of the tables. Each row is sent as it is now. Returns a
+        JSON-ready dict for apply_changes; owners are named by username, and
+        `users` holds each owner's account uid and password hash.
+        """
+        since = since or {}
+        clock = self.sync_clock()
+        changes = []
+        users = {}
+        try:
+            conn = self.create_connection()
+            for origin in clock:
+                for entity, fields, query in (("task", SYNC_TASK_FIELDS, SYNC_TASK_QUERY),
+                                              ("history", SYNC_HISTORY_FIELDS, SYNC_HISTORY_QUERY)):
+                    for uid, op, lamport, user_uid, password, *row in conn.execute(
+                        query, (origin, since.get(origin, 0))
+                    ):
+                        change = {"entity": entity, "uid": uid, "op": op, "lamport": lamport, "origin": origin}
+                        if op == "upsert":
+                            if row[0] is None or row[1] is None:
+                                continue  # Row without an owner, or history archived since (not synced)
+                            change["row"] = dict(zip(fields, row))
+                            users[row[0]] = {"uid": user_uid, "password": password}
+                        changes.append(change)
+        except sqlite3.Error as e:
+            print(f"Error exporting changes: {e}")
+            return None
+        return {"clock": clock, "users": users, "changes": changes}
+
+    def apply_changes(self, bundle):
+        """
+        Apply changes exported by another database, in one transaction.
+
+        Conflicts are settled per row by the (lamport, origin) stamp: the
+        higher stamp wins on both sides, so databases that exchange changes
+        end up the same whichever order they sync in. Users missing here are
+        created with their password hash; a username that belongs to a
+        different account here (another uid) refuses the whole bundle rather
+        than merging two people's tasks. Returns (applied, ignored), or None
+        if the bundle could not be applied (nothing is changed then).
+        """
+        conn = self.create_connection()
+        applied = ignored = 0
+        received = {}  # origin -> highest stamp in the bundle
+        completions = {}  # (user_id, completion_date) -> count
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            # Applied rows keep their original stamps instead of being re-journaled as local edits
+            cursor.execute('UPDATE sync_state SET applying = 1')
+            user_ids = {}
+            for username, user in bundle["users"].items():
+                local = cursor.execute('SELECT id, uid FROM users WHERE username = ?', (username,)).fetchone()
+                if local is None:
+                    cursor.execute(
+                        'INSERT INTO users (username, password, uid) VALUES (?, ?, ?)',
+                        (username, user["password"], user["uid"])
+                    )
+                    user_ids[username] = cursor.lastrowid
+                elif local[1] != user["uid"]:
+                    raise ValueError(f"user {username!r} is a different account in each database; rename one first")
+                else:
+                    user_ids[username] = local[0]
+
+            for change in bundle["changes"]:
+                entity, uid, op = change["entity"], change["uid"], change["op"]
+                stamp = (int(change["lamport"]), change["origin"])
+                if (entity, op) not in SYNC_OPERATIONS:
+                    raise ValueError(f"unknown change {entity} {op}")
+                received[stamp[1]] = max(received.get(stamp[1], 0), stamp[0])
+                local = cursor.execute(
+                    'SELECT lamport, origin FROM change_journal WHERE entity = ? AND uid = ?', (entity, uid)
+                ).fetchone()
+                if local is not None and tuple(local) >= stamp:
+                    ignored += 1
+                    continue
+
+                row = change.get("row")
+                if op == "delete":
+                    cursor.execute('DELETE FROM tasks WHERE uid = ?', (uid,))
+                elif entity == "task":
+                    cursor.execute('''
+                        INSERT INTO tasks (uid, user_id, description, task_date, task_time, notify_date_time,
+                                           status, recurrence, due_at, notify_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (uid) DO UPDATE SET
+                            user_id = excluded.user_id, description = excluded.description,
+                            task_date = excluded.task_date, task_time = excluded.task_time,
+                            notify_date_time = excluded.notify_date_time, status = excluded.status,
+                            recurrence = excluded.recurrence, due_at = excluded.due_at, notify_at = excluded.notify_at
+                    ''', (uid, user_ids[row["username"]], *(row[field] for field in SYNC_TASK_FIELDS[1:])))
+                else:
+                    cursor.execute('''
+                        INSERT INTO history (uid, user_id, description, task_date, task_time, completion_date,
+                                             completed_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (uid) DO NOTHING
+                    ''', (uid, user_ids[row["username"]], *(row[field] for field in SYNC_HISTORY_FIELDS[1:])))
+                    if cursor.rowcount:
+                        key = (user_ids[row["username"]], row["completion_date"])
+                        completions[key] = completions.get(key, 0) + 1
+                cursor.execute(
+                    'INSERT OR REPLACE INTO change_journal (entity, uid, op, lamport, origin) VALUES (?, ?, ?, ?, ?)',
+                    (entity, uid, op, *stamp)
+                )
+                applied += 1
+
+            for (user_id, day), count in completions.items():
+                self._count_completions(cursor, user_id, count, day)
+            own = cursor.execute('SELECT origin FROM sync_state').fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO sync_peers (origin, lamport) VALUES (?, ?)
+                ON CONFLICT (origin) DO UPDATE SET lamport = MAX(lamport, excluded.lamport)
+            ''', [(origin, lamport) for origin, lamport in received.items() if origin != own])
+            # Lamport rule: later local changes must outrank everything seen here
+            cursor.execute(
+                'UPDATE sync_state SET lamport = MAX(lamport, ?), applying = 0', (max(received.values(), default=0),)
+            )
+            conn.commit()
+            return applied, ignored
+        except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+            conn.rollback()
+            print(f"Error applying changes: {e}")
+            return None
@@ -0,0 +1,179 @@
+"""Streaming CSV/JSONL import and export of tasks and history.
+
+Exports walk a database cursor and write one row at a time; imports read the
+file lazily and hand validated batches to DatabaseHandler's bulk APIs, so
+memory use stays constant regardless of file size. The format is chosen from
+the file extension (.csv or .jsonl).
+
+Dates and times are validated per batch: a precompiled pattern checks the
+shape of every row, and each distinct date in the batch is checked against
+the calendar once, instead of calling strptime for every row.
+"""
+import csv
+import json
+import os
+import re
+from datetime import date
+from itertools import islice
+
+from database.recurrence import parse_rule
+
+TASK_FIELDS = (
+    "task_id", "user_id", "description", "task_date", "task_time", "notify_date_time", "status", "recurrence",
+    "due_at", "notify_at"
+)
+HISTORY_FIELDS = (
+    "history_id", "user_id", "description", "task_date", "task_time", "completion_date", "completed_at"
+)
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+TIME_PATTERN = re.compile(r"([01]\d|2[0-3]):[0-5]\d")
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _file_format(path, fmt):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported format {fmt!r}; use 'csv' or 'jsonl'")
+    return fmt
+
+
+def _write_rows(path, fields, rows, fmt):
+    """Write an iterable of row tuples; returns the number written."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(fields, row))))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def _read_records(path, fmt):
+    """Yield one dict per row of a CSV or JSONL file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_batch(records, date_fields=("task_date",), time_fields=("task_time",), require_user_id=False):
+    """
+    Split a batch of dict records into (valid, errors).
+
+    Every record is checked with precompiled patterns; each distinct date in
+    the batch is then checked against the calendar once. `errors` holds
+    (record, reason) pairs.
+    """
+    valid = []
+    errors = []
+    dates_seen = {}
+    for record in records:
+        reason = None
+        if not record.get("description"):
+            reason = "missing description"
+        elif require_user_id and not str(record.get("user_id") or "").isdigit():
+            reason = "invalid user_id"
+        if reason is None and record.get("recurrence"):
+            try:
+                parse_rule(record["recurrence"])
+            except ValueError:
+                reason = "invalid recurrence"
+        if reason is None and record.get("completed_at") and not str(record["completed_at"]).isdigit():
+            reason = "invalid completed_at"
+        for field in time_fields:
+            if reason is None and not TIME_PATTERN.fullmatch(str(record.get(field) or "")):
+                reason = f"invalid {field}"
+        for field in date_fields:
+            if reason is None:
+                value = str(record.get(field) or "")
+                if not DATE_PATTERN.fullmatch(value):
+                    reason = f"invalid {field}"
+                else:
+                    dates_seen.setdefault(value, []).append(record)
+        if reason is None:
+            valid.append(record)
+        else:
+            errors.append((record, reason))
+
+    # Calendar check (e.g. 2024-02-30) once per distinct date
+    bad_ids = set()
+    for value, owners in dates_seen.items():
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            for record in owners:
+                if id(record) not in bad_ids:
+                    bad_ids.add(id(record))
+                    errors.append((record, f"invalid date {value}"))
+    if bad_ids:
+        valid = [record for record in valid if id(record) not in bad_ids]
+    return valid, errors
+
+
+def export_tasks(db_handler, path, user_id=None, fmt=None):
+    """Stream tasks to a CSV/JSONL file. Returns the number of rows written."""
+    return _write_rows(path, TASK_FIELDS, db_handler.iter_tasks(user_id), _file_format(path, fmt))
+
+
+def export_history(db_handler, path, user_id=None, fmt=None):
+    """Stream history rows to a CSV/JSONL file. Returns the number of rows written."""
+    return _write_rows(path, HISTORY_FIELDS, db_handler.iter_history(user_id), _file_format(path, fmt))
+
+
+def import_tasks(db_handler, path, user_id=None, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import tasks from a CSV/JSONL file in batches of `batch_size`.
+
+    `user_id` overrides the user column of the file. Returns
+    (imported, errors) where errors lists (record, reason) pairs.
+    """
+    imported = 0
+    errors = []
+    for batch in _batches(_read_records(path, _file_format(path, fmt)), batch_size):
+        valid, batch_errors = validate_batch(batch, require_user_id=user_id is None)
+        errors.extend(batch_errors)
+        imported += db_handler.bulk_add_tasks(
+            (user_id if user_id is not None else int(record["user_id"]),
+             record["description"], record["task_date"], record["task_time"], record.get("recurrence") or None)
+            for record in valid
+        )
+    return imported, errors
+
+
+def import_history(db_handler, path, user_id=None, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Import history rows from a CSV/JSONL file. Returns (imported, errors)."""
+    imported = 0
+    errors = []
+    for batch in _batches(_read_records(path, _file_format(path, fmt)), batch_size):
+        valid, batch_errors = validate_batch(
+            batch, date_fields=("task_date", "completion_date"), require_user_id=user_id is None
+        )
+        errors.extend(batch_errors)
+        imported += db_handler.bulk_add_history(
+            (user_id if user_id is not None else int(record["user_id"]),
+             record["description"], record["task_date"], record["task_time"], record["completion_date"],
+             int(record["completed_at"]) if record.get("completed_at") else None)
+            for record in valid
+        )
+    return imported, errors
@@ -0,0 +1,329 @@
+"""Backups, vacuum, statistics and WAL checkpoints for the task database.
+
+DatabaseMaintenance works on a DatabaseHandler's file while the app keeps
+using it:
+
+    backup      copies the database with SQLite's online backup API, a few
+                pages per step so writers are only briefly held up. The copy
+                goes to a temporary file, is checked with PRAGMA quick_check
+                and only then renamed into place, so a crash never leaves a
+                broken backup under a real name. The newest KEEP_BACKUPS are kept.
+    vacuum      returns free pages to the file system with incremental_vacuum,
+                a bounded number of pages at a time. Databases created before
+                auto_vacuum was switched on are skipped until converted.
+    convert     switches such a database to incremental auto_vacuum with a
+                full VACUUM. That rewrites the whole file and holds the write
+                lock throughout, so it only runs on request (--convert), with
+                the app closed.
+    analyze     refreshes the query planner statistics with a bounded ANALYZE.
+    checkpoint  copies the WAL back into the database (PRAGMA wal_checkpoint).
+    report      file, WAL and free-page sizes and the plans of the hot queries,
+                flagging any that scan a whole table.
+
+`start()` runs all of them every RUN_INTERVAL seconds on a background
+thread (a backup only when tasks, history or users changed since the last one).
+
+    python -m database.maintenance [database/database.db] [--no-backup] [--convert]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from database.db_handler import DatabaseHandler
+from database.models import HISTORY_SELECT, TASK_SELECT
+from instrumentation import metrics
+
+RUN_INTERVAL = 6 * 60 * 60  # Seconds between maintenance runs
+START_DELAY = 60  # Seconds after start() before the first run, to stay out of the way of startup
+BACKUP_STEP_PAGES = 256  # Pages copied per backup step (1 MiB with 4 KiB pages)
+BACKUP_STEP_PAUSE = 0.005  # Seconds between steps, so other connections can write
+BACKUP_RESTARTS = 3  # Database sizes copied before a stepped backup that keeps restarting is done in one step
+KEEP_BACKUPS = 7
+VACUUM_PAGES = 2000  # Most free pages released per run
+ANALYSIS_LIMIT = 1000  # Rows ANALYZE samples per index (PRAGMA analysis_limit)
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+# Hot queries whose plans each report shows: name -> (sql, example parameters)
+PLAN_QUERIES = {
+    "get_user_tasks": (f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ?', (1,)),
+    "get_completed_tasks": (f'SELECT {HISTORY_SELECT} FROM history WHERE user_id = ?', (1,)),
+    "get_completed_tasks_page": (
+        f'SELECT {HISTORY_SELECT} FROM history WHERE user_id = ? ORDER BY completion_date DESC, history_id DESC '
+        'LIMIT 50', (1,)
+    ),
+    "get_tasks_between": (
+        f'SELECT {TASK_SELECT} FROM tasks WHERE user_id = ? AND due_at >= ? AND due_at < ? ORDER BY due_at',
+        (1, 0, 1)
+    ),
+    "fetch_due_notifications": (
+        "SELECT task_id, description, notify_at FROM tasks WHERE notify_at <= ? AND status = 'Pending'", (0,)
+    ),
+    "export_changes": (
+        "SELECT uid, lamport FROM change_journal WHERE origin = ? AND lamport > ? AND entity = 'task'", ("", 0)
+    ),
+}
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def _fingerprint(conn):
+    """
+    Changes a backup must not miss. Every task and history change bumps the
+    sync Lamport counter (see database.sync); new users add IDs. Maintenance
+    itself (ANALYZE, checkpoints) and reminder deliveries change neither.
+    """
+    return conn.execute('SELECT (SELECT lamport FROM sync_state), (SELECT MAX(id) FROM users)').fetchone()
+
+
+class DatabaseMaintenance:
+    def __init__(self, db_handler, backup_dir=None, keep_backups=KEEP_BACKUPS):
+        self.db_handler = db_handler
+        self.db_path = os.path.abspath(db_handler.db_name)
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(self.db_path), "backups")
+        self.keep_backups = keep_backups
+        self.last_report = None
+        self._lock = threading.Lock()  # One run at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Backups
+    def backup(self, path=None, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+        """Copy the database to `path` (default: a timestamped file in backup_dir). Returns the path."""
+        rotate = path is None
+        if rotate:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            path = os.path.join(self.backup_dir, f"{self._stem()}-{datetime.now():%Y%m%d-%H%M%S}.db")
+        partial = path + ".part"
+        if os.path.exists(partial):
+            os.remove(partial)  # Left by an interrupted backup
+        target = sqlite3.connect(partial)
+        source = self.db_handler.create_connection()
+        copied = [0]
+
+        def progress(status, remaining, total):
+            # A write from another connection restarts the copy; give up stepping if that keeps happening
+            copied[0] += pages
+            if copied[0] > BACKUP_RESTARTS * total:
+                raise _BackupRestarted
+
+        try:
+            try:
+                # Each step holds the source's read lock only while copying `pages` pages
+                source.backup(target, pages=pages, progress=progress, sleep=pause)
+            except _BackupRestarted:
+                # One step reads a single WAL snapshot, which doesn't block writers either
+                source.backup(target)
+            result = target.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                raise sqlite3.DatabaseError(f"backup failed quick_check: {result}")
+            target.execute("PRAGMA journal_mode = DELETE")  # A single self-contained file
+        except BaseException:
+            target.close()
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        target.close()
+        os.replace(partial, path)
+        if rotate:
+            for old in self.backups()[self.keep_backups:]:
+                os.remove(old)
+        return path
+
+    def backups(self):
+        """Backups in backup_dir, newest first."""
+        return sorted(glob.glob(os.path.join(self.backup_dir, f"{self._stem()}-*.db")), reverse=True)
+
+    def _stem(self):
+        return os.path.splitext(os.path.basename(self.db_path))[0]
+
+    def changed_since_backup(self):
+        """True if tasks, history or users changed since the newest backup (or there is none)."""
+        newest = self.backups()
+        if not newest:
+            return True
+        backup = sqlite3.connect(f"file:{newest[0]}?mode=ro", uri=True)
+        try:
+            return _fingerprint(backup) != _fingerprint(self.db_handler.create_connection())
+        except sqlite3.Error:
+            return True  # An older schema or an unreadable backup
+        finally:
+            backup.close()
+
+    # Space and statistics
+    def vacuum(self, max_pages=VACUUM_PAGES):
+        """Release up to `max_pages` free pages to the file system. Returns the number released."""
+        conn = self.db_handler.create_connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0  # Not converted yet; see convert()
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() stops this pragma after its first step (one page); executescript runs it to the end
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def convert(self):
+        """
+        Switch the database to incremental auto_vacuum with a full VACUUM.
+
+        Returns the number of free pages released, or None if it already was.
+        Blocks every writer until done, so don't call it while the app runs.
+        """
+        conn = self.db_handler.create_connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return None
+        # auto_vacuum can only be changed on an existing file by a VACUUM right after setting it
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute("VACUUM")
+        return before
+
+    def analyze(self, limit=ANALYSIS_LIMIT):
+        """Refresh the query planner statistics, sampling at most `limit` rows per index."""
+        conn = self.db_handler.create_connection()
+        conn.execute(f"PRAGMA analysis_limit = {int(limit)}")
+        conn.execute("ANALYZE")
+
+    def checkpoint(self, mode="PASSIVE"):
+        """
+        Copy the WAL into the database file. Returns (busy, wal_pages, checkpointed_pages).
+
+        PASSIVE never waits for readers or writers; TRUNCATE (used at shutdown)
+        waits for them and then empties the WAL file.
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode {mode!r}; use one of {', '.join(CHECKPOINT_MODES)}")
+        return tuple(self.db_handler.create_connection().execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+    def report(self):
+        """Sizes of the database, its WAL and free space, and the plans of PLAN_QUERIES."""
+        conn = self.db_handler.create_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        plans = {}
+        for name, (sql, params) in PLAN_QUERIES.items():
+            try:
+                steps = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            except sqlite3.Error as e:
+                steps = [f"error: {e}"]
+            plans[name] = {
+                "plan": "; ".join(steps),
+                # "SCAN tasks" reads the whole table; "SCAN ... USING INDEX" walks an index instead
+                "full_scan": any(step.startswith("SCAN") and "USING" not in step for step in steps),
+            }
+        wal_path = self.db_path + "-wal"
+        backups = self.backups()
+        return {
+            "db_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "page_size": page_size,
+            "pages": conn.execute("PRAGMA page_count").fetchone()[0],
+            "free_pages": conn.execute("PRAGMA freelist_count").fetchone()[0],
+            "backups": len(backups),
+            "latest_backup": backups[0] if backups else None,
+            "plans": plans,
+        }
+
+    # Scheduling
+    def run(self, backup=True):
+        """Checkpoint, vacuum, analyze and (if anything changed) back up; returns the report."""
+        with self._lock:
+            started = time.perf_counter()
+            summary = {}
+            try:
+                summary["checkpoint"] = self.checkpoint()
+                summary["pages_released"] = self.vacuum()
+                self.analyze()
+                if backup and self.changed_since_backup():
+                    summary["backup"] = self.backup()
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error during database maintenance: {e}")
+                summary["error"] = str(e)
+            try:
+                report = {**summary, **self.report()}
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error reporting database size: {e}")
+                report = summary
+            report["run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.last_report = report
+        if metrics.recorder is not None:
+            metrics.recorder.record("maintenance", **report)
+        print_report(report)
+        return report
+
+    def start(self, interval=RUN_INTERVAL, delay=START_DELAY):
+        """Run maintenance every `interval` seconds on a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval, delay), name="db-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the background thread (a backup in progress finishes its current step first)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self, interval, delay):
+        try:
+            wait = delay
+            while not self._stop.wait(wait):
+                self.run()
+                wait = interval
+        finally:
+            # The connection this thread opened in the pool
+            self.db_handler.pool.close_connection()
+
+
+def print_report(report):
+    print(
+        f"Database maintenance: {report.get('db_bytes', 0) / 1024 / 1024:.1f} MiB, "
+        f"WAL {report.get('wal_bytes', 0) / 1024:.0f} KiB, {report.get('free_pages', 0)} free pages, "
+        f"{report.get('pages_released', 0)} released, {report.get('backups', 0)} backups "
+        f"({report['run_ms']} ms)"
+    )
+    for name, plan in report.get("plans", {}).items():
+        if plan["full_scan"]:
+            print(f"  {name} scans a whole table: {plan['plan']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", nargs="?", default="database/database.db")
+    parser.add_argument("--no-backup", action="store_true")
+    parser.add_argument("--backup-dir")
+    parser.add_argument("--plans", action="store_true", help="print every query plan")
+    parser.add_argument("--convert", action="store_true",
+                        help="switch an older database to incremental vacuum (full VACUUM; close the app first)")
+    args = parser.parse_args()
+
+    db_handler = DatabaseHandler(args.db)
+    maintenance = DatabaseMaintenance(db_handler, backup_dir=args.backup_dir)
+    if args.convert:
+        try:
+            released = maintenance.convert()
+            if released is None:
+                print("Already using incremental vacuum")
+            else:
+                print(f"Converted to incremental vacuum, {released} free pages released")
+        except sqlite3.Error as e:
+            print(f"Error converting database: {e}")
+    report = maintenance.run(backup=not args.no_backup)
+    if report.get("backup"):
+        print(f"Backed up to {report['backup']}")
+    if args.plans:
+        for name, plan in report.get("plans", {}).items():
+            print(f"  {name:26} {plan['plan']}")
+    db_handler.close()
+
+
+if __name__ == "__main__":
+    main()
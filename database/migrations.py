@@ -0,0 +1,431 @@
+"""Versioned schema migrations for the task manager database.
+
+Each migration is a (version, description, function) entry. Migrations are
+applied in order, each inside its own transaction, and the applied version is
+recorded in the schema_version table so every step runs exactly once.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+
+from database.credentials import hash_password, is_hashed
+
+
+def _create_base_tables(cursor):
+    """Create users, tasks and history (the original schema)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            description TEXT NOT NULL,
+            task_date TEXT NOT NULL,
+            task_time TEXT NOT NULL,
+            notify_date_time TEXT,
+            status TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            description TEXT NOT NULL,
+            task_date TEXT NOT NULL,
+            task_time TEXT NOT NULL,
+            completion_date TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Databases created before notifications existed lack this column
+    cursor.execute("PRAGMA table_info(tasks)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'notify_date_time' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN notify_date_time TEXT")
+
+
+def _add_lookup_indexes(cursor):
+    """Index the per-user and due-notification lookups."""
+    # get_user_tasks: WHERE user_id = ? (rowid/task_id is implicitly included)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user_id)")
+
+    # fetch_due_notifications: only pending tasks are ever scanned
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_pending_notify
+        ON tasks (notify_date_time) WHERE status = 'Pending'
+    ''')
+
+    # get_completed_tasks: WHERE user_id = ?, ordered by completion date
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_user_completion
+        ON history (user_id, completion_date)
+    ''')
+
+    cursor.execute("ANALYZE")
+
+
+def _add_history_aggregates(cursor):
+    """Per-day/per-week completion counters and the cold history archive."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_daily_counts (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,          -- YYYY-MM-DD
+            completed INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_weekly_counts (
+            user_id INTEGER NOT NULL,
+            week TEXT NOT NULL,         -- YYYY-Www (Monday-based week number)
+            completed INTEGER NOT NULL,
+            PRIMARY KEY (user_id, week)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_archive (
+            history_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            description TEXT NOT NULL,
+            task_date TEXT NOT NULL,
+            task_time TEXT NOT NULL,
+            completion_date TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_archive_user_completion
+        ON history_archive (user_id, completion_date)
+    ''')
+
+    # Backfill the counters from the history recorded so far
+    cursor.execute('''
+        INSERT OR REPLACE INTO history_daily_counts (user_id, day, completed)
+        SELECT user_id, completion_date, COUNT(*) FROM history
+        GROUP BY user_id, completion_date
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO history_weekly_counts (user_id, week, completed)
+        SELECT user_id, strftime('%Y-W%W', completion_date), COUNT(*) FROM history
+        GROUP BY user_id, strftime('%Y-W%W', completion_date)
+    ''')
+
+
+def _secure_users(cursor):
+    """Make usernames unique and replace plaintext passwords with salted hashes."""
+    # Older versions allowed duplicate usernames. The oldest account keeps the
+    # name; later duplicates are renamed to "name#id" so they can still log in.
+    cursor.execute('''
+        UPDATE users SET username = username || '#' || id
+        WHERE id NOT IN (SELECT MIN(id) FROM users GROUP BY username)
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+
+    cursor.execute("SELECT id, password FROM users")
+    plaintext = [(user_id, password) for user_id, password in cursor.fetchall() if not is_hashed(password)]
+    cursor.executemany(
+        "UPDATE users SET password = ? WHERE id = ?",
+        [(hash_password(password), user_id) for user_id, password in plaintext]
+    )
+
+
+def _add_recurrence(cursor):
+    """Let a task repeat: NULL means a one-shot task (see database.recurrence)."""
+    cursor.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+
+
+def _add_task_search(cursor):
+    """Full-text index over task and history descriptions, kept current by triggers.
+
+    One FTS5 table covers both sources: a task is stored under rowid task_id
+    and a history entry under rowid -history_id. `owner` holds 'u<user_id>'
+    so a user filter is an index lookup rather than a scan of every match.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+                description,
+                owner,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: search falls back to LIKE scans
+        print(f"Full-text search unavailable: {e}")
+        return
+
+    # executescript() would commit the migration's transaction, so one statement at a time
+    for source, key in (("tasks", "task_id"), ("history", "history_id")):
+        sign = "" if source == "tasks" else "-"
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {source}_search_insert AFTER INSERT ON {source} BEGIN
+                INSERT INTO task_search (rowid, description, owner)
+                VALUES ({sign}new.{key}, new.description, 'u' || new.user_id);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {source}_search_update AFTER UPDATE OF description, user_id ON {source} BEGIN
+                DELETE FROM task_search WHERE rowid = {sign}old.{key};
+                INSERT INTO task_search (rowid, description, owner)
+                VALUES ({sign}new.{key}, new.description, 'u' || new.user_id);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {source}_search_delete AFTER DELETE ON {source} BEGIN
+                DELETE FROM task_search WHERE rowid = {sign}old.{key};
+            END
+        ''')
+
+    cursor.execute('''
+        INSERT INTO task_search (rowid, description, owner)
+        SELECT task_id, description, 'u' || user_id FROM tasks
+    ''')
+    cursor.execute('''
+        INSERT INTO task_search (rowid, description, owner)
+        SELECT -history_id, description, 'u' || user_id FROM history
+    ''')
+
+
+def _add_epoch_times(cursor):
+    """Integer UTC epoch columns for due and reminder times, with range indexes.
+
+    due_at/notify_at mirror task_date + task_time and notify_date_time (local
+    wall-clock text) as seconds since the epoch; SQLite's 'utc' modifier does
+    the local-to-UTC conversion for existing rows. Malformed text becomes NULL.
+    """
+    cursor.execute("ALTER TABLE tasks ADD COLUMN due_at INTEGER")
+    cursor.execute("ALTER TABLE tasks ADD COLUMN notify_at INTEGER")
+    cursor.execute('''
+        UPDATE tasks SET
+            due_at = CAST(strftime('%s', task_date || ' ' || task_time, 'utc') AS INTEGER),
+            notify_at = CAST(strftime('%s', notify_date_time, 'utc') AS INTEGER)
+    ''')
+
+    # get_tasks_between / due today / overdue: WHERE user_id = ? AND due_at range.
+    # It also serves WHERE user_id = ?, so the single-column index only cost writes.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_due ON tasks (user_id, due_at)")
+    cursor.execute("DROP INDEX IF EXISTS idx_tasks_user")
+
+    # Reminders now compare integers; the text index is no longer used
+    cursor.execute("DROP INDEX IF EXISTS idx_tasks_pending_notify")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_pending_notify_at
+        ON tasks (notify_at) WHERE status = 'Pending'
+    ''')
+    cursor.execute("ANALYZE")
+
+
+def _add_reminder_leases(cursor):
+    """Lease columns so several reminder processes can share one database.
+
+    A process claims a due reminder by writing its name to lease_owner and an
+    expiry to lease_until (epoch seconds) in one UPDATE; others skip the row
+    until the lease is cleared or has expired.
+    """
+    cursor.execute("ALTER TABLE tasks ADD COLUMN lease_owner TEXT")
+    cursor.execute("ALTER TABLE tasks ADD COLUMN lease_until INTEGER")
+
+
+def _add_completion_times(cursor):
+    """Full completion timestamps (UTC epoch seconds) on history rows.
+
+    completion_date only kept the day. Rows completed before this migration
+    get midnight UTC of that day; the archive table gets the same column.
+    """
+    for table in ("history", "history_archive"):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN completed_at INTEGER")
+        cursor.execute(f"UPDATE {table} SET completed_at = CAST(strftime('%s', completion_date) AS INTEGER)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_user_completed_at
+        ON history (user_id, completed_at)
+    ''')
+    cursor.execute("ANALYZE")
+
+
+def _add_change_journal(cursor):
+    """Stable row IDs and a change journal for syncing databases (see database.sync).
+
+    Every task and history row gets a `uid` that is the same in every copy of
+    the database. Existing rows get a hash of their owner's username and
+    their content, so two databases that hold the same tasks (e.g. copies of
+    one file) agree on them; new rows get a random one.
+
+    Triggers record the latest change of each row in change_journal, stamped
+    with this database's Lamport counter and origin (sync_state). History is
+    only journaled on insert: archiving moves rows locally and is not a change
+    to sync. Reminder deliveries and leases (notify/lease columns) are local
+    too and are not journaled. sync_peers is the vector clock of changes
+    received from other databases.
+    """
+    for table, key, content in (
+        ("tasks", "task_id", "description, task_date, task_time"),
+        ("history", "history_id", "description, task_date, task_time, completion_date"),
+    ):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN uid TEXT")
+        cursor.execute(f'''
+            SELECT {key}, COALESCE(users.username, ''), {content} FROM {table}
+            LEFT JOIN users ON users.id = {table}.user_id
+            ORDER BY {key}
+        ''')
+        seen = {}
+        uids = []
+        for row_id, *values in cursor.fetchall():
+            text = "\0".join(str(value) for value in values)
+            seen[text] = seen.get(text, 0) + 1  # Identical rows are told apart by their order
+            uids.append((hashlib.sha1(f"{table}\0{text}\0{seen[text]}".encode()).hexdigest()[:32], row_id))
+        cursor.executemany(f"UPDATE {table} SET uid = ? WHERE {key} = ?", uids)
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uid ON {table} (uid)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            origin TEXT NOT NULL,       -- This database's name in change stamps
+            home TEXT,                  -- host:path the origin belongs to; a copied file picks a new origin
+            lamport INTEGER NOT NULL,   -- Lamport counter, bumped by every journaled change
+            applying INTEGER NOT NULL   -- 1 while changes from another database are applied (not re-stamped)
+        )
+    ''')
+    cursor.execute("INSERT INTO sync_state VALUES (1, lower(hex(randomblob(8))), NULL, 1, 0)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_journal (
+            entity TEXT NOT NULL,       -- 'task' or 'history'
+            uid TEXT NOT NULL,
+            op TEXT NOT NULL,           -- 'upsert' or 'delete'
+            lamport INTEGER NOT NULL,
+            origin TEXT NOT NULL,
+            PRIMARY KEY (entity, uid)
+        ) WITHOUT ROWID
+    ''')
+    # Delta exports read one lamport range per origin
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_journal_origin ON change_journal (origin, lamport)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            origin TEXT PRIMARY KEY,
+            lamport INTEGER NOT NULL    -- Highest stamp received from (or retired by) this origin
+        ) WITHOUT ROWID
+    ''')
+    # What exists now is the first change of every row
+    for entity, table in (("task", "tasks"), ("history", "history")):
+        cursor.execute(f'''
+            INSERT INTO change_journal (entity, uid, op, lamport, origin)
+            SELECT '{entity}', uid, 'upsert', 1, (SELECT origin FROM sync_state) FROM {table}
+        ''')
+
+    # executescript() would commit the migration's transaction, so one statement at a time
+    stamp = "UPDATE sync_state SET lamport = lamport + 1;"
+    local = "WHEN (SELECT applying FROM sync_state) = 0"
+    for entity, table, key in (("task", "tasks", "task_id"), ("history", "history", "history_id")):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_journal_insert AFTER INSERT ON {table} {local} BEGIN
+                UPDATE {table} SET uid = lower(hex(randomblob(16))) WHERE {key} = new.{key} AND uid IS NULL;
+                {stamp}
+                INSERT OR REPLACE INTO change_journal (entity, uid, op, lamport, origin)
+                SELECT '{entity}', {table}.uid, 'upsert', sync_state.lamport, sync_state.origin
+                FROM {table}, sync_state WHERE {table}.{key} = new.{key};
+            END
+        ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_journal_update
+        AFTER UPDATE OF user_id, description, task_date, task_time, status, recurrence, due_at ON tasks {local}
+        BEGIN
+            {stamp}
+            INSERT OR REPLACE INTO change_journal (entity, uid, op, lamport, origin)
+            SELECT 'task', new.uid, 'upsert', lamport, origin FROM sync_state;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_journal_delete AFTER DELETE ON tasks {local} BEGIN
+            {stamp}
+            INSERT OR REPLACE INTO change_journal (entity, uid, op, lamport, origin)
+            SELECT 'task', old.uid, 'delete', lamport, origin FROM sync_state;
+        END
+    ''')
+
+
+def _add_user_sync_ids(cursor):
+    """A `uid` per account, so sync can tell one account from another that has the same name.
+
+    Existing accounts get a hash of their username and password hash: an
+    account that sync already copied to another database has the same hash
+    there, while two accounts registered separately never do (the salts
+    differ). New accounts get a random one.
+    """
+    cursor.execute("ALTER TABLE users ADD COLUMN uid TEXT")
+    cursor.execute("SELECT id, username, password FROM users")
+    cursor.executemany("UPDATE users SET uid = ? WHERE id = ?", [
+        (hashlib.sha1(f"users\0{username}\0{password}".encode()).hexdigest()[:32], user_id)
+        for user_id, username, password in cursor.fetchall()
+    ])
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_uid ON users (uid)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_uid_insert AFTER INSERT ON users WHEN new.uid IS NULL BEGIN
+            UPDATE users SET uid = lower(hex(randomblob(16))) WHERE id = new.id;
+        END
+    ''')
+
+
+# Append new steps to the end; never renumber or edit an applied migration.
+MIGRATIONS = [
+    (1, "Create base tables", _create_base_tables),
+    (2, "Add task and history lookup indexes", _add_lookup_indexes),
+    (3, "Add history aggregates and archive", _add_history_aggregates),
+    (4, "Unique usernames and hashed passwords", _secure_users),
+    (5, "Add task recurrence rules", _add_recurrence),
+    (6, "Add full-text task search", _add_task_search),
+    (7, "Add epoch due and reminder times", _add_epoch_times),
+    (8, "Add reminder lease columns", _add_reminder_leases),
+    (9, "Add history completion timestamps", _add_completion_times),
+    (10, "Add sync IDs and change journal", _add_change_journal),
+    (11, "Add account sync IDs", _add_user_sync_ids),
+]
+
+
+def current_version(conn):
+    """Return the highest applied schema version (0 for a fresh database)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply every pending migration in order and return the new version."""
+    version = current_version(conn)
+    for step_version, description, step in migrations:
+        if step_version <= version:
+            continue
+        cursor = conn.cursor()
+        # IMMEDIATE takes the write lock up front so two processes starting
+        # together cannot both apply the same step.
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT MAX(version) FROM schema_version")
+            if (cursor.fetchone()[0] or 0) >= step_version:
+                conn.rollback()
+                continue
+            step(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (step_version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = step_version
+    return version
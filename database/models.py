@@ -0,0 +1,128 @@
+"""Row objects for tasks and completed tasks.
+
+Task and HistoryEntry hold one row each in __slots__ (no per-object
+__dict__), so they cost about what a tuple does while being read by name:
+`task.description` instead of `task[2]`. Queries select exactly TASK_COLUMNS
+or HISTORY_COLUMNS, so adding a column to a table (e.g. the reminder lease
+columns) does not change what readers receive.
+
+Set `cursor.row_factory = Task.from_row` to have sqlite3 build them.
+Every app path (task list paging, search, the TaskRepository cache and the
+edit dialog) uses whole Task rows. They save only what SELECT * tuples
+spent on columns readers don't need (leases, sync uid); see
+benchmarks.bench_models.
+
+For large scans outside the UI, `columnar()` gathers the rows into one
+container per column instead: integers in array('q') and repeated strings
+shared. That is where the large savings are, and nothing in the app uses
+it yet.
+"""
+from array import array
+
+TASK_COLUMNS = (
+    "task_id", "user_id", "description", "task_date", "task_time", "notify_date_time", "status", "recurrence",
+    "due_at", "notify_at"
+)
+HISTORY_COLUMNS = (
+    "history_id", "user_id", "description", "task_date", "task_time", "completion_date", "completed_at"
+)
+# Select lists for the queries that build these objects
+TASK_SELECT = ", ".join(TASK_COLUMNS)
+HISTORY_SELECT = ", ".join(HISTORY_COLUMNS)
+
+# Columns that can be stored in array('q') by columnar()
+INTEGER_COLUMNS = {"task_id", "user_id", "due_at", "notify_at", "history_id", "completed_at"}
+# Text columns with few distinct values, whose strings columnar() shares
+SHARED_TEXT_COLUMNS = {"task_date", "task_time", "notify_date_time", "status", "recurrence", "completion_date"}
+
+
+class _Row:
+    """Shared behaviour: compare, iterate and copy by the class's columns."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory."""
+        return cls(*row)
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __iter__(self):
+        return iter(self.astuple())
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    __hash__ = None  # Rows are compared by value but can be replaced, so they are not hashable
+
+    def replace(self, **changes):
+        """Copy with some columns changed."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Task(_Row):
+    __slots__ = TASK_COLUMNS
+
+    def __init__(self, task_id, user_id, description, task_date, task_time, notify_date_time=None,
+                 status="Pending", recurrence=None, due_at=None, notify_at=None):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.description = description
+        self.task_date = task_date  # Local date as entered, 'YYYY-MM-DD'
+        self.task_time = task_time  # Local time as entered, 'HH:MM'
+        self.notify_date_time = notify_date_time
+        self.status = status
+        self.recurrence = recurrence  # Rule text (database.recurrence), None if it does not repeat
+        self.due_at = due_at  # UTC epoch seconds
+        self.notify_at = notify_at  # UTC epoch seconds, None once notified
+
+
+class HistoryEntry(_Row):
+    __slots__ = HISTORY_COLUMNS
+
+    def __init__(self, history_id, user_id, description, task_date, task_time, completion_date, completed_at=None):
+        self.history_id = history_id
+        self.user_id = user_id
+        self.description = description
+        self.task_date = task_date
+        self.task_time = task_time
+        self.completion_date = completion_date  # UTC day, 'YYYY-MM-DD'
+        self.completed_at = completed_at  # UTC epoch seconds
+
+
+def columnar(rows, columns):
+    """
+    Collect an iterable of row tuples into {column: values}.
+
+    Integer columns go into array('q') (8 bytes a value, no int objects)
+    until a NULL shows up, after which that column is a plain list. Values
+    of SHARED_TEXT_COLUMNS are shared between equal strings, so a date or
+    status repeated across rows is stored once.
+    """
+    data = {name: array("q") if name in INTEGER_COLUMNS else [] for name in columns}
+    appends = [data[name].append for name in columns]
+    shared = [name in SHARED_TEXT_COLUMNS for name in columns]
+    seen = {}
+    for row in rows:
+        for index, value in enumerate(row):
+            if shared[index]:
+                value = seen.setdefault(value, value)
+            try:
+                appends[index](value)
+            except TypeError:
+                # NULL in an integer column: switch it to a list
+                name = columns[index]
+                data[name] = list(data[name])
+                data[name].append(value)
+                appends[index] = data[name].append
+    return data
@@ -0,0 +1,235 @@
+"""Recurrence rules for repeating tasks.
+
+A repeating task is stored as a single row: task_date/task_time hold its
+current occurrence and the recurrence column holds the rule. Later
+occurrences are produced lazily by `occurrences()`, so completing or
+notifying a repeating task moves its row to the next date instead of
+materialising a copy per occurrence.
+
+Rules:
+    daily[/N]                    every N days (default 1)
+    weekly[/N][:mon,wed,...]     every N weeks on the given weekdays
+    monthly[/N][:D]              every N months on day D (clamped to the month's end)
+    cron:M H DOM MON DOW         five-field cron expression (Sunday = 0 or 7)
+
+daily/weekly/monthly occurrences keep the time of day of the task.
+Occurrences are naive local wall-clock datetimes, so a 09:00 task stays at
+09:00 across DST changes; convert with database.timestamps for storage.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+
+from database.timestamps import parse_local
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# A cron rule that matches nothing for this many days (e.g. "0 9 30 2 *") ends
+CRON_SEARCH_DAYS = 366 * 5
+
+
+def _cron_field(text, low, high):
+    """Parse one cron field into the set of values it matches."""
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step in {text!r}")
+        if part == "*":
+            first, last = low, high
+        elif "-" in part:
+            first, last = (int(value) for value in part.split("-", 1))
+        else:
+            first = last = int(part)
+        if not low <= first <= last <= high:
+            raise ValueError(f"Cron field {text!r} is outside {low}-{high}")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+def parse_rule(rule):
+    """
+    Parse a rule string into (kind, interval, values).
+
+    `values` is a sorted tuple of weekdays (0 = Monday) for weekly rules, the
+    day of month (or None) for monthly rules and the parsed fields for cron
+    rules. Raises ValueError for anything that is not a valid rule.
+    """
+    rule = (rule or "").strip().lower()
+    if rule.startswith("cron:"):
+        fields = rule[5:].split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron rule needs 5 fields: {rule!r}")
+        minutes = _cron_field(fields[0], 0, 59)
+        hours = _cron_field(fields[1], 0, 23)
+        days = _cron_field(fields[2], 1, 31)
+        months = _cron_field(fields[3], 1, 12)
+        weekdays = {day % 7 for day in _cron_field(fields[4], 0, 7)}
+        # Standard cron: when both day fields are restricted, either may match
+        return "cron", 1, (
+            sorted(minutes), sorted(hours), days, months, weekdays, fields[2] == "*", fields[4] == "*"
+        )
+
+    head, _, arguments = rule.partition(":")
+    kind, _, interval_text = head.partition("/")
+    try:
+        interval = int(interval_text) if interval_text else 1
+    except ValueError:
+        raise ValueError(f"Invalid interval in rule {rule!r}")
+    if interval < 1:
+        raise ValueError(f"Invalid interval in rule {rule!r}")
+
+    if kind == "daily" and not arguments:
+        return kind, interval, None
+    if kind == "weekly":
+        if not arguments:
+            return kind, interval, ()
+        try:
+            days = tuple(sorted({WEEKDAYS.index(day.strip()[:3]) for day in arguments.split(",")}))
+        except ValueError:
+            raise ValueError(f"Invalid weekday in rule {rule!r}")
+        return kind, interval, days
+    if kind == "monthly":
+        if not arguments:
+            return kind, interval, None
+        if not arguments.isdigit() or not 1 <= int(arguments) <= 31:
+            raise ValueError(f"Invalid day of month in rule {rule!r}")
+        return kind, interval, int(arguments)
+    raise ValueError(f"Unknown recurrence rule {rule!r}")
+
+
+def normalize_rule(rule, start):
+    """
+    Return the canonical form of `rule` for a task first due at `start`, or
+    None for "does not repeat".
+
+    Weekly and monthly rules without arguments are pinned to the weekday/day
+    of `start`, so a monthly task created on the 31st stays on the last day
+    of shorter months instead of drifting to the 28th.
+    """
+    if not rule or rule.strip().lower() in ("none", "never"):
+        return None
+    kind, interval, values = parse_rule(rule)
+    if kind == "cron":
+        return rule.strip().lower()
+    prefix = kind if interval == 1 else f"{kind}/{interval}"
+    if kind == "weekly":
+        days = values or (start.weekday(),)
+        return f"{prefix}:{','.join(WEEKDAYS[day] for day in days)}"
+    if kind == "monthly":
+        return f"{prefix}:{values or start.day}"
+    return prefix
+
+
+def occurrences(rule, start, after=None):
+    """
+    Yield the occurrences of `rule` from `start` onwards, in order and lazily.
+
+    Only occurrences strictly later than `after` are produced; the generator
+    jumps straight to that point rather than stepping through every earlier
+    occurrence. It is infinite unless the rule can never match again.
+    """
+    kind, interval, values = parse_rule(rule)
+    if after is None or after < start:
+        after = start - timedelta(microseconds=1)
+
+    if kind == "daily":
+        step = timedelta(days=interval)
+        k = (after - start) // step + 1 if after >= start else 0
+        while True:
+            yield start + k * step
+            k += 1
+
+    elif kind == "weekly":
+        days = values or (start.weekday(),)
+        monday = start.date() - timedelta(days=start.weekday())
+        week = max(0, (after.date() - monday).days // 7 // interval * interval)
+        while True:
+            for day in days:
+                occurrence = datetime.combine(monday + timedelta(weeks=week, days=day), start.time())
+                if occurrence >= start and occurrence > after:
+                    yield occurrence
+            week += interval
+
+    elif kind == "monthly":
+        day_of_month = values or start.day
+        months = (after.year - start.year) * 12 + after.month - start.month
+        month = max(0, months // interval * interval)
+        while True:
+            year, month_index = divmod(start.month - 1 + month, 12)
+            year += start.year
+            last_day = calendar.monthrange(year, month_index + 1)[1]
+            occurrence = datetime.combine(date(year, month_index + 1, min(day_of_month, last_day)), start.time())
+            if occurrence >= start and occurrence > after:
+                yield occurrence
+            month += interval
+
+    else:
+        minutes, hours, days, months, weekdays, any_day, any_weekday = values
+        day = max(start, after).date()
+        misses = 0
+        while misses < CRON_SEARCH_DAYS:
+            cron_weekday = (day.weekday() + 1) % 7
+            if any_day and any_weekday:
+                day_matches = True
+            elif any_day:
+                day_matches = cron_weekday in weekdays
+            elif any_weekday:
+                day_matches = day.day in days
+            else:
+                day_matches = day.day in days or cron_weekday in weekdays
+            matched = False
+            if day.month in months and day_matches:
+                for hour in hours:
+                    for minute in minutes:
+                        occurrence = datetime(day.year, day.month, day.day, hour, minute)
+                        if occurrence >= start and occurrence > after:
+                            matched = True
+                            yield occurrence
+            misses = 0 if matched else misses + 1
+            day += timedelta(days=1)
+
+
+def next_occurrence(rule, start, after):
+    """Return the first occurrence later than `after`, or None if there is none."""
+    return next(occurrences(rule, start, after), None)
+
+
+def occurrences_between(rule, start, window_start, window_end):
+    """Yield the occurrences inside [window_start, window_end] only."""
+    after = window_start - timedelta(microseconds=1)
+    return takewhile(lambda occurrence: occurrence <= window_end, occurrences(rule, start, after))
+
+
+def advance(rule, task_date, task_time, after):
+    """
+    Return the (task_date, task_time) strings of the first occurrence later
+    than `after` for a task currently due at task_date/task_time, or None.
+    """
+    start = parse_local(task_date, task_time)
+    occurrence = next_occurrence(rule, start, max(start, after))
+    if occurrence is None:
+        return None
+    return occurrence.strftime("%Y-%m-%d"), occurrence.strftime("%H:%M")
+
+
+def describe(rule):
+    """Short human-readable text for a rule, e.g. 'Every 2 weeks on Mon, Thu'."""
+    if not rule:
+        return ""
+    try:
+        kind, interval, values = parse_rule(rule)
+    except ValueError:
+        return rule
+    if kind == "cron":
+        return f"Repeats ({rule[5:].strip()})"
+    unit = {"daily": "day", "weekly": "week", "monthly": "month"}[kind]
+    text = f"Every {unit}" if interval == 1 else f"Every {interval} {unit}s"
+    if kind == "weekly" and values:
+        text += " on " + ", ".join(WEEKDAYS[day].capitalize() for day in values)
+    elif kind == "monthly" and values:
+        text += f" on day {values}"
+    return text
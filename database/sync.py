@@ -0,0 +1,98 @@
+"""Merge task databases kept on different machines by exchanging changes.
+
+Every add, edit, delete and completion is recorded in the change journal by
+triggers (migration 10). Each database has an origin name and a Lamport
+counter; a change is stamped (lamport, origin), and when two databases
+changed the same task the higher stamp wins, on both sides. A database's
+vector clock ({origin: highest stamp seen}) tells another database which
+changes it is missing, so only those are sent.
+
+    python -m database.sync sync laptop.db /mnt/usb/database.db   # both ways
+    python -m database.sync clock database/database.db > clock.json
+    python -m database.sync export database/database.db changes.json --since clock.json
+    python -m database.sync import database/database.db changes.json
+
+Accounts are matched by username, and only if they are the same account
+(sync copies each account's uid along with it); a username registered
+separately in both databases stops the sync until one is renamed.
+
+The change files written by `export` contain the password hash of every
+account whose tasks they carry, so treat them like the database itself;
+they are created readable by their owner only.
+
+Run it while the app is closed: a running app does not reload the tasks
+an import changed.
+"""
+import argparse
+import json
+import os
+
+from database.db_handler import DatabaseHandler
+
+
+def export_changes(db_handler, path, since=None):
+    """Write the changes a database with vector clock `since` lacks to a JSON file. Returns their number."""
+    bundle = db_handler.export_changes(since)
+    if bundle is None:
+        return 0
+    # The bundle holds password hashes: owner-only permissions, like a private key
+    with open(path, "w", encoding="utf-8", opener=lambda name, flags: os.open(name, flags, 0o600)) as f:
+        json.dump(bundle, f)
+    return len(bundle["changes"])
+
+
+def import_changes(db_handler, path):
+    """Apply a file written by export_changes. Returns (applied, ignored), or None on error."""
+    with open(path, encoding="utf-8") as f:
+        return db_handler.apply_changes(json.load(f))
+
+
+def sync_databases(first, second):
+    """
+    Exchange changes between two DatabaseHandlers until both hold the same tasks.
+
+    Returns ((applied, ignored) in second, (applied, ignored) in first).
+    """
+    to_second = second.apply_changes(first.export_changes(second.sync_clock()))
+    to_first = first.apply_changes(second.export_changes(first.sync_clock()))
+    return to_second, to_first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync = commands.add_parser("sync", help="exchange changes between two database files")
+    sync.add_argument("first")
+    sync.add_argument("second")
+    clock = commands.add_parser("clock", help="print a database's vector clock as JSON")
+    clock.add_argument("db")
+    export = commands.add_parser("export", help="write changes to a JSON file")
+    export.add_argument("db")
+    export.add_argument("output")
+    export.add_argument("--since", help="vector clock JSON of the receiving database (default: everything)")
+    apply = commands.add_parser("import", help="apply a file written by export")
+    apply.add_argument("db")
+    apply.add_argument("input")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        to_second, to_first = sync_databases(DatabaseHandler(args.first), DatabaseHandler(args.second))
+        for name, result in ((args.second, to_second), (args.first, to_first)):
+            if result is not None:
+                print(f"{name}: {result[0]} changes applied, {result[1]} older than local ones")
+    elif args.command == "clock":
+        print(json.dumps(DatabaseHandler(args.db).sync_clock()))
+    elif args.command == "export":
+        since = None
+        if args.since:
+            with open(args.since, encoding="utf-8") as f:
+                since = json.load(f)
+        print(f"{export_changes(DatabaseHandler(args.db), args.output, since)} changes written to {args.output}")
+    else:
+        result = import_changes(DatabaseHandler(args.db), args.input)
+        if result is not None:
+            print(f"{result[0]} changes applied, {result[1]} older than local ones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Shared in-memory view of each user's tasks and history.
+
+TaskRepository sits on top of DatabaseHandler: reads are served from memory
+once a user's rows have been loaded, writes go straight through to SQLite
+and update (or invalidate) the cached rows, and every mutation is announced
+to subscribers so the task page and the reminder scheduler stay in sync
+without re-querying the database.
+"""
+import threading
+from bisect import bisect_right, insort
+
+from database.timestamps import format_local
+
+# Change events passed to subscribers as callback(event, user_id, task_id)
+TASK_ADDED = "added"
+TASK_UPDATED = "updated"
+TASK_REMOVED = "removed"
+TASK_COMPLETED = "completed"
+TASKS_RELOADED = "reloaded"  # Bulk change; task_id is None and cached rows were dropped
+
+
+class _UserTasks:
+    """Cached Task rows of one user, loaded as a contiguous prefix of task_ids."""
+
+    def __init__(self):
+        self.rows = {}  # task_id -> Task
+        self.ids = []  # Sorted task_ids present in rows
+        self.loaded_until = 0  # Every task_id <= this has been loaded
+        self.complete = False  # True once all of the user's tasks are loaded
+
+    def put(self, row):
+        if row.task_id not in self.rows:
+            insort(self.ids, row.task_id)
+        self.rows[row.task_id] = row
+
+    def pop(self, task_id):
+        if self.rows.pop(task_id, None) is not None:
+            self.ids.pop(bisect_right(self.ids, task_id) - 1)
+
+    def covers(self, task_id):
+        return self.complete or task_id <= self.loaded_until
+
+
+class TaskRepository:
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self._lock = threading.RLock()
+        self._tasks = {}  # user_id -> _UserTasks
+        self._history = {}  # user_id -> list of HistoryEntry
+        self._owners = {}  # task_id -> user_id for cached tasks
+        self._subscribers = []
+
+    # Change notifications
+    def subscribe(self, callback):
+        """Call callback(event, user_id, task_id) after every task mutation."""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _emit(self, event, user_id, task_id):
+        for callback in list(self._subscribers):
+            try:
+                callback(event, user_id, task_id)
+            except Exception as e:
+                print(f"Error in task change subscriber: {e}")
+
+    def invalidate(self, user_id=None):
+        """Drop cached rows for one user, or for everyone."""
+        with self._lock:
+            users = [user_id] if user_id is not None else list(self._tasks)
+            for uid in users:
+                cache = self._tasks.pop(uid, None)
+                if cache:
+                    for task_id in cache.ids:
+                        self._owners.pop(task_id, None)
+            if user_id is None:
+                self._history.clear()
+            else:
+                self._history.pop(user_id, None)
+
+    def _user_tasks(self, user_id):
+        cache = self._tasks.get(user_id)
+        if cache is None:
+            cache = self._tasks[user_id] = _UserTasks()
+        return cache
+
+    def _cache_row(self, cache, row):
+        cache.put(row)
+        self._owners[row.task_id] = row.user_id
+
+    # Reads
+    def get_user_tasks(self, user_id):
+        """Return all of a user's tasks, loading them from SQLite on first use."""
+        with self._lock:
+            cache = self._user_tasks(user_id)
+            if not cache.complete:
+                for row in self.db_handler.get_user_tasks(user_id):
+                    self._cache_row(cache, row)
+                cache.complete = True
+            return [cache.rows[task_id] for task_id in cache.ids]
+
+    def get_user_tasks_page(self, user_id, after_key=None, limit=50):
+        """Keyset page of a user's tasks, served from memory when already loaded."""
+        after_key = after_key or 0
+        with self._lock:
+            cache = self._user_tasks(user_id)
+            start = bisect_right(cache.ids, after_key)
+            page_ids = cache.ids[start:start + limit]
+            if cache.complete or (len(page_ids) == limit and page_ids[-1] <= cache.loaded_until):
+                return [cache.rows[task_id] for task_id in page_ids]
+
+            rows = self.db_handler.get_user_tasks_page(user_id, after_key, limit)
+            for row in rows:
+                self._cache_row(cache, row)
+            if after_key <= cache.loaded_until:
+                # This page extends the contiguous prefix we hold
+                if rows:
+                    cache.loaded_until = max(cache.loaded_until, rows[-1].task_id)
+                if len(rows) < limit:
+                    cache.complete = True
+            return rows
+
+    def get_task(self, task_id):
+        with self._lock:
+            user_id = self._owners.get(task_id)
+            if user_id is not None:
+                row = self._tasks[user_id].rows.get(task_id)
+                if row is not None:
+                    return row
+        return self.db_handler.get_task(task_id)
+
+    def get_completed_tasks(self, user_id):
+        with self._lock:
+            history = self._history.get(user_id)
+            if history is None:
+                history = self._history[user_id] = self.db_handler.get_completed_tasks(user_id)
+            return list(history)
+
+    def get_completed_tasks_page(self, user_id, before_key=None, limit=50, start_date=None, end_date=None):
+        # Pages are cheap index range scans, so they are not cached
+        return self.db_handler.get_completed_tasks_page(user_id, before_key, limit, start_date, end_date)
+
+    def get_completion_counts(self, user_id, period="day", start=None, end=None):
+        return self.db_handler.get_completion_counts(user_id, period, start, end)
+
+    def get_tasks_between(self, user_id, start, end):
+        # Range scans on idx_tasks_user_due; cheap enough not to cache
+        return self.db_handler.get_tasks_between(user_id, start, end)
+
+    def get_tasks_due_today(self, user_id, day=None, tz=None):
+        return self.db_handler.get_tasks_due_today(user_id, day, tz)
+
+    def get_overdue_tasks(self, user_id, now=None):
+        return self.db_handler.get_overdue_tasks(user_id, now)
+
+    def search_tasks(self, user_id, text, limit=50, include_history=True):
+        # Served by the FTS5 index; not cached
+        return self.db_handler.search_tasks(user_id, text, limit, include_history)
+
+    # Writes (through to SQLite, then the cache, then subscribers)
+    def _refresh_task(self, task_id):
+        """Re-read one task after a write and store it if its user is cached."""
+        row = self.db_handler.get_task(task_id)
+        if row is None:
+            return None
+        with self._lock:
+            cache = self._tasks.get(row.user_id)
+            if cache is not None and (cache.covers(task_id) or task_id in cache.rows):
+                self._cache_row(cache, row)
+        return row
+
+    def _forget_task(self, task_id):
+        with self._lock:
+            user_id = self._owners.pop(task_id, None)
+            if user_id is not None:
+                self._tasks[user_id].pop(task_id)
+        return user_id
+
+    def _owner_of(self, task_id):
+        with self._lock:
+            user_id = self._owners.get(task_id)
+        if user_id is None:
+            row = self.db_handler.get_task(task_id)
+            user_id = row.user_id if row else None
+        return user_id
+
+    def add_task(self, user_id, description, task_date, task_time, recurrence=None):
+        task_id = self.db_handler.add_task(user_id, description, task_date, task_time, recurrence)
+        if task_id:
+            self._refresh_task(task_id)
+            self._emit(TASK_ADDED, user_id, task_id)
+        return task_id
+
+    def edit_task(self, task_id, description, task_date, task_time, recurrence=None):
+        self.db_handler.edit_task(task_id, description, task_date, task_time, recurrence)
+        row = self._refresh_task(task_id)
+        if row:
+            self._emit(TASK_UPDATED, row.user_id, task_id)
+
+    def delete_task(self, task_id):
+        user_id = self._owner_of(task_id)
+        self.db_handler.delete_task(task_id)
+        self._forget_task(task_id)
+        self._emit(TASK_REMOVED, user_id, task_id)
+
+    def mark_task_done(self, task_id):
+        user_id = self._owner_of(task_id)
+        self.db_handler.mark_task_done(task_id)
+        with self._lock:
+            # A new history row exists; reload it on the next read
+            self._history.pop(user_id, None)
+        # A repeating task is still there, moved on to its next occurrence
+        row = self._refresh_task(task_id)
+        if row:
+            self._emit(TASK_UPDATED, user_id, task_id)
+            return
+        self._forget_task(task_id)
+        self._emit(TASK_COMPLETED, user_id, task_id)
+
+    def bulk_add_tasks(self, tasks):
+        """Insert many (user_id, description, task_date, task_time[, recurrence]) rows at once."""
+        tasks = list(tasks)
+        added = self.db_handler.bulk_add_tasks(tasks)
+        self._reload_users({task[0] for task in tasks})  # (user_id, description, ...) input tuples
+        return added
+
+    def mark_tasks_done(self, task_ids):
+        task_ids = list(task_ids)
+        user_ids = {self._owner_of(task_id) for task_id in task_ids}
+        done = self.db_handler.mark_tasks_done(task_ids)
+        self._reload_users(user_ids - {None})
+        return done
+
+    def bulk_mark_done(self, task_ids):
+        """Same as mark_tasks_done (kept for existing callers)."""
+        return self.mark_tasks_done(task_ids)
+
+    def _reload_users(self, user_ids):
+        """After a bulk write, drop the affected caches and tell subscribers once per user."""
+        for user_id in user_ids:
+            self.invalidate(user_id)
+            self._emit(TASKS_RELOADED, user_id, None)
+
+    def mark_tasks_as_notified(self, task_ids):
+        """Returns {task_id: next notify_at} for repeating tasks, like DatabaseHandler."""
+        advanced = self.db_handler.mark_tasks_as_notified(task_ids)
+        with self._lock:
+            for task_id in task_ids:
+                user_id = self._owners.get(task_id)
+                if user_id is not None:
+                    row = self._tasks[user_id].rows[task_id]
+                    notify_at = advanced.get(task_id)
+                    self._tasks[user_id].rows[task_id] = row.replace(
+                        notify_date_time=format_local(notify_at), notify_at=notify_at
+                    )
+        return advanced
+
+    def archive_history(self, before_date, archive_path=None):
+        moved = self.db_handler.archive_history(before_date, archive_path)
+        with self._lock:
+            self._history.clear()
+        return moved
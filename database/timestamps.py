@@ -0,0 +1,97 @@
+"""Conversions between task date/time text and UTC epoch seconds.
+
+task_date/task_time are what the user entered, in local wall-clock time.
+tasks.due_at and tasks.notify_at hold the same instants as integer seconds
+since the Unix epoch (UTC), so due-time comparisons and range scans are
+integer compares on an index. Local time means the system time zone unless
+a tzinfo is passed, and conversions go through aware datetimes so DST
+transitions are handled by the zone rules.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M"
+DATE_TIME_FORMAT = "%Y-%m-%d %H:%M"  # task_date + task_time, and tasks.notify_date_time
+
+
+def parse_local(task_date, task_time):
+    """Parse task_date/task_time into a naive local datetime (ValueError if malformed)."""
+    return datetime.strptime(f"{task_date} {task_time}", DATE_TIME_FORMAT)
+
+
+def to_epoch(moment, tz=None):
+    """
+    Return epoch seconds for `moment`.
+
+    Accepts an int/float epoch, an aware datetime, or a naive datetime taken
+    as wall-clock time in `tz` (default: the system's local zone).
+    """
+    if isinstance(moment, (int, float)):
+        return int(moment)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz) if tz is not None else moment.astimezone()
+    return int(moment.timestamp())
+
+
+def epoch_of(task_date, task_time, tz=None):
+    """Epoch seconds of a task's local date and time."""
+    return to_epoch(parse_local(task_date, task_time), tz)
+
+
+def from_epoch(epoch, tz=None):
+    """Aware datetime in `tz` (default: local zone) for epoch seconds."""
+    moment = datetime.fromtimestamp(epoch, timezone.utc)
+    return moment.astimezone(tz) if tz is not None else moment.astimezone()
+
+
+def local_naive(epoch, tz=None):
+    """Naive local datetime for epoch seconds (what datetime.now() would have shown)."""
+    return from_epoch(epoch, tz).replace(tzinfo=None)
+
+
+def format_local(epoch, tz=None):
+    """'YYYY-MM-DD HH:MM' local text for epoch seconds (None stays None)."""
+    if epoch is None:
+        return None
+    return from_epoch(epoch, tz).strftime(DATE_TIME_FORMAT)
+
+
+def day_bounds(day=None, tz=None):
+    """(start, end) epoch seconds of the local calendar day `day` (default: today), end exclusive."""
+    if day is None:
+        day = datetime.now(tz).date() if tz is not None else date.today()
+    elif isinstance(day, datetime):
+        day = day.date()
+    start = datetime.combine(day, time())
+    end = datetime.combine(day + timedelta(days=1), time())
+    return to_epoch(start, tz), to_epoch(end, tz)
+
+
+class LocalEpochs:
+    """
+    epoch_of for many rows: each distinct task_date is converted once.
+
+    On a day without a DST transition a time's epoch is the day's local
+    midnight plus its hours and minutes, so only the first row of each date
+    goes through the time zone rules; days with a transition use epoch_of.
+    """
+
+    def __init__(self, tz=None):
+        self.tz = tz
+        self._midnights = {}  # task_date -> epoch of local midnight, or None on a DST transition day
+
+    def __call__(self, task_date, task_time):
+        try:
+            midnight = self._midnights[task_date]
+        except KeyError:
+            if len(task_date) != 10:
+                raise ValueError(f"invalid date {task_date!r}")
+            start, end = day_bounds(date.fromisoformat(task_date), self.tz)
+            midnight = self._midnights[task_date] = start if end - start == 86400 else None
+        if midnight is None:
+            return epoch_of(task_date, task_time, self.tz)
+        hours, _, minutes = task_time.partition(":")
+        hours, minutes = int(hours), int(minutes)
+        if not (0 <= hours < 24 and 0 <= minutes < 60):
+            raise ValueError(f"invalid time {task_time!r}")
+        return midnight + hours * 3600 + minutes * 60
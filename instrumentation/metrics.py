@@ -0,0 +1,345 @@
+"""Switchable hot-path metrics written to a local JSONL file.
+
+Enable with TASKMANAGER_METRICS=<path> (or =1 for ./metrics.jsonl) before
+the app starts; TASKMANAGER_PROFILE=cprofile, tracemalloc or
+cprofile,tracemalloc also captures a profile of the main thread and/or the
+top allocation sites at shutdown. Records are one JSON object per line:
+
+    query    per SQL statement: calls, total/max ms, rows, statements run (incl. triggers)
+    slow_query  a single statement slower than SLOW_QUERY_MS
+    span     one call of a @timed function (UI-thread time)
+    frames   frame-time distribution for each FRAME_WINDOW seconds of the Kivy Clock
+    profile / alloc  cProfile and tracemalloc top entries at shutdown
+
+When disabled, `timed` returns the function unchanged, `span` returns a
+shared no-op context and `connection_factory` is plain sqlite3.Connection,
+so the instrumented code paths cost nothing extra.
+
+    python -m instrumentation.metrics metrics.jsonl   # summarize a file
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+SLOW_QUERY_MS = 16  # One frame at 60 fps
+FRAME_WINDOW = 5  # Seconds of frames summarized per record
+JANK_MS = 33  # Frames slower than this are counted as dropped
+PROFILE_TOP = 30  # Entries written for cProfile and tracemalloc
+
+recorder = None  # The active MetricsRecorder, or None when metrics are off
+_NO_SPAN = nullcontext()
+
+
+class MetricsRecorder:
+    """Buffers records and query aggregates; writes them as JSONL."""
+
+    def __init__(self, path, profile=()):
+        self.path = path
+        self.profile = set(profile)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._queries = {}  # sql -> [calls, total seconds, max seconds, rows, statements]
+        self._local = threading.local()  # Statements traced on this thread
+        self._profiler = None
+        if "cprofile" in self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()  # Profiles the thread that enabled metrics (the UI thread)
+        if "tracemalloc" in self.profile:
+            import tracemalloc
+            tracemalloc.start()
+
+    def record(self, kind, **fields):
+        fields["type"] = kind
+        fields["ts"] = round(time.time(), 3)
+        with self._lock:
+            self._buffer.append(fields)
+
+    def traced_statement(self, sql):
+        """sqlite3 trace callback: count every statement, including those run by triggers."""
+        self._local.statements = getattr(self._local, "statements", 0) + 1
+
+    def statements_run(self):
+        return getattr(self._local, "statements", 0)
+
+    def add_query(self, sql, seconds, rows, statements):
+        with self._lock:
+            entry = self._queries.get(sql)
+            if entry is None:
+                entry = self._queries[sql] = [0, 0.0, 0.0, 0, 0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += rows
+            entry[4] += statements
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            self.record("slow_query", sql=sql, ms=round(seconds * 1000, 3), thread=threading.current_thread().name)
+
+    def add_rows(self, sql, seconds, rows):
+        """Time and rows of fetching results, added to the statement's totals."""
+        with self._lock:
+            entry = self._queries.get(sql)
+            if entry is not None:
+                entry[1] += seconds
+                entry[3] += rows
+
+    def flush(self):
+        """Append buffered records and the query totals since the last flush to the file."""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            queries, self._queries = self._queries, {}
+        now = round(time.time(), 3)
+        for sql, (calls, total, longest, rows, statements) in queries.items():
+            records.append({
+                "type": "query", "ts": now, "sql": sql, "calls": calls, "total_ms": round(total * 1000, 3),
+                "max_ms": round(longest * 1000, 3), "rows": rows, "statements": statements,
+            })
+        if not records:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record))
+                f.write("\n")
+
+    def close(self):
+        """Write the profiles (if captured) and everything still buffered."""
+        if self._profiler is not None:
+            import pstats
+            self._profiler.disable()
+            self._profiler.dump_stats(os.path.splitext(self.path)[0] + ".prof")
+            stats = pstats.Stats(self._profiler).sort_stats("cumulative")
+            for filename, line, function in stats.fcn_list[:PROFILE_TOP]:
+                _, calls, own, cumulative, _ = stats.stats[(filename, line, function)]
+                self.record("profile", function=f"{filename}:{line}({function})", calls=calls,
+                            own_ms=round(own * 1000, 3), cumulative_ms=round(cumulative * 1000, 3))
+        if "tracemalloc" in self.profile:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]:
+                frame = stat.traceback[0]
+                self.record("alloc", site=f"{frame.filename}:{frame.lineno}", kib=round(stat.size / 1024, 1),
+                            blocks=stat.count)
+            self.record("alloc_total", current_kib=round(current / 1024, 1), peak_kib=round(peak / 1024, 1))
+            tracemalloc.stop()
+        self.flush()
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's time and row count to the recorder."""
+
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        before = recorder.statements_run()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql = sql
+            rows = max(self.rowcount, 0)  # Rows changed by INSERT/UPDATE/DELETE
+            recorder.add_query(sql, time.perf_counter() - start, rows, recorder.statements_run() - before)
+
+    def executemany(self, sql, seq_of_parameters):
+        before = recorder.statements_run()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql = sql
+            recorder.add_query(sql, time.perf_counter() - start, max(self.rowcount, 0),
+                               recorder.statements_run() - before)
+
+    def _fetched(self, start, rows):
+        if self._sql is not None:
+            recorder.add_rows(self._sql, time.perf_counter() - start, rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute and executemany) are TracedCursors."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(recorder.traced_statement)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection's own shortcuts create a plain Cursor in C, so route them through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """Connection class for sqlite3.connect(factory=...)."""
+    return TracedConnection if recorder is not None else sqlite3.Connection
+
+
+def timed(name):
+    """Decorator recording a span per call; returns the function untouched when metrics are off."""
+    def decorate(func):
+        if recorder is None:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record("span", name=name, ms=round((time.perf_counter() - start) * 1000, 3),
+                                thread=threading.current_thread().name)
+        return wrapper
+    return decorate
+
+
+def span(name):
+    """Context manager form of `timed`, for code that isn't a whole function."""
+    if recorder is None:
+        return _NO_SPAN
+    return _span(name)
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.record("span", name=name, ms=round((time.perf_counter() - start) * 1000, 3),
+                        thread=threading.current_thread().name)
+
+
+class FrameSampler:
+    """Collects Kivy Clock frame times and writes one summary per FRAME_WINDOW seconds."""
+
+    def __init__(self):
+        self.frames = []
+        self.window_start = time.perf_counter()
+        self.event = None
+
+    def start(self):
+        from kivy.clock import Clock
+        self.event = Clock.schedule_interval(self.on_frame, 0)  # Called once per frame
+
+    def stop(self):
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+
+    def on_frame(self, dt):
+        self.frames.append(dt * 1000)
+        now = time.perf_counter()
+        if now - self.window_start >= FRAME_WINDOW:
+            self.window_start = now
+            frames, self.frames = sorted(self.frames), []
+            recorder.record(
+                "frames", count=len(frames), p50_ms=round(frames[len(frames) // 2], 2),
+                p99_ms=round(frames[min(len(frames) - 1, int(len(frames) * 0.99))], 2),
+                max_ms=round(frames[-1], 2), janks=sum(1 for frame in frames if frame > JANK_MS),
+            )
+            recorder.flush()
+
+
+_sampler = None
+
+
+def enable(path, profile=()):
+    """Turn metrics on. Call before importing the modules that use @timed."""
+    global recorder
+    if recorder is None:
+        recorder = MetricsRecorder(path, profile)
+    return recorder
+
+
+def start_frame_sampler():
+    """Sample frame times from Kivy's Clock (no-op when metrics are off)."""
+    global _sampler
+    if recorder is not None and _sampler is None:
+        _sampler = FrameSampler()
+        _sampler.start()
+
+
+def shutdown():
+    """Stop sampling and write everything out (no-op when metrics are off)."""
+    global _sampler
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+    if recorder is not None:
+        # The recorder stays installed: traced connections may still be in use
+        recorder.close()
+
+
+def summarize(path, top=15):
+    """Print the slowest queries, spans and frame windows of a metrics file."""
+    queries = {}
+    spans = {}
+    frames = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "query":
+                totals = queries.setdefault(" ".join(record["sql"].split()), [0, 0.0, 0.0, 0])
+                totals[0] += record["calls"]
+                totals[1] += record["total_ms"]
+                totals[2] = max(totals[2], record["max_ms"])
+                totals[3] += record["rows"]
+            elif record["type"] == "span":
+                spans.setdefault(record["name"], []).append(record["ms"])
+            elif record["type"] == "frames":
+                frames.append(record)
+
+    print("Queries by total time:")
+    for sql, (calls, total, longest, rows) in sorted(queries.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"  {total:10.1f} ms  {calls:7} calls  max {longest:8.2f} ms  {rows:9} rows  {sql[:80]}")
+    print("Spans:")
+    for name, samples in sorted(spans.items()):
+        samples.sort()
+        print(f"  {name:40} {len(samples):6} calls  p50 {samples[len(samples) // 2]:8.2f} ms  "
+              f"max {samples[-1]:8.2f} ms")
+    if frames:
+        print(f"Frames: {sum(record['count'] for record in frames)} sampled, "
+              f"{sum(record['janks'] for record in frames)} over {JANK_MS} ms, "
+              f"worst {max(record['max_ms'] for record in frames):.1f} ms")
+
+
+_path = os.environ.get("TASKMANAGER_METRICS")
+if _path:
+    enable("metrics.jsonl" if _path == "1" else _path,
+           [mode.strip() for mode in os.environ.get("TASKMANAGER_PROFILE", "").split(",") if mode.strip()])
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else "metrics.jsonl")
@@ -0,0 +1,41 @@
+"""Time-to-first-frame breakdown for application startup.
+
+Call `mark(phase)` at the end of each startup phase; the time since the
+previous mark is attributed to that phase. `report()` prints the table when
+TASKMANAGER_PROFILE_STARTUP is set. Marks are a perf_counter call and a list
+append, so they are left in place even when profiling is off.
+"""
+import os
+import time
+
+ENABLED = bool(os.environ.get("TASKMANAGER_PROFILE_STARTUP"))
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []  # (phase, seconds)
+        self.reported = False
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        """Print each phase and the total once (only when profiling is enabled)."""
+        if self.reported or not ENABLED:
+            return
+        self.reported = True
+        print("Startup profile (time to first frame):")
+        for phase, seconds in self.phases:
+            print(f"  {phase:32} {seconds * 1000:9.1f} ms")
+        print(f"  {'total':32} {self.total() * 1000:9.1f} ms")
+
+
+# Shared instance, created when Main.py first imports this module
+profiler = StartupProfiler()
@@ -0,0 +1,182 @@
+"""Audio backends for the reminder sound.
+
+The sound is loaded once, ahead of the first reminder (`preload()`), and
+then replayed from the same player, so a reminder only has to start
+playback. Plays closer together than `min_interval` seconds, or while the
+sound is still playing, are dropped instead of overlapping.
+
+Each backend keeps the time from trigger (the moment a reminder decided to
+play a sound) to the start of playback; `stats()` summarizes it, and with
+metrics on every play is also recorded as an "audio.trigger_to_start" span.
+
+    KivyAudio      Kivy's SoundLoader; one Sound object, reused
+    PlaysoundAudio playsound, which decodes the file on every play (fallback)
+    NullAudio      plays nothing; counts plays for tests and headless runs
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from instrumentation import metrics
+
+SOUND_FILE = "sounds/notification-sound-3.mp3"
+MIN_INTERVAL = 2.0  # Seconds between two reminder sounds
+LATENCY_SAMPLES = 100  # Trigger-to-start times kept for stats()
+
+
+class AudioBackend:
+    """Preload once, play with throttling and trigger-to-start timing."""
+
+    name = "audio"
+    timed = True  # False when _start() only returns after playback ended, so no start time is known
+
+    def __init__(self, sound_file=SOUND_FILE, min_interval=MIN_INTERVAL):
+        self.sound_file = sound_file
+        self.min_interval = min_interval
+        self.plays = 0
+        self.throttled = 0
+        self.latencies_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._last_play = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def preload(self):
+        """Load the sound now. Returns False if this backend cannot play it."""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = self._load()
+            return self._loaded
+
+    def play(self, triggered=None):
+        """
+        Start the sound unless one started less than min_interval ago (or is still playing).
+
+        `triggered` is the time.perf_counter() at which the reminder asked for
+        the sound; defaults to now. Returns True if playback started (False if
+        throttled or the backend could not play).
+        """
+        triggered = time.perf_counter() if triggered is None else triggered
+        with self._lock:
+            now = time.perf_counter()
+            if not self._loaded:
+                self._loaded = self._load()  # Not preloaded: the first reminder pays for loading
+            if (self._last_play is not None and now - self._last_play < self.min_interval) or self._playing():
+                self.throttled += 1
+                return False
+            self._last_play = now
+            self.plays += 1
+            started = self._start()
+        if started and self.timed:
+            self._record(triggered, time.perf_counter())
+        return started
+
+    def _record(self, triggered, started):
+        ms = (started - triggered) * 1000
+        self.latencies_ms.append(ms)
+        if metrics.recorder is not None:
+            metrics.recorder.record("span", name="audio.trigger_to_start", ms=round(ms, 3),
+                                    thread=threading.current_thread().name)
+
+    def stats(self):
+        """Plays, throttled plays and trigger-to-start latency (ms) of the recent plays."""
+        samples = sorted(self.latencies_ms)
+        return {
+            "backend": self.name,
+            "plays": self.plays,
+            "throttled": self.throttled,
+            "p50_ms": round(samples[len(samples) // 2], 3) if samples else None,
+            "max_ms": round(samples[-1], 3) if samples else None,
+        }
+
+    # Backends implement these
+    def _load(self):
+        return True
+
+    def _playing(self):
+        return False
+
+    def _start(self):
+        """Start playback; return True once it has started (False if it could not)."""
+        return True
+
+
+class KivyAudio(AudioBackend):
+    """One Sound from Kivy's SoundLoader, loaded once and restarted for each reminder.
+
+    With the SDL2 audio provider the file is decoded into memory when it is
+    loaded, so starting it again only queues the decoded samples.
+    """
+
+    name = "kivy"
+
+    def __init__(self, sound_file=SOUND_FILE, min_interval=MIN_INTERVAL):
+        super().__init__(sound_file, min_interval)
+        self.sound = None
+
+    def _load(self):
+        try:
+            # Importing Kivy parses sys.argv and exits on options it doesn't know (e.g. a script's own)
+            os.environ.setdefault("KIVY_NO_ARGS", "1")
+            from kivy.core.audio import SoundLoader
+            self.sound = SoundLoader.load(self.sound_file)
+        except Exception as e:
+            print(f"Error loading sound: {e}")
+        return self.sound is not None
+
+    def _playing(self):
+        return self.sound is not None and self.sound.state == "play"
+
+    def _start(self):
+        if self.sound is None:
+            return False
+        self.sound.play()  # Returns once playback is under way
+        return True
+
+
+class PlaysoundAudio(AudioBackend):
+    """playsound: decodes the file on every play and blocks until it ends.
+
+    The start of playback happens inside that call, so it is not timed.
+    """
+
+    name = "playsound"
+    timed = False
+
+    def _start(self):
+        try:
+            from playsound import playsound  # Imported on first reminder to keep startup fast
+            playsound(self.sound_file)
+            return True
+        except Exception as e:
+            print(f"Error playing sound: {e}")
+            return False
+
+
+class NullAudio(AudioBackend):
+    """Plays nothing, immediately; `plays` counts the sounds that would have started."""
+
+    name = "null"
+
+    def __init__(self, sound_file=SOUND_FILE, min_interval=0):
+        super().__init__(sound_file, min_interval)
+
+
+BACKENDS = {"kivy": KivyAudio, "playsound": PlaysoundAudio, "null": NullAudio}
+
+
+def load_audio(sound_file=SOUND_FILE, min_interval=MIN_INTERVAL, backend=None):
+    """
+    Preload the sound with the named backend (see BACKENDS).
+
+    Without a name Kivy is tried first, falling back to playsound when Kivy
+    can't play it; processes without Kivy (reminder_daemon.py) name one.
+    """
+    if backend is not None:
+        audio = BACKENDS[backend](sound_file, min_interval=min_interval)
+        audio.preload()
+        return audio
+    audio = KivyAudio(sound_file, min_interval)
+    if audio.preload():
+        return audio
+    return PlaysoundAudio(sound_file, min_interval)
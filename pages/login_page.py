@@ -1,21 +1,38 @@
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
 from kivy.uix.screenmanager import Screen
-from database.db_handler import DatabaseHandler
+from kivymd.app import MDApp
 
 
 class LoginPage(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.logging_in = False
+
     def login(self):
+        if self.logging_in:
+            return  # A login is already being checked
         username = self.ids.username_input.text
         password = self.ids.password_input.text
 
-        # Create a database handler instance
-        db_handler = DatabaseHandler()
-
-        # Validate user credentials
-        user_id = db_handler.validate_user(username, password)
+        # Password hashing is slow on purpose, so check credentials off the UI thread.
+        # validate_user may rewrite an outdated password hash, so this is a write job.
+        self.logging_in = True
+        app = MDApp.get_running_app()
+        app.db_executor.submit_write(
+            app.authenticator.authenticate, username, password,
+            callback=lambda result: self.finish_login(*result),
+            error_callback=lambda error: self.finish_login(None, None, "Login failed. Please try again.")
+        )
 
+    def finish_login(self, user_id, token, error):
+        self.logging_in = False
         if user_id:
             print(f"Login successful! User ID: {user_id}")
-            self.manager.current = 'task'  # Navigate to the Task Page
-            self.manager.get_screen('task').user_id = user_id  # Pass the user ID
+            app = MDApp.get_running_app()
+            app.session_token = token
+            app.get_screen('task').user_id = user_id  # Pass the user ID (builds the screen on first login)
+            app.show_screen('task')  # Navigate to the Task Page
         else:
-            print("Invalid username or password")
+            print(error)
+            Popup(title="Error", content=Label(text=error), size_hint=(0.6, 0.4)).open()
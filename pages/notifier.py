@@ -0,0 +1,80 @@
+"""Notification backends used to deliver reminders.
+
+ReminderHandler (in the app) and reminder_daemon.py (headless) only talk to
+a Notifier, so the desktop libraries are needed only where reminders are
+actually shown. StubNotifier records what would have been shown and is used
+for tests, benchmarks and `reminder_daemon.py --stub`. Sounds are played
+by an audio backend from pages.audio.
+"""
+import threading
+
+from pages.audio import SOUND_FILE, NullAudio, load_audio
+
+
+class Notifier:
+    """Interface: show a message and play the reminder sound."""
+
+    audio = None  # pages.audio backend, if this notifier plays sounds
+
+    def notify(self, title, message):
+        raise NotImplementedError
+
+    def preload(self):
+        """Get the sound ready ahead of the first reminder."""
+
+    def play_sound(self, triggered=None):
+        """Play the reminder sound; `triggered` is when the reminder asked for it (time.perf_counter())."""
+
+
+class DesktopNotifier(Notifier):
+    """Desktop notification through plyer; the sound through a preloaded audio backend."""
+
+    def __init__(self, sound_file=SOUND_FILE, app_name="To-Do List", audio=None, backend=None):
+        self.sound_file = sound_file
+        self.app_name = app_name
+        self.audio = audio  # Chosen by preload() unless given
+        self.backend = backend  # Name in pages.audio.BACKENDS; None tries Kivy, then playsound
+
+    def notify(self, title, message):
+        from plyer import notification  # Imported on first reminder to keep startup fast
+        notification.notify(
+            title=title,
+            message=message,
+            app_name=self.app_name,
+            timeout=10  # Seconds
+        )
+
+    def preload(self):
+        if self.audio is None:
+            self.audio = load_audio(self.sound_file, backend=self.backend)
+        else:
+            self.audio.preload()
+
+    def play_sound(self, triggered=None):
+        if self.audio is None:
+            self.preload()
+        self.audio.play(triggered)
+
+
+class StubNotifier(Notifier):
+    """Keeps delivered messages in memory (and optionally prints them); sounds go to NullAudio."""
+
+    def __init__(self, echo=False, audio=None):
+        self.echo = echo
+        self.sent = []  # (title, message)
+        self.audio = audio or NullAudio()
+        self._lock = threading.Lock()
+
+    @property
+    def sounds(self):
+        """Sounds that would have started."""
+        return self.audio.plays
+
+    def notify(self, title, message):
+        with self._lock:
+            self.sent.append((title, message))
+        if self.echo:
+            print(f"[{title}] {message}")
+
+    def play_sound(self, triggered=None):
+        self.audio.play(triggered)
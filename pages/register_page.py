@@ -1,9 +1,8 @@
 from kivy.uix.screenmanager import Screen
-from database.db_handler import DatabaseHandler
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
+from kivymd.app import MDApp
 
-db = DatabaseHandler()
 
 class RegisterPage(Screen):
     def register(self):
@@ -11,7 +10,18 @@ class RegisterPage(Screen):
         password = self.ids.password_input.text
 
         if username and password:
-            db.register_user(username, password)
-            Popup(title="Success", content=Label(text="Registration complete"), size_hint=(0.6, 0.4)).open()
+            # Hashing the password is slow on purpose; keep it off the UI thread
+            app = MDApp.get_running_app()
+            app.db_executor.submit_write(
+                app.authenticator.register, username, password,
+                callback=lambda result: self.show_register_result(result[1]),
+                error_callback=lambda error: self.show_register_result("Registration failed. Please try again.")
+            )
         else:
             Popup(title="Error", content=Label(text="Fields cannot be empty"), size_hint=(0.6, 0.4)).open()
+
+    def show_register_result(self, error):
+        if error:
+            Popup(title="Error", content=Label(text=error), size_hint=(0.6, 0.4)).open()
+        else:
+            Popup(title="Success", content=Label(text="Registration complete"), size_hint=(0.6, 0.4)).open()
@@ -1,37 +1,367 @@
-from datetime import datetime
-from plyer import notification
-from playsound import playsound
+import heapq
+import os
+import queue
+from datetime import datetime, timedelta
 import threading
+import time
+
+from database.task_repository import TASK_ADDED, TASK_UPDATED, TASKS_RELOADED
+from instrumentation.metrics import timed
+from pages.notifier import DesktopNotifier
+
+SUMMARY_PREVIEW = 3  # Descriptions listed in a coalesced notification
+NOTIFICATION_TITLE = "Task Reminder"
+# Seconds a claimed reminder stays reserved for the process delivering it
+LEASE_SECONDS = 120
+
+
+class BoundedWorker:
+    """A single background thread fed by a bounded queue.
+
+    Jobs submitted while the queue is full are dropped rather than spawning
+    more threads, so a burst of reminders can never cause a thread storm.
+    """
+
+    def __init__(self, name, max_pending=1):
+        self.name = name
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        """Queue func(*args); return False if the job was dropped."""
+        try:
+            self._queue.put_nowait((func, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def shutdown(self):
+        # Block until the sentinel fits so the worker always sees it
+        self._queue.put((None, None))
+
+    def _run(self):
+        while True:
+            func, args = self._queue.get()
+            if func is None:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in {self.name} worker: {e}")
+
+
+class KivyClock:
+    """Wall-clock time with wake-ups scheduled on Kivy's Clock."""
+
+    def now(self):
+        return datetime.now()
+
+    def schedule_once(self, callback, delay):
+        from kivy.clock import Clock
+        return Clock.schedule_once(callback, delay)
+
+    def call_soon(self, func):
+        """Run func on the UI thread (safe to call from any thread)."""
+        from kivy.clock import Clock
+        Clock.schedule_once(lambda dt: func())
+
+
+class FakeClock:
+    """Manually advanced clock so the scheduler can be tested deterministically."""
+
+    def __init__(self, start=None):
+        self.current = start or datetime(2000, 1, 1)
+        self._events = []
+
+    def now(self):
+        return self.current
+
+    def schedule_once(self, callback, delay):
+        event = _FakeEvent(self.current + timedelta(seconds=delay), callback)
+        self._events.append(event)
+        return event
+
+    def call_soon(self, func):
+        func()
+
+    def advance(self, seconds):
+        """Move time forward, firing scheduled callbacks in deadline order."""
+        target = self.current + timedelta(seconds=seconds)
+        while True:
+            self._events = [event for event in self._events if not event.cancelled]
+            due = [event for event in self._events if event.deadline <= target]
+            if not due:
+                break
+            event = min(due, key=lambda e: e.deadline)
+            self._events.remove(event)
+            self.current = max(self.current, event.deadline)
+            event.callback(0)
+        self.current = target
+
+
+class _FakeEvent:
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ReminderScheduler:
+    """Min-heap of upcoming reminders that sleeps until the earliest deadline."""
+
+    # Re-check at least this often so wall-clock jumps (suspend, DST) are caught
+    MAX_SLEEP = 3600
+
+    def __init__(self, on_due, clock=None):
+        self.on_due = on_due  # Called with a list of (task_id, description, deadline)
+        self.clock = clock or KivyClock()
+        # (deadline, task_id) with deadlines in epoch seconds (tasks.notify_at), so
+        # every comparison is an integer compare; superseded entries are skipped lazily
+        self._heap = []
+        self._entries = {}  # task_id -> (deadline, description)
+        self._wakeup = None
+        self._wakeup_time = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, reminders):
+        """Replace the heap with (task_id, description, notify_at) rows."""
+        self._entries = {}
+        for task_id, description, notify_at in reminders:
+            deadline = self._parse(notify_at)
+            if deadline is not None:
+                self._entries[task_id] = (deadline, description)
+        self._heap = [(deadline, task_id) for task_id, (deadline, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+        self._reschedule()
+
+    def schedule(self, task_id, description, notify_at):
+        """Add a reminder or move an existing one to a new deadline (epoch seconds)."""
+        deadline = self._parse(notify_at)
+        if deadline is None:
+            self.cancel(task_id)
+            return
+        self._entries[task_id] = (deadline, description)
+        heapq.heappush(self._heap, (deadline, task_id))
+        self._reschedule()
+
+    def cancel(self, task_id):
+        """Forget a reminder; its heap entry is discarded when it reaches the top."""
+        if self._entries.pop(task_id, None) is None:
+            return
+        # Rebuild once stale entries dominate so the heap doesn't grow unbounded
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [(deadline, task_id) for task_id, (deadline, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+        self._reschedule()
+
+    def next_deadline(self):
+        """Return the earliest live deadline, or None when nothing is scheduled."""
+        while self._heap:
+            deadline, task_id = self._heap[0]
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    @timed("reminders.run_due")
+    def run_due(self, *args):
+        """Pop every reminder whose deadline has passed and hand them to on_due."""
+        now = self.clock.now().timestamp()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, task_id = heapq.heappop(self._heap)
+            entry = self._entries.get(task_id)
+            if entry is None or entry[0] != deadline:
+                continue
+            del self._entries[task_id]
+            due.append((task_id, entry[1], deadline))
+
+        self.stop()
+        self._reschedule()
+        if due:
+            self.on_due(due)
+        return due
+
+    def stop(self):
+        """Cancel the pending wake-up."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = None
+        self._wakeup_time = None
+
+    def _reschedule(self):
+        deadline = self.next_deadline()
+        if deadline is None:
+            self.stop()
+            return
+        # An earlier wake-up is already pending; it will re-evaluate the heap
+        if self._wakeup is not None and self._wakeup_time <= deadline:
+            return
+
+        self.stop()
+        now = self.clock.now().timestamp()
+        delay = min(max(deadline - now, 0), self.MAX_SLEEP)
+        self._wakeup_time = now + delay
+        self._wakeup = self.clock.schedule_once(self.run_due, delay)
+
+    @staticmethod
+    def _parse(notify_at):
+        if notify_at is None:
+            return None
+        try:
+            return int(notify_at)
+        except (TypeError, ValueError):
+            print(f"Error: Invalid notification time {notify_at!r}")
+            return None
+
 
 class ReminderHandler:
-    def __init__(self, db_handler):
+    def __init__(self, db_handler, clock=None, repository=None, executor=None, notifier=None):
         self.db_handler = db_handler
-        self.sound_file = "sounds/notification-sound-3.mp3"  # Path to sound file
+        self.repository = repository  # Optional TaskRepository to follow task changes
+        self.executor = executor  # Optional DatabaseExecutor to keep SQLite off the UI thread
+        self.notifier = notifier or DesktopNotifier()
+        # Reminders are claimed under this name, so a reminder_daemon.py running
+        # on the same database never delivers the same one again
+        self.lease_owner = f"app-{os.getpid()}"
+        self.scheduler = ReminderScheduler(self.deliver_reminders, clock)
+        self.clock = self.scheduler.clock
+        self._loading = False
+        self._deferred = []  # Changes that arrived while the heap was being (re)loaded
+        # One sound at a time; a sound requested while one is queued is redundant
+        self.audio_worker = BoundedWorker("reminder-audio", max_pending=1)
+        self.audio_worker.submit(self.notifier.preload)  # Load the sound now, not on the first reminder
+        # Desktop notifications can block, so keep them off the UI thread
+        self.notification_worker = BoundedWorker("reminder-notify", max_pending=16)
+        if repository is not None:
+            repository.subscribe(self.on_task_event)
+
+    def start(self):
+        """Load every pending reminder once and wait for the first deadline."""
+        if self.executor is not None:
+            self._loading = True
+            self.executor.submit_read(self.db_handler.fetch_pending_notifications, callback=self._finish_load)
+        else:
+            self.scheduler.load(self.db_handler.fetch_pending_notifications())
+
+    def _finish_load(self, reminders):
+        self.scheduler.load(reminders)
+        self._loading = False
+        # The snapshot may predate these changes, so apply them on top of it
+        deferred, self._deferred = self._deferred, []
+        for change in deferred:
+            change()
+
+    def _on_ui(self, change):
+        """Apply a heap change on the UI thread, after any reload in progress."""
+        def run():
+            if self._loading:
+                self._deferred.append(change)
+            else:
+                change()
+        self.clock.call_soon(run)
 
+    def stop(self):
+        self.scheduler.stop()
+        self.audio_worker.shutdown()
+        self.notification_worker.shutdown()
+
+    @timed("reminders.check_reminders")
     def check_reminders(self, *args):
-        """Check for due reminders and send notifications."""
-        due_reminders = self.db_handler.fetch_due_notifications()
-        for reminder in due_reminders:
-            task_id, description, notify_time = reminder
-            # Trigger notification
-            self.send_notification(description)
-            # Play sound in a separate thread
-            threading.Thread(target=self.play_sound).start()
-            # Mark task as notified
-            self.db_handler.mark_task_as_notified(task_id)
+        """Deliver any reminders that are already due."""
+        self.scheduler.run_due()
+
+    def on_task_event(self, event, user_id, task_id):
+        """TaskRepository subscriber: keep the schedule in step with task changes.
+
+        Events may arrive on the database writer thread, so the database is
+        read here and only the heap update is handed to the UI thread.
+        """
+        if event == TASKS_RELOADED:
+            self.clock.call_soon(self.start)  # Bulk change: rebuild the heap from the database
+        elif event in (TASK_ADDED, TASK_UPDATED):
+            reminder = self.db_handler.get_task_notification(task_id)
+            self._on_ui(lambda: self.apply_reminder(task_id, reminder))
+        else:
+            self._on_ui(lambda: self.task_removed(task_id))
+
+    def task_updated(self, task_id):
+        """Re-read a task's reminder after it was added or edited."""
+        self.apply_reminder(task_id, self.db_handler.get_task_notification(task_id))
+
+    def apply_reminder(self, task_id, reminder):
+        """Schedule a (task_id, description, notify_at) row, or cancel if None."""
+        if reminder:
+            self.scheduler.schedule(*reminder)
+        else:
+            self.scheduler.cancel(task_id)
+
+    def task_removed(self, task_id):
+        """Drop the reminder of a deleted or completed task."""
+        self.scheduler.cancel(task_id)
+
+    @timed("reminders.deliver_reminders")
+    def deliver_reminders(self, due_reminders):
+        """Send one coalesced notification and sound for a batch of due reminders."""
+        if not due_reminders:
+            return
+
+        store = self.repository or self.db_handler
+        task_ids = [task_id for task_id, _, _ in due_reminders]
+        descriptions_by_id = {task_id: description for task_id, description, _ in due_reminders}
+        now = int(self.clock.now().timestamp())
+
+        def claim_and_deliver():
+            # Only reminders this process wins are shown; another process
+            # (e.g. reminder_daemon.py) may already have claimed the rest
+            claimed = self.db_handler.claim_notifications(self.lease_owner, task_ids, LEASE_SECONDS, now)
+            if not claimed:
+                return
+            self.notification_worker.submit(
+                self.send_notification, self.summarize([description for _, _, description, _ in claimed])
+            )
+            self.audio_worker.submit(self.play_sound, time.perf_counter())
+
+            # Mark the batch as notified in one transaction; repeating tasks
+            # come back with their next reminder, which goes straight onto the heap
+            advanced = store.mark_tasks_as_notified([task_id for task_id, _, _, _ in claimed])
+            if advanced:
+                self._on_ui(lambda: self.schedule_repeats(advanced, descriptions_by_id))
+
+        if self.executor is not None:
+            self.executor.submit_write(claim_and_deliver)
+        else:
+            claim_and_deliver()
+
+    def schedule_repeats(self, advanced, descriptions_by_id):
+        """Push the next reminder of each repeating task ({task_id: notify_at})."""
+        for task_id, notify_at in advanced.items():
+            self.scheduler.schedule(task_id, descriptions_by_id[task_id], notify_at)
+
+    @staticmethod
+    def summarize(descriptions):
+        """Build the notification text for one or many due tasks."""
+        if len(descriptions) == 1:
+            return descriptions[0]
+        preview = ", ".join(descriptions[:SUMMARY_PREVIEW])
+        remaining = len(descriptions) - SUMMARY_PREVIEW
+        if remaining > 0:
+            preview += f" and {remaining} more"
+        return f"{len(descriptions)} tasks due: {preview}"
 
     def send_notification(self, message):
-        """Send a desktop notification."""
-        notification.notify(
-            title="Task Reminder",
-            message=message,
-            app_name="To-Do List",
-            timeout=10  # Seconds
-        )
-
-    def play_sound(self):
-        """Play notification sound."""
-        try:
-            playsound(self.sound_file)
-        except Exception as e:
-            print(f"Error playing sound: {e}")
+        """Show a notification through the configured backend."""
+        self.notifier.notify(NOTIFICATION_TITLE, message)
+
+    def play_sound(self, triggered=None):
+        """Play the notification sound through the configured backend."""
+        self.notifier.play_sound(triggered)
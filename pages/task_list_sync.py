@@ -0,0 +1,101 @@
+"""Keep the task page's RecycleView data in step with the database.
+
+The RecycleView only builds cards for the rows on screen, so the cost that
+remains is maintaining its `data` list. TaskListSync keeps that list sorted
+by task_id (the keyset used for paging), applies single-task inserts,
+updates and removals with a binary search, and reconciles a reloaded window
+of rows by reusing the entries of unchanged tasks.
+"""
+from bisect import bisect_left
+
+
+def diff_tasks(current, tasks):
+    """Compare current {task_id: task} against an ordered list of Task rows.
+
+    Returns (inserts, updates, removals) where inserts is a list of
+    (position, task), updates a list of tasks whose row changed and
+    removals a list of task_ids that are no longer present.
+    """
+    new_ids = set()
+    inserts = []
+    updates = []
+    for position, task in enumerate(tasks):
+        task_id = task.task_id
+        new_ids.add(task_id)
+        old = current.get(task_id)
+        if old is None:
+            inserts.append((position, task))
+        elif old != task:
+            updates.append(task)
+    removals = [task_id for task_id in current if task_id not in new_ids]
+    return inserts, updates, removals
+
+
+class TaskListSync:
+    """Maintain `view.data` for a RecycleView of task cards.
+
+    `make_entry(task)` builds the data dict for one row. Rows arrive in
+    keyset pages, so `has_more` tracks whether later task_ids are still
+    unloaded; tasks beyond the loaded window are left for a later page.
+    """
+
+    def __init__(self, view, make_entry):
+        self.view = view
+        self.make_entry = make_entry
+        self.task_ids = []  # Sorted task_ids parallel to view.data
+        self.has_more = False
+        self.built = 0  # Entries built so far (for benchmarks)
+
+    @property
+    def last_key(self):
+        return self.task_ids[-1] if self.task_ids else None
+
+    def reset(self):
+        self.task_ids = []
+        self.has_more = False
+        self.view.data = []
+
+    def extend(self, tasks, has_more):
+        """Append the next keyset page of rows."""
+        entries = [self._entry(task) for task in tasks]
+        self.task_ids.extend(task.task_id for task in tasks)
+        self.view.data.extend(entries)
+        self.has_more = has_more
+
+    def sync(self, tasks, has_more=False):
+        """Replace the loaded window with `tasks`, reusing unchanged entries."""
+        data = self.view.data
+        current = {task_id: entry["task"] for task_id, entry in zip(self.task_ids, data)}
+        inserts, updates, removals = diff_tasks(current, tasks)
+        if inserts or updates or removals:
+            reuse = dict(zip(self.task_ids, data))
+            changed = {task.task_id for task in updates}
+            self.view.data = [
+                reuse[task.task_id] if task.task_id in reuse and task.task_id not in changed else self._entry(task)
+                for task in tasks
+            ]
+            self.task_ids = [task.task_id for task in tasks]
+        self.has_more = has_more
+        return len(inserts), len(updates), len(removals)
+
+    def update(self, task):
+        """Insert or refresh a single task row."""
+        task_id = task.task_id
+        index = bisect_left(self.task_ids, task_id)
+        if index < len(self.task_ids) and self.task_ids[index] == task_id:
+            self.view.data[index] = self._entry(task)
+        elif index == len(self.task_ids) and self.has_more:
+            return  # Belongs to a page that has not been loaded yet
+        else:
+            self.task_ids.insert(index, task_id)
+            self.view.data.insert(index, self._entry(task))
+
+    def remove(self, task_id):
+        index = bisect_left(self.task_ids, task_id)
+        if index < len(self.task_ids) and self.task_ids[index] == task_id:
+            del self.task_ids[index]
+            del self.view.data[index]
+
+    def _entry(self, task):
+        self.built += 1
+        return self.make_entry(task)
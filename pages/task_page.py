@@ -1,23 +1,56 @@
-from kivy.properties import StringProperty, NumericProperty
+from datetime import datetime, timezone
+
+from kivy.properties import StringProperty, NumericProperty, ObjectProperty
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
+from kivy.uix.checkbox import CheckBox
+from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.spinner import Spinner
 from kivy.metrics import dp
+from kivy.clock import Clock, mainthread
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.card import MDCard
-from kivymd.uix.picker import MDDatePicker
-from kivymd.uix.picker import MDTimePicker  # Import Date and Time Picker
 from kivy.uix.textinput import TextInput
-from kivymd.uix.snackbar import Snackbar
 from kivymd.app import MDApp
 from kivymd.uix.button import MDRaisedButton, MDFlatButton
 from kivymd.uix.label import MDLabel
 
-from database.db_handler import DatabaseHandler
-
-db_handler = DatabaseHandler()
+from database.recurrence import describe
+from database.task_repository import TASK_ADDED, TASK_UPDATED, TASKS_RELOADED
+from database.timestamps import format_local
+from instrumentation.metrics import timed
+from pages.task_list_sync import TaskListSync
+
+TASK_PAGE_SIZE = 50  # Tasks fetched per keyset page
+LOAD_MORE_SCROLL_Y = 0.1  # Fetch the next page when scrolled this close to the bottom
+HISTORY_PAGE_SIZE = 30  # Completed tasks shown per "Load more"
+SEARCH_DEBOUNCE = 0.3  # Seconds of typing pause before a search runs
+SEARCH_LIMIT = 100  # Best matches shown for a search
+
+# Repeat selector choices -> recurrence rule (see database.recurrence)
+REPEAT_CHOICES = {
+    "Does not repeat": "",
+    "Daily": "daily",
+    "Weekdays": "weekly:mon,tue,wed,thu,fri",
+    "Weekly": "weekly",
+    "Monthly": "monthly",
+}
+
+
+def repeat_choice(recurrence):
+    """Label of the repeat selector for a stored rule."""
+    if not recurrence:
+        return "Does not repeat"
+    for label, rule in REPEAT_CHOICES.items():
+        if rule and recurrence == rule:
+            return label
+    kind = recurrence.partition(":")[0]
+    return {"daily": "Daily", "weekly": "Weekly", "monthly": "Monthly"}.get(kind, describe(recurrence))
 
 
 class TaskPage(Screen):
@@ -26,6 +59,19 @@ class TaskPage(Screen):
         self.user_id = None
         self.selected_date = None
         self.selected_time = None
+        self.task_list_sync = None
+        self.loaded_user_id = None
+        self.loading_page = False
+        self.search_text = ""  # Active search; the list shows matches instead of pages
+        self.search_event = None
+        self.selected_task_ids = set()  # Cards ticked for "Complete selected"
+
+        # Shared task cache; its change events keep the cards up to date
+        app = MDApp.get_running_app()
+        self.repository = app.repository
+        self.repository.subscribe(self.on_task_event)
+        # All database work runs on the executor's threads, never in these handlers
+        self.db_executor = app.db_executor
 
     def on_enter(self):
         if self.user_id:
@@ -44,9 +90,12 @@ class TaskPage(Screen):
         date_btn.bind(on_release=self.show_date_picker)
         time_btn.bind(on_release=self.show_time_picker)
 
+        repeat_spinner = Spinner(text="Does not repeat", values=list(REPEAT_CHOICES), size_hint_y=None, height=50)
+
         popup_layout.add_widget(task_desc)
         popup_layout.add_widget(date_btn)
         popup_layout.add_widget(time_btn)
+        popup_layout.add_widget(repeat_spinner)
 
         buttons = BoxLayout(orientation="horizontal", spacing=10)
         add_btn = MDRaisedButton(text="Add", md_bg_color=(0.2, 0.5, 0.8, 1))
@@ -59,11 +108,13 @@ class TaskPage(Screen):
         popup = Popup(title="Add Task", content=popup_layout, size_hint=(0.8, 0.5))
 
         # Bind Add button to add_task function
-        add_btn.bind(on_release=lambda *args: self.add_task(task_desc.text, popup))
+        add_btn.bind(on_release=lambda *args: self.add_task(
+            task_desc.text, popup, REPEAT_CHOICES[repeat_spinner.text]))
         close_btn.bind(on_release=popup.dismiss)
         popup.open()
 
     def show_date_picker(self, *args):
+        from kivymd.uix.picker import MDDatePicker  # Imported on demand to keep startup fast
         date_picker = MDDatePicker()
         date_picker.bind(on_save=self.on_date_selected)
         date_picker.open()
@@ -72,6 +123,7 @@ class TaskPage(Screen):
         self.selected_date = str(value)
 
     def show_time_picker(self, *args):
+        from kivymd.uix.picker import MDTimePicker  # Imported on demand to keep startup fast
         time_picker = MDTimePicker()
         time_picker.bind(time=self.on_time_selected)
         time_picker.open()
@@ -79,65 +131,249 @@ class TaskPage(Screen):
     def on_time_selected(self, instance, time):
         self.selected_time = time.strftime("%H:%M")
 
-    def add_task(self, description, popup):
+    def add_task(self, description, popup, recurrence=None):
         if description and self.selected_date and self.selected_time:
-            db_handler.add_task(self.user_id, description, self.selected_date, self.selected_time)
-            self.update_task_list()
+            self.db_executor.submit_write(
+                self.repository.add_task, self.user_id, description, self.selected_date, self.selected_time,
+                recurrence
+            )
             popup.dismiss()
         else:
             popup.content.add_widget(Label(text="All fields are required!", color=(1, 0, 0, 1)))
 
-    def update_task_list(self):
-        tasks = db_handler.get_user_tasks(self.user_id)
-        task_list = self.ids.task_list
-        task_list.clear_widgets()
+    def get_task_list_sync(self):
+        if self.task_list_sync is None:
+            self.task_list_sync = TaskListSync(self.ids.task_list, self.make_task_entry)
+        return self.task_list_sync
 
-        for task in tasks:
-            task_widget = TaskWidget(task, self)
-            task_widget.size_hint_y = None
-            task_widget.height = dp(140)
-            task_list.add_widget(task_widget)
+    def make_task_entry(self, task):
+        """RecycleView data for one task card."""
+        # task_page first: the card reads the selection when its task is set
+        return {"task_page": self, "task": task}
 
-        task_list.height = len(task_list.children) * dp(150)  # Adjusting for task height + spacing
+    @timed("task_page.update_task_list")
+    def update_task_list(self):
+        """Reload the tasks shown so far, touching only rows that changed."""
+        sync = self.get_task_list_sync()
+        user_id = self.user_id
+        if self.loaded_user_id != user_id:
+            # Another user logged in: start again from the first page
+            sync.reset()
+            self.loaded_user_id = user_id
+            self.loading_page = False
+            self.clear_selection()
+            if self.search_text:
+                self.run_search(self.search_text)
+            else:
+                self.load_next_page()
+            return
+        if self.search_text:
+            self.run_search(self.search_text)
+            return
+
+        limit = max(len(sync.task_ids), TASK_PAGE_SIZE)
+
+        def apply(tasks):
+            if self.loaded_user_id == user_id:
+                sync.sync(tasks, has_more=len(tasks) == limit)
+
+        self.db_executor.submit_read(self.repository.get_user_tasks_page, user_id, None, limit, callback=apply)
+
+    def load_next_page(self):
+        """Append the next keyset page of tasks to the list."""
+        if self.loading_page:
+            return
+        self.loading_page = True
+        sync = self.get_task_list_sync()
+        user_id = self.user_id
+
+        def apply(tasks):
+            self.loading_page = False
+            if self.loaded_user_id == user_id:
+                sync.extend(tasks, has_more=len(tasks) == TASK_PAGE_SIZE)
+
+        self.db_executor.submit_read(
+            self.repository.get_user_tasks_page, user_id, sync.last_key, TASK_PAGE_SIZE, callback=apply
+        )
+
+    def on_task_list_scroll(self, scroll_y):
+        sync = self.get_task_list_sync()
+        if sync.has_more and scroll_y <= LOAD_MORE_SCROLL_Y and not self.search_text:
+            self.load_next_page()
+
+    def on_search_text(self, text):
+        """Search as the user types, once they pause for SEARCH_DEBOUNCE seconds."""
+        if self.search_event is not None:
+            self.search_event.cancel()
+        self.search_event = Clock.schedule_once(lambda dt: self.run_search(text), SEARCH_DEBOUNCE)
+
+    @timed("task_page.run_search")
+    def run_search(self, text):
+        self.search_event = None
+        self.search_text = text.strip()
+        sync = self.get_task_list_sync()
+        if not self.search_text:
+            # Search cleared: back to the paged list
+            self.ids.search_status.text = ""
+            sync.reset()
+            self.loading_page = False
+            self.load_next_page()
+            return
+
+        user_id = self.user_id
+        query = self.search_text
+
+        def find():
+            hits = self.repository.search_tasks(user_id, query, SEARCH_LIMIT)
+            tasks = [self.repository.get_task(item_id) for kind, item_id, *_ in hits if kind == "task"]
+            completed = sum(1 for hit in hits if hit[0] == "history")
+            # The list is kept in task_id order; ranking decides which tasks make the cut
+            return sorted((task for task in tasks if task), key=lambda task: task.task_id), completed
+
+        def apply(result):
+            if query != self.search_text or user_id != self.loaded_user_id:
+                return  # A newer search or another user replaced this one
+            tasks, completed = result
+            sync.sync(tasks, has_more=False)
+            self.ids.search_status.text = f"{len(tasks)} open, {completed} completed match \"{query}\""
+
+        self.db_executor.submit_read(find, callback=apply)
+
+    def refresh_task(self, task_id):
+        """Insert or update the card of a single task after it changed."""
+        def apply(task):
+            if task:
+                self.get_task_list_sync().update(task)
+            else:
+                self.get_task_list_sync().remove(task_id)
+
+        self.db_executor.submit_read(self.repository.get_task, task_id, callback=apply)
+
+    def remove_task_card(self, task_id):
+        self.get_task_list_sync().remove(task_id)
+        if task_id in self.selected_task_ids:
+            self.set_task_selected(task_id, False)
+
+    @mainthread
+    def on_task_event(self, event, user_id, task_id):
+        """TaskRepository subscriber: update only the card that changed."""
+        if user_id != self.loaded_user_id:
+            return
+        if event == TASKS_RELOADED or self.search_text:
+            self.update_task_list()
+        elif event in (TASK_ADDED, TASK_UPDATED):
+            self.refresh_task(task_id)
+        else:
+            self.remove_task_card(task_id)
 
     def mark_task_done(self, task_id):
-        db_handler.mark_task_done(task_id)
-        self.update_task_list()
+        self.db_executor.submit_write(self.repository.mark_task_done, task_id)
+
+    def set_task_selected(self, task_id, selected):
+        if selected:
+            self.selected_task_ids.add(task_id)
+        else:
+            self.selected_task_ids.discard(task_id)
+        self.update_selection_button()
+
+    def clear_selection(self):
+        self.selected_task_ids.clear()
+        self.update_selection_button()
 
-    def edit_task(self, task_id, new_desc, new_date, new_time):
-        db_handler.edit_task(task_id, new_desc, new_date, new_time)
-        self.update_task_list()
+    def update_selection_button(self):
+        count = len(self.selected_task_ids)
+        self.ids.complete_selected_btn.text = f"Complete ({count})" if count else "Complete"
+        self.ids.complete_selected_btn.disabled = not count
+
+    def complete_selected(self):
+        """Complete every ticked task in one transaction."""
+        task_ids = sorted(self.selected_task_ids)
+        if not task_ids:
+            return
+        self.clear_selection()
+        self.db_executor.submit_write(self.repository.mark_tasks_done, task_ids)
+
+    def edit_task(self, task_id, new_desc, new_date, new_time, recurrence=None):
+        self.db_executor.submit_write(self.repository.edit_task, task_id, new_desc, new_date, new_time, recurrence)
 
     def delete_task(self, task_id):
-        db_handler.delete_task(task_id)
-        self.update_task_list()
+        self.db_executor.submit_write(self.repository.delete_task, task_id)
 
     def show_snackbar(self, message):
+        from kivymd.uix.snackbar import Snackbar
         Snackbar(text=message, duration=3).open()
 
     def show_completed_tasks_popup(self):
         popup_layout = BoxLayout(orientation="vertical", spacing=10, padding=10)
-        completed_tasks = db_handler.get_completed_tasks(self.user_id)
-
-        if not completed_tasks:
-            popup_layout.add_widget(Label(text="No completed tasks."))
-        else:
-            for task in completed_tasks:
-                popup_layout.add_widget(Label(text=f"{task[2]} - {task[3]} {task[4]}"))
 
-        close_btn = Button(text="Close", size_hint=(1, 0.2))
-        popup_layout.add_widget(close_btn)
+        # Totals come from the pre-aggregated counters (dates are UTC, like DATE('now'))
+        now = datetime.now(timezone.utc)
+        today = now.strftime("%Y-%m-%d")
+        this_week = now.strftime("%Y-W%W")
+        totals_label = Label(text="Today: -   This week: -", size_hint_y=None, height=dp(30))
+        popup_layout.add_widget(totals_label)
+
+        def load_totals():
+            day_counts = self.repository.get_completion_counts(self.user_id, "day", today, today)
+            week_counts = self.repository.get_completion_counts(self.user_id, "week", this_week, this_week)
+            return sum(count for _, count in day_counts), sum(count for _, count in week_counts)
+
+        def show_totals(totals):
+            totals_label.text = f"Today: {totals[0]}   This week: {totals[1]}"
+
+        self.db_executor.submit_read(load_totals, callback=show_totals)
+
+        # Only one page of history is loaded at a time
+        history_list = GridLayout(cols=1, spacing=5, size_hint_y=None)
+        history_list.bind(minimum_height=history_list.setter("height"))
+        scroll = ScrollView(do_scroll_x=False)
+        scroll.add_widget(history_list)
+        popup_layout.add_widget(scroll)
+
+        load_more_btn = Button(text="Load more", size_hint=(1, None), height=dp(40))
+        page_state = {"before_key": None}
+
+        def load_page(*args):
+            load_more_btn.disabled = True
+            self.db_executor.submit_read(
+                self.repository.get_completed_tasks_page, self.user_id, page_state["before_key"], HISTORY_PAGE_SIZE,
+                callback=show_page
+            )
+
+        def show_page(rows):
+            if not rows and page_state["before_key"] is None:
+                history_list.add_widget(Label(text="No completed tasks.", size_hint_y=None, height=dp(30)))
+            for entry in rows:
+                text = f"{entry.description} - {entry.task_date} {entry.task_time}"
+                if entry.completed_at:
+                    text += f"  (done {format_local(entry.completed_at)})"
+                history_list.add_widget(Label(text=text, size_hint_y=None, height=dp(30)))
+            if rows:
+                page_state["before_key"] = (rows[-1].completion_date, rows[-1].history_id)
+            load_more_btn.disabled = len(rows) < HISTORY_PAGE_SIZE
+
+        load_more_btn.bind(on_release=load_page)
+        load_page()
+
+        buttons = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=dp(40))
+        close_btn = Button(text="Close")
+        buttons.add_widget(load_more_btn)
+        buttons.add_widget(close_btn)
+        popup_layout.add_widget(buttons)
 
         popup = Popup(title="Completed Tasks", content=popup_layout, size_hint=(0.8, 0.6))
         close_btn.bind(on_release=popup.dismiss)
         popup.open()
 
 
-class TaskWidget(MDCard):
-    def __init__(self, task, task_page, **kwargs):
+class TaskWidget(RecycleDataViewBehavior, MDCard):
+    """Task card recycled by the task list's RecycleView."""
+
+    task = ObjectProperty(None, allownone=True)
+    task_page = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.task = task
-        self.task_page = task_page
         self.orientation = "vertical"  # Vertical layout for content
         self.padding = dp(10)
         self.spacing = dp(10)
@@ -148,24 +384,30 @@ class TaskWidget(MDCard):
         # Container for the description, date, and time
         content_layout = BoxLayout(orientation="vertical", spacing=dp(5))
 
+        # Selection for "Complete selected"; the ticked IDs live on the page
+        # because the RecycleView reuses this card for other tasks
+        self.select_box = CheckBox(size_hint=(None, None), size=(dp(30), dp(30)), color=(0, 0, 0, 1))
+        self.select_box.bind(active=self.on_select_box)
+        content_layout.add_widget(self.select_box)
+
         # Task description
-        task_desc = Label(
-            text=f"[b]{task[2]}[/b]",  # Bold text using markup
-            markup=True,
+        self.desc_label = Label(
+            text="",  # Filled in by on_task
+            markup=True,  # Bold text using markup
             color=(0, 0, 0, 1),  # Black font
             size_hint_y=None,
             height=dp(40),
         )
-        content_layout.add_widget(task_desc)
+        content_layout.add_widget(self.desc_label)
 
         # Task date and time
-        task_datetime = Label(
-            text=f"{task[3]} {task[4]}",  # Date and time
+        self.datetime_label = Label(
+            text="",  # Date and time
             color=(0, 0, 0, 1),  # Black font
             size_hint_y=None,
             height=dp(20),
         )
-        content_layout.add_widget(task_datetime)
+        content_layout.add_widget(self.datetime_label)
 
         self.add_widget(content_layout)
 
@@ -178,7 +420,7 @@ class TaskWidget(MDCard):
             size_hint_x=0.3,
             background_color=(0.2, 0.7, 0.3, 1),
         )
-        done_btn.bind(on_release=lambda *args: self.task_page.mark_task_done(self.task[0]))
+        done_btn.bind(on_release=lambda *args: self.task_page.mark_task_done(self.task.task_id))
         buttons_layout.add_widget(done_btn)
 
         # Edit button
@@ -196,21 +438,44 @@ class TaskWidget(MDCard):
             size_hint_x=0.3,
             background_color=(0.8, 0.2, 0.2, 1),
         )
-        delete_btn.bind(on_release=lambda *args: self.task_page.delete_task(self.task[0]))
+        delete_btn.bind(on_release=lambda *args: self.task_page.delete_task(self.task.task_id))
         buttons_layout.add_widget(delete_btn)
 
         self.add_widget(buttons_layout)
 
+    def on_task(self, instance, task):
+        """Show the row the RecycleView assigned to this card."""
+        if task is None:
+            return
+        page = self.task_page
+        self.select_box.active = bool(page and task.task_id in page.selected_task_ids)
+        self.desc_label.text = f"[b]{task.description}[/b]"
+        self.datetime_label.text = f"{task.task_date} {task.task_time}"
+        if task.recurrence:
+            # Repeating task: the row holds its next occurrence
+            self.datetime_label.text += f"  ({describe(task.recurrence)})"
+
+    def on_select_box(self, checkbox, active):
+        if self.task is not None and self.task_page is not None:
+            self.task_page.set_task_selected(self.task.task_id, active)
+
     def show_edit_popup(self):
         popup_layout = BoxLayout(orientation="vertical", spacing=10, padding=10)
 
-        desc_input = TextInput(text=self.task[2], multiline=False)
-        date_input = TextInput(text=self.task[3], multiline=False)
-        time_input = TextInput(text=self.task[4], multiline=False)
+        desc_input = TextInput(text=self.task.description, multiline=False)
+        date_input = TextInput(text=self.task.task_date, multiline=False)
+        time_input = TextInput(text=self.task.task_time, multiline=False)
+
+        current_repeat = repeat_choice(self.task.recurrence)
+        values = list(REPEAT_CHOICES)
+        if current_repeat not in values:
+            values.insert(0, current_repeat)  # A custom rule, e.g. imported
+        repeat_spinner = Spinner(text=current_repeat, values=values, size_hint_y=None, height=50)
 
         popup_layout.add_widget(desc_input)
         popup_layout.add_widget(date_input)
         popup_layout.add_widget(time_input)
+        popup_layout.add_widget(repeat_spinner)
 
         buttons = BoxLayout(orientation="horizontal", spacing=10)
         save_btn = Button(text="Save")
@@ -221,7 +486,9 @@ class TaskWidget(MDCard):
         popup_layout.add_widget(buttons)
 
         popup = Popup(title="Edit Task", content=popup_layout, size_hint=(0.8, 0.5))
+        # Only send a rule when the selection changed, so custom rules survive edits
         save_btn.bind(on_release=lambda *args: self.task_page.edit_task(
-            self.task[0], desc_input.text, date_input.text, time_input.text))
+            self.task.task_id, desc_input.text, date_input.text, time_input.text,
+            None if repeat_spinner.text == current_repeat else REPEAT_CHOICES[repeat_spinner.text]))
         close_btn.bind(on_release=popup.dismiss)
         popup.open()
@@ -0,0 +1,128 @@
+"""Headless reminder service.
+
+Delivers due reminders without the Kivy app running. Any number of these
+processes (and the app itself) can share one database: each due reminder
+is claimed with an atomic lease before it is shown, so it is delivered by
+exactly one of them.
+
+Usage:
+    python reminder_daemon.py [--db database/database.db] [--shard 0/2] [--stub] [--once]
+                              [--audio playsound|kivy|null]
+
+--shard i/n only handles users with user_id % n == i, to split users across
+processes; --stub prints reminders instead of showing them and plays no sound.
+The sound is played with playsound unless --audio says otherwise, so the
+daemon does not need (or import) Kivy.
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+from database.db_handler import DatabaseHandler
+from instrumentation import metrics
+from pages.audio import BACKENDS
+from pages.notifier import DesktopNotifier, StubNotifier
+from pages.reminder_handler import LEASE_SECONDS, NOTIFICATION_TITLE, ReminderHandler
+
+POLL_INTERVAL = 30  # Longest sleep between checks, so new tasks from other processes are seen
+MIN_SLEEP = 1  # Shortest sleep, e.g. while a due reminder is leased by someone else
+
+
+class ReminderDaemon:
+    def __init__(self, db_handler, notifier, owner=None, shard=None, batch_size=100,
+                 lease_seconds=LEASE_SECONDS, poll_interval=POLL_INTERVAL):
+        self.db_handler = db_handler
+        self.notifier = notifier
+        self.owner = owner or f"daemon-{socket.gethostname()}-{os.getpid()}"
+        self.shard = shard  # (index, count) or None for every user
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.delivered = 0
+
+    def run_once(self, now=None):
+        """Claim and deliver one batch of due reminders; returns the delivered task IDs."""
+        claimed = self.db_handler.claim_due_notifications(
+            self.owner, self.lease_seconds, self.batch_size, now, self.shard
+        )
+        if not claimed:
+            return []
+        task_ids = [task_id for task_id, _, _, _ in claimed]
+
+        # One coalesced notification per user, and one sound for the batch
+        per_user = {}
+        for _, user_id, description, _ in claimed:
+            per_user.setdefault(user_id, []).append(description)
+        try:
+            for descriptions in per_user.values():
+                self.notifier.notify(NOTIFICATION_TITLE, ReminderHandler.summarize(descriptions))
+            self.notifier.play_sound()
+        except Exception as e:
+            print(f"Error delivering reminders: {e}")
+            self.db_handler.release_notifications(self.owner, task_ids)
+            return []
+
+        self.db_handler.mark_tasks_as_notified(task_ids)
+        self.delivered += len(task_ids)
+        return task_ids
+
+    def seconds_until_next(self):
+        """How long to sleep before the next reminder could be due."""
+        next_at = self.db_handler.next_notification_at(self.shard)
+        if next_at is None:
+            return self.poll_interval
+        return min(max(next_at - time.time(), MIN_SLEEP), self.poll_interval)
+
+    def run(self, stop_event):
+        """Deliver reminders until `stop_event` is set."""
+        while not stop_event.is_set():
+            if len(self.run_once()) == self.batch_size:
+                continue  # A full batch: more may be waiting
+            stop_event.wait(self.seconds_until_next())
+
+
+def parse_shard(text):
+    index, count = (int(part) for part in text.split("/"))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard must be i/n with 0 <= i < n")
+    return index, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="database/database.db")
+    parser.add_argument("--shard", type=parse_shard, default=None)
+    parser.add_argument("--owner", default=None, help="lease owner name (default: daemon-<host>-<pid>)")
+    parser.add_argument("--stub", action="store_true", help="print reminders instead of desktop notifications")
+    parser.add_argument("--once", action="store_true", help="deliver what is due now and exit")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--audio", choices=sorted(BACKENDS), default="playsound", help="sound backend")
+    args = parser.parse_args()
+
+    db_handler = DatabaseHandler(args.db)
+    notifier = StubNotifier(echo=True) if args.stub else DesktopNotifier(backend=args.audio)
+    daemon = ReminderDaemon(db_handler, notifier, owner=args.owner, shard=args.shard, poll_interval=args.poll)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    try:
+        notifier.preload()
+        if args.once:
+            while len(daemon.run_once()) == daemon.batch_size:
+                pass
+        else:
+            print(f"Reminder daemon {daemon.owner} watching {args.db}")
+            daemon.run(stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Delivered {daemon.delivered} reminders")
+        db_handler.close()
+        metrics.shutdown()
+
+
+if __name__ == "__main__":
+    main()
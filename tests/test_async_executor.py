@@ -0,0 +1,33 @@
+"""DatabaseExecutor callbacks, delivered inline instead of through Kivy's Clock."""
+from database.async_executor import DatabaseExecutor
+
+
+def run(executor, submit, func):
+    results, errors = [], []
+    submit(func, callback=results.append, error_callback=errors.append).exception()
+    executor.shutdown()
+    return results, errors
+
+
+def test_result_goes_to_callback():
+    executor = DatabaseExecutor(deliver=lambda func: func())
+    assert run(executor, executor.submit_read, lambda: 42) == ([42], [])
+
+
+def test_error_goes_to_error_callback():
+    executor = DatabaseExecutor(deliver=lambda func: func())
+
+    def locked():
+        raise RuntimeError("database is locked")
+
+    results, errors = run(executor, executor.submit_write, locked)
+    assert results == []
+    assert [str(error) for error in errors] == ["database is locked"]
+
+
+def test_error_without_error_callback_is_only_reported(capsys):
+    executor = DatabaseExecutor(deliver=lambda func: func())
+    future = executor.submit_write(lambda: 1 / 0, callback=lambda result: None)
+    future.exception()
+    executor.shutdown()
+    assert "Error in database call" in capsys.readouterr().out
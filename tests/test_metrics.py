@@ -0,0 +1,32 @@
+"""Query metrics from traced connections."""
+import json
+import os
+import sqlite3
+
+from instrumentation import metrics
+
+
+def query_records(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["sql"]: record for record in map(json.loads, f) if record["type"] == "query"}
+
+
+def test_connection_shortcuts_are_traced(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "metrics.jsonl")
+    recorder = metrics.MetricsRecorder(path)
+    monkeypatch.setattr(metrics, "recorder", recorder)
+
+    conn = sqlite3.connect(":memory:", factory=metrics.connection_factory())
+    conn.execute("CREATE TABLE tasks (description TEXT)")
+    conn.executemany("INSERT INTO tasks VALUES (?)", [("a",), ("b",), ("c",)])
+    assert isinstance(conn.execute("SELECT 1"), metrics.TracedCursor)
+    rows = conn.execute("SELECT description FROM tasks").fetchall()
+    conn.close()
+    recorder.flush()
+
+    records = query_records(path)
+    assert len(rows) == 3
+    assert records["INSERT INTO tasks VALUES (?)"]["rows"] == 3
+    assert records["SELECT description FROM tasks"]["calls"] == 1
+    assert records["SELECT description FROM tasks"]["rows"] == 3
+    assert records["SELECT 1"]["calls"] == 1
@@ -0,0 +1,148 @@
+"""ReminderScheduler driven by FakeClock: ordering, wake-ups and repeats.
+
+    python -m pytest tests
+"""
+import os
+from datetime import datetime
+
+from database.db_handler import DatabaseHandler
+from pages.notifier import StubNotifier
+from pages.reminder_handler import FakeClock, ReminderHandler, ReminderScheduler
+
+START = datetime(2030, 1, 1, 9, 0)
+
+
+def make_scheduler():
+    clock = FakeClock(START)
+    batches = []
+    scheduler = ReminderScheduler(batches.append, clock)
+    return scheduler, clock, batches
+
+
+def at(clock, seconds):
+    """Epoch seconds `seconds` after the clock's current time."""
+    return int(clock.now().timestamp()) + seconds
+
+
+def fired(batches):
+    return [[task_id for task_id, _, _ in batch] for batch in batches]
+
+
+def test_load_fires_in_deadline_order():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.load([(1, "late", at(clock, 300)), (2, "early", at(clock, 60)), (3, "middle", at(clock, 120))])
+    assert len(scheduler) == 3
+    assert scheduler.next_deadline() == at(clock, 60)
+
+    clock.advance(400)
+    assert fired(batches) == [[2], [3], [1]]
+    assert len(scheduler) == 0
+
+
+def test_reminders_due_together_are_one_batch():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.load([(1, "a", at(clock, 60)), (2, "b", at(clock, 60)), (3, "c", at(clock, 30))])
+    clock.advance(60)
+    assert [sorted(batch) for batch in fired(batches)] == [[3], [1, 2]]
+
+
+def test_load_skips_missing_and_invalid_times():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.load([(1, "none", None), (2, "bad", "soon"), (3, "ok", at(clock, 10))])
+    assert len(scheduler) == 1
+    clock.advance(10)
+    assert fired(batches) == [[3]]
+
+
+def test_cancel_and_reschedule():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.load([(1, "a", at(clock, 60)), (2, "b", at(clock, 120))])
+    scheduler.cancel(1)
+    scheduler.schedule(2, "b moved", at(clock, 180))
+    scheduler.cancel(99)  # Unknown task: nothing happens
+
+    clock.advance(150)
+    assert batches == []
+    clock.advance(30)
+    assert batches == [[(2, "b moved", at(clock, 0))]]
+
+
+def test_schedule_none_cancels():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.schedule(1, "a", at(clock, 60))
+    scheduler.schedule(1, "a", None)
+    assert len(scheduler) == 0
+    clock.advance(120)
+    assert batches == []
+
+
+def test_earlier_deadline_preempts_pending_wakeup():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.schedule(1, "later", at(clock, 600))
+    first_wakeup = scheduler._wakeup
+    scheduler.schedule(2, "sooner", at(clock, 30))
+    assert first_wakeup.cancelled
+    assert scheduler._wakeup_time == at(clock, 30)
+
+    clock.advance(30)
+    assert fired(batches) == [[2]]
+    assert scheduler._wakeup_time == at(clock, 570)
+
+
+def test_later_deadline_keeps_pending_wakeup():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.schedule(1, "sooner", at(clock, 30))
+    wakeup = scheduler._wakeup
+    scheduler.schedule(2, "later", at(clock, 600))
+    assert scheduler._wakeup is wakeup and not wakeup.cancelled
+
+
+def test_sleep_is_capped_at_max_sleep():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.schedule(1, "tomorrow", at(clock, 24 * 3600))
+    assert scheduler._wakeup_time == at(clock, ReminderScheduler.MAX_SLEEP)
+
+    # Each capped wake-up finds nothing due and sleeps again
+    clock.advance(ReminderScheduler.MAX_SLEEP)
+    assert batches == []
+    assert scheduler._wakeup_time == at(clock, ReminderScheduler.MAX_SLEEP)
+
+    clock.advance(23 * 3600 - ReminderScheduler.MAX_SLEEP)
+    assert batches == []
+    clock.advance(3600)
+    assert fired(batches) == [[1]]
+
+
+def test_overdue_reminder_fires_at_once():
+    scheduler, clock, batches = make_scheduler()
+    scheduler.load([(1, "missed", at(clock, -600))])
+    clock.advance(0)
+    assert fired(batches) == [[1]]
+
+
+def test_schedule_repeats_rearms_repeating_task(tmp_path):
+    db_handler = DatabaseHandler(os.path.join(tmp_path, "tasks.db"))
+    user_id = db_handler.register_user("alice", "secret")
+    task_id = db_handler.add_task(user_id, "stand-up", "2030-01-01", "09:00", "daily")
+    db_handler.add_task(user_id, "one-off", "2030-01-01", "09:00")
+
+    clock = FakeClock(START)
+    notifier = StubNotifier()
+    handler = ReminderHandler(db_handler, clock=clock, notifier=notifier)
+    try:
+        handler.start()
+        assert len(handler.scheduler) == 2
+        clock.advance(0)
+
+        # The one-off reminder is gone; the daily one is back on the heap for tomorrow
+        assert len(handler.scheduler) == 1
+        tomorrow = int(datetime(2030, 1, 2, 9, 0).timestamp())
+        assert handler.scheduler.next_deadline() == tomorrow
+        assert db_handler.get_task_notification(task_id)[2] == tomorrow
+
+        handler.schedule_repeats({task_id: tomorrow + 3600}, {task_id: "stand-up"})
+        assert handler.scheduler.next_deadline() == tomorrow + 3600
+        assert len(handler.scheduler) == 1
+    finally:
+        handler.stop()
+        db_handler.close()
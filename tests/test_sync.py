@@ -0,0 +1,213 @@
+"""Change-journal sync between two database files."""
+import os
+import shutil
+
+import pytest
+
+from database.db_handler import DatabaseHandler
+from database.sync import sync_databases
+
+
+@pytest.fixture
+def databases(tmp_path):
+    handlers = []
+
+    def open_db(name):
+        handler = DatabaseHandler(os.path.join(tmp_path, name))
+        handlers.append(handler)
+        return handler
+
+    yield open_db
+    for handler in handlers:
+        handler.close()
+
+
+def tasks(db):
+    """Every task as (owner, description, date, time, recurrence, status), in a file-independent order."""
+    return sorted(db.create_connection().execute('''
+        SELECT users.username, description, task_date, task_time, recurrence, status
+        FROM tasks JOIN users ON users.id = tasks.user_id
+    '''))
+
+
+def history(db):
+    return sorted(db.create_connection().execute('''
+        SELECT history.uid, users.username, description, completion_date
+        FROM history JOIN users ON users.id = history.user_id
+    '''))
+
+
+def task_id(db, description):
+    return db.create_connection().execute(
+        'SELECT task_id FROM tasks WHERE description = ?', (description,)
+    ).fetchone()[0]
+
+
+def user_id(db, username):
+    return db.create_connection().execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()[0]
+
+
+def stamp(db, description):
+    """(lamport, origin) of the last local change to a task."""
+    return db.create_connection().execute('''
+        SELECT j.lamport, j.origin FROM change_journal j JOIN tasks t ON t.uid = j.uid
+        WHERE j.entity = 'task' AND t.description = ?
+    ''', (description,)).fetchone()
+
+
+def test_sync_converges_in_both_directions(databases):
+    first, second = databases("first.db"), databases("second.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "buy milk", "2030-01-01", "09:00")
+    first.add_task(alice, "stand-up", "2030-01-01", "10:00", "daily")
+    bob = second.register_user("bob", "secret")
+    second.add_task(bob, "call mum", "2030-01-02", "18:00")
+
+    assert sync_databases(first, second) == ((2, 0), (1, 0))
+    assert tasks(first) == tasks(second)
+    assert len(tasks(first)) == 3
+    # Users travel with their password hash, so they can log in on either side
+    assert second.validate_user("alice", "secret") == user_id(second, "alice")
+
+    # Nothing new: a second round applies nothing
+    assert sync_databases(first, second) == ((0, 0), (0, 0))
+
+
+def test_same_name_different_accounts_are_not_merged(databases):
+    first, second = databases("first.db"), databases("second.db")
+    first.add_task(first.register_user("alice", "secret"), "first's task", "2030-01-01", "09:00")
+    second.add_task(second.register_user("alice", "secret"), "second's task", "2030-01-01", "09:00")
+    before = tasks(first), tasks(second)
+
+    assert sync_databases(first, second) == (None, None)
+    assert (tasks(first), tasks(second)) == before
+    # The refused bundle left nothing behind, so the databases still sync with others
+    third = databases("third.db")
+    assert sync_databases(first, third) == ((1, 0), (0, 0))
+
+
+def test_concurrent_edit_higher_stamp_wins_on_both_sides(databases):
+    first, second = databases("first.db"), databases("second.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "buy milk", "2030-01-01", "09:00")
+    sync_databases(first, second)
+
+    # Two edits here against one there: the twice-edited side has the higher Lamport stamp
+    first.edit_task(task_id(first, "buy milk"), "buy oat milk", "2030-01-01", "09:30")
+    first.edit_task(task_id(first, "buy oat milk"), "buy oat milk x2", "2030-01-01", "09:30")
+    second.edit_task(task_id(second, "buy milk"), "buy soy milk", "2030-01-01", "08:00")
+    assert stamp(first, "buy oat milk x2") > stamp(second, "buy soy milk")
+
+    sync_databases(first, second)
+    assert tasks(first) == tasks(second)
+    assert [description for _, description, *_ in tasks(first)] == ["buy oat milk x2"]
+
+    # The losing side has caught up with the clock, so its next edit outranks everything seen so far
+    second.edit_task(task_id(second, "buy oat milk x2"), "buy rice milk", "2030-01-01", "08:00")
+    assert stamp(second, "buy rice milk") > stamp(first, "buy oat milk x2")
+    sync_databases(second, first)
+    assert tasks(first) == tasks(second)
+    assert [description for _, description, *_ in tasks(first)] == ["buy rice milk"]
+
+
+def test_equal_stamps_are_settled_by_origin(databases):
+    first, second = databases("first.db"), databases("second.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "buy milk", "2030-01-01", "09:00")
+    sync_databases(first, second)
+
+    first.edit_task(task_id(first, "buy milk"), "from first", "2030-01-01", "09:00")
+    second.edit_task(task_id(second, "buy milk"), "from second", "2030-01-01", "09:00")
+    stamps = {"from first": stamp(first, "from first"), "from second": stamp(second, "from second")}
+    assert stamps["from first"][0] == stamps["from second"][0]
+
+    sync_databases(second, first)
+    winner = max(stamps, key=stamps.get)
+    assert [description for _, description, *_ in tasks(first)] == [winner]
+    assert tasks(first) == tasks(second)
+
+
+def test_delete_against_edit(databases):
+    first, second = databases("first.db"), databases("second.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "edited", "2030-01-01", "09:00")
+    first.add_task(alice, "deleted", "2030-01-01", "10:00")
+    sync_databases(first, second)
+
+    edited_uid, deleted_uid = (
+        second.create_connection().execute('SELECT uid FROM tasks WHERE description = ?', (description,)).fetchone()[0]
+        for description in ("edited", "deleted")
+    )
+    second.delete_task(task_id(second, "edited"))
+    second.edit_task(task_id(second, "deleted"), "deleted", "2030-01-01", "13:00")
+    second.delete_task(task_id(second, "deleted"))
+    first.edit_task(task_id(first, "deleted"), "deleted", "2030-01-01", "12:00")
+    first.edit_task(task_id(first, "edited"), "edited", "2030-01-01", "11:00")
+    first.edit_task(task_id(first, "edited"), "edited again", "2030-01-01", "11:00")
+
+    def journal(db, uid):
+        return db.create_connection().execute(
+            'SELECT op, lamport FROM change_journal WHERE uid = ?', (uid,)
+        ).fetchone()
+
+    # An edit stamped after the other side's delete brings the task back ...
+    assert journal(second, edited_uid)[0] == "delete"
+    assert journal(first, edited_uid)[1] > journal(second, edited_uid)[1]
+    # ... and a delete stamped after the other side's edit removes it
+    assert journal(second, deleted_uid)[0] == "delete"
+    assert journal(second, deleted_uid)[1] > journal(first, deleted_uid)[1]
+
+    sync_databases(first, second)
+    assert tasks(first) == tasks(second)
+    assert [description for _, description, *_ in tasks(first)] == ["edited again"]
+
+
+def test_completion_propagates_to_history_and_counts(databases):
+    first, second = databases("first.db"), databases("second.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "buy milk", "2030-01-01", "09:00")
+    first.add_task(alice, "stand-up", "2030-01-01", "10:00", "daily")
+    sync_databases(first, second)
+
+    second.mark_tasks_done([task_id(second, "buy milk"), task_id(second, "stand-up")])
+    sync_databases(first, second)
+
+    assert tasks(first) == tasks(second)
+    # The one-off task is gone; the daily one moved on to its next occurrence
+    assert [(description, task_date) for _, description, task_date, *_ in tasks(first)] == [("stand-up", "2030-01-02")]
+    assert history(first) == history(second)
+    assert len(history(first)) == 2
+    assert first.get_completion_counts(alice) == second.get_completion_counts(user_id(second, "alice"))
+    assert sum(count for _, count in first.get_completion_counts(alice)) == 2
+
+    # Syncing again neither duplicates history nor counts it twice
+    sync_databases(second, first)
+    assert len(history(first)) == 2
+    assert sum(count for _, count in first.get_completion_counts(alice)) == 2
+
+
+def test_copied_file_gets_its_own_origin(databases, tmp_path):
+    first = databases("first.db")
+    alice = first.register_user("alice", "secret")
+    first.add_task(alice, "before copy", "2030-01-01", "09:00")
+    first.close()
+    shutil.copyfile(os.path.join(tmp_path, "first.db"), os.path.join(tmp_path, "copy.db"))
+
+    first, copy = databases("first.db"), databases("copy.db")
+    first_clock, copy_clock = first.sync_clock(), copy.sync_clock()
+    # The copy retired the shared origin into its peers and stamps new changes with a fresh one
+    assert set(first_clock) < set(copy_clock)
+    shared = next(iter(first_clock))
+    assert copy_clock[shared] == first_clock[shared]
+
+    first.add_task(alice, "on first", "2030-01-02", "09:00")
+    copy.add_task(user_id(copy, "alice"), "on copy", "2030-01-03", "09:00")
+    assert stamp(first, "on first")[1] != stamp(copy, "on copy")[1]
+
+    # Both new tasks survive the merge; the shared one is not duplicated
+    third = databases("third.db")
+    sync_databases(first, third)
+    sync_databases(copy, third)
+    sync_databases(first, third)
+    assert tasks(first) == tasks(copy) == tasks(third)
+    assert [description for _, description, *_ in tasks(third)] == ["before copy", "on copy", "on first"]